@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from pdf_processor import PDFProcessor
+from claude_quote_extractor import ClaudeQuoteExtractor, PROMPT_VERSION
+
+BATCH_STATE_DIR = os.path.join('state', 'batches')
+
+
+def make_custom_id(pdf_path: str) -> str:
+    """
+    Build a batch request ID for a PDF that satisfies the API's
+    ^[a-zA-Z0-9_-]{1,64}$ format and stays unique per path.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        str: Request custom_id
+    """
+    stem = re.sub(r'[^A-Za-z0-9_-]', '_',
+                  os.path.splitext(os.path.basename(pdf_path))[0])
+    digest = hashlib.sha1(pdf_path.encode('utf-8')).hexdigest()[:8]
+    return f"{stem[:55]}-{digest}"
+
+
+class BatchBackfill:
+    """Reprocess a whole fiscal quarter through the Message Batches API."""
+
+    def __init__(self,
+                 quote_extractor: ClaudeQuoteExtractor,
+                 pdf_processor: PDFProcessor,
+                 poll_interval: float = 60,
+                 state_dir: str = BATCH_STATE_DIR,
+                 request_text: Optional[Callable[[str, str, str],
+                                                 str]] = None):
+        """
+        Initialize the backfill.
+
+        Args:
+            quote_extractor (ClaudeQuoteExtractor): Builds the requests and
+                parses the results
+            pdf_processor (PDFProcessor): Extracts transcript text
+            poll_interval (float): Seconds between batch status checks
+            state_dir (str): Where batch IDs are persisted for resuming
+            request_text (Callable): (text, company_name, pdf_path) -> the
+                part of the transcript to send, as a synchronous run would
+                (e.g. focused or pre-filtered); the whole text if None
+        """
+        self.quote_extractor = quote_extractor
+        self.pdf_processor = pdf_processor
+        self.poll_interval = poll_interval
+        self.request_text = request_text or (lambda text, *_: text)
+        self.state_dir = state_dir
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _state_path(self, fiscal_year: str, quarter: str) -> str:
+        return os.path.join(self.state_dir, f"{fiscal_year}_{quarter}.json")
+
+    def _load_state(self, fiscal_year: str, quarter: str) -> Dict:
+        try:
+            with open(self._state_path(fiscal_year, quarter), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, fiscal_year: str, quarter: str, state: Dict):
+        path = self._state_path(fiscal_year, quarter)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def run(self, fiscal_year: str, quarter: str, pdf_paths: List[str]
+            ) -> List[Tuple[str, Union[List[Dict], Exception]]]:
+        """
+        Extract quotes for a quarter's transcripts as a single batch job.
+
+        If a batch for this quarter was already submitted (e.g. before a
+        restart) it is resumed instead of submitting a new one. Transcripts
+        whose response is already cached are answered without the API.
+        Transcripts too long for one request are extracted with map-reduce
+        outside the batch, while it runs: the reduce call needs the map
+        results first. They are recorded with the batch, so a resumed run
+        extracts them again (from the response cache where it can).
+
+        Args:
+            fiscal_year (str): Fiscal year, e.g. 'FY25'
+            quarter (str): Quarter, e.g. 'Q2'
+            pdf_paths (List[str]): Transcripts to process
+
+        Returns:
+            List[Tuple[str, Union[List[Dict], Exception]]]: (pdf_path,
+                quotes) for each transcript, or the error for that request
+        """
+        results = []
+        state = self._load_state(fiscal_year, quarter)
+
+        if state and state.get('prompt_version') != PROMPT_VERSION:
+            print(f"Warning: Discarding batch {state['batch_id']} made with "
+                  f"prompt version {state.get('prompt_version')}")
+            state = {}
+
+        if not state:
+            state, results, chunked = self._submit(fiscal_year, quarter,
+                                                   pdf_paths)
+            results.extend(self._extract_chunked(chunked))
+            if not state:
+                return results
+        else:
+            print(f"Resuming batch {state['batch_id']} for "
+                  f"{fiscal_year}/{quarter}")
+            results.extend(self._extract_chunked(self._chunked_of(state)))
+
+        self._wait(state['batch_id'])
+        results.extend(self._collect(state))
+        os.remove(self._state_path(fiscal_year, quarter))
+        return results
+
+    def _submit(self, fiscal_year: str, quarter: str, pdf_paths: List[str]):
+        """
+        Submit uncached transcripts as a new batch and persist its ID.
+
+        Returns:
+            Tuple: Batch state ({} if nothing was submitted), results of
+                cached and failed transcripts, and (pdf_path, text,
+                company_name) of transcripts that need map-reduce
+        """
+        results = []
+        chunked = []
+        batch_requests = []
+        state_requests = {}
+        texts = self.pdf_processor.extract_texts(pdf_paths)
+
+        for pdf_path in pdf_paths:
+            if pdf_path not in texts:
+                results.append(
+                    (pdf_path, Exception("text extraction failed")))
+                continue
+            # Extract company name from filename (split by _Q and take first part)
+            company_name = os.path.basename(pdf_path).split('_Q')[0].replace(
+                '_', ' ')
+            text = self.request_text(texts[pdf_path], company_name, pdf_path)
+
+            quotes = self.quote_extractor.reparse_cached(
+                text, company_name, pdf_path)
+            if quotes is not None:
+                results.append((pdf_path, quotes))
+                continue
+            if self.quote_extractor.needs_chunking(text):
+                chunked.append((pdf_path, text, company_name))
+                continue
+
+            custom_id = make_custom_id(pdf_path)
+            batch_requests.append({
+                'custom_id': custom_id,
+                'params': self.quote_extractor.build_request(
+                    text, company_name)
+            })
+            state_requests[custom_id] = {
+                'pdf_path': pdf_path,
+                'company_name': company_name
+            }
+
+        if not batch_requests:
+            return {}, results, chunked
+
+        batch = self.quote_extractor.guard.call(
+            self.quote_extractor.client.messages.batches.create,
+            requests=batch_requests)
+        state = {
+            'batch_id': batch.id,
+            'prompt_version': PROMPT_VERSION,
+            'submitted_at': time.time(),
+            'requests': state_requests,
+            'chunked': {pdf_path: company_name
+                        for pdf_path, _, company_name in chunked}
+        }
+        self._save_state(fiscal_year, quarter, state)
+        print(f"Submitted batch {batch.id} with {len(batch_requests)} "
+              f"transcripts for {fiscal_year}/{quarter}")
+        return state, results, chunked
+
+    def _extract_chunked(self, chunked: List[Tuple[str, str, str]]
+                         ) -> List[Tuple[str, Union[List[Dict], Exception]]]:
+        """Extract long transcripts with map-reduce through the regular API."""
+        results = []
+        for pdf_path, text, company_name in chunked:
+            print(f"Extracting {pdf_path} with map-reduce outside the batch")
+            try:
+                quotes = self.quote_extractor.extract_quotes(
+                    text, company_name, pdf_path)
+            except Exception as e:
+                quotes = e
+            results.append((pdf_path, quotes))
+        return results
+
+    def _chunked_of(self, state: Dict) -> List[Tuple[str, str, str]]:
+        """(pdf_path, text, company_name) of a batch's map-reduce jobs."""
+        chunked = state.get('chunked', {})
+        texts = self.pdf_processor.extract_texts(list(chunked))
+        return [(pdf_path, self.request_text(texts[pdf_path], company_name,
+                                             pdf_path), company_name)
+                for pdf_path, company_name in chunked.items()
+                if pdf_path in texts]
+
+    def _wait(self, batch_id: str):
+        """Poll the batch until it has finished processing."""
+        while True:
+            batch = self.quote_extractor.guard.call(
+                self.quote_extractor.client.messages.batches.retrieve,
+                batch_id)
+            if batch.processing_status == 'ended':
+                return
+            counts = batch.request_counts
+            print(f"Batch {batch_id}: {counts.processing} processing, "
+                  f"{counts.succeeded} succeeded, {counts.errored} errored")
+            time.sleep(self.poll_interval)
+
+    def _collect(self, state: Dict
+                 ) -> List[Tuple[str, Union[List[Dict], Exception]]]:
+        """Parse the results of a finished batch."""
+        results = []
+        requests = state['requests']
+        for item in self.quote_extractor.guard.call(
+                self.quote_extractor.client.messages.batches.results,
+                state['batch_id']):
+            request = requests.get(item.custom_id)
+            if request is None:
+                continue
+            pdf_path = request['pdf_path']
+            if item.result.type != 'succeeded':
+                results.append((pdf_path, Exception(
+                    f"batch request {item.result.type}")))
+                continue
+
+            self.quote_extractor.record_usage(item.result.message,
+                                              request['company_name'],
+                                              file_path=pdf_path, batch=True)
+            response_text = self.quote_extractor.response_text(
+                item.result.message)
+            try:
+                text = self.request_text(
+                    self.pdf_processor.extract_text(pdf_path),
+                    request['company_name'], pdf_path)
+                self.quote_extractor.cache_response(
+                    self.quote_extractor.build_request(
+                        text, request['company_name']),
+                    response_text, request['company_name'], pdf_path)
+            except Exception as e:
+                print(f"Warning: Could not cache batch result for "
+                      f"{pdf_path}: {str(e)}")
+            try:
+                quotes = self.quote_extractor.finish_quotes(
+                    response_text, request['company_name'], pdf_path)
+            except Exception as e:
+                quotes = e
+            results.append((pdf_path, quotes))
+        return results
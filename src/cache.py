@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+CACHE_ROOT = '.cache'
+
+# (path, size, mtime) -> sha256, so a file is hashed once per process
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _hash_memo:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+class DiskCache:
+    """Size-bounded on-disk cache of JSON entries keyed by a hex digest."""
+
+    def __init__(self, name: str, max_bytes: int = 256 * 1024 * 1024,
+                 root: str = CACHE_ROOT):
+        """
+        Initialize the cache.
+
+        Args:
+            name (str): Sub-directory of the cache root for this cache
+            max_bytes (int): Total size above which the least recently used
+                entries are evicted
+            root (str): Cache root directory
+        """
+        self.directory = os.path.join(root, name)
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        # Pipeline threads share one cache; the lock keeps the size total
+        # and eviction consistent between them
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up an entry, marking it as recently used.
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            Optional[dict]: The cached entry, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return entry
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+    def put(self, key: str, entry: dict):
+        """
+        Store an entry, evicting old entries if the cache grows too big.
+
+        Args:
+            key (str): Entry key
+            entry (dict): JSON-serializable entry
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see half an entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+
+        with self._lock:
+            # Sized before the replace, so a walk of the directory cannot
+            # count the new entry twice
+            total = self._total()
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes = total - old_size + os.path.getsize(path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        Remove one entry, or every entry when no key is given.
+
+        Args:
+            key (str): Entry key to remove
+        """
+        with self._lock:
+            paths = [self._path(key)] if key else [
+                p for p, _, _ in self._entries()]
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = None
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Iterate over every (key, entry) pair without touching recency.
+
+        Returns:
+            Iterator[Tuple[str, dict]]: Cached entries
+        """
+        for path, _, _ in self._entries():
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield os.path.basename(path)[:-len('.json')], entry
+
+    def stats(self) -> str:
+        """Return a one-line summary of cache usage."""
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return (f"{self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit "
+                f"rate), {self.total_bytes() / (1024 * 1024):.1f} MB")
+
+    def total_bytes(self) -> int:
+        """Return the current size of all cache entries in bytes."""
+        with self._lock:
+            return self._total()
+
+    def _total(self) -> int:
+        """total_bytes, for callers holding the lock."""
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        return self._total_bytes
+
+    def _entries(self):
+        """List (path, size, mtime) for every entry on disk."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if file.endswith('.json'):
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache fits its budget.
+        Called with the lock held.
+        """
+        total = self._total()
+        for path, size, _ in sorted(self._entries(), key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
@@ -0,0 +1,93 @@
+import re
+from typing import List
+
+# A line that opens a speaker turn, e.g. "Akshant Goyal:" or "Moderator :"
+SPEAKER_LINE = re.compile(
+    r"^\s*(?:Mr\.|Ms\.|Mrs\.|Dr\.)?\s*[A-Z][\w.'\-]*(?:\s+[A-Z][\w.'\-]*){0,4}\s*:")
+
+# Section headers that are safe places to cut a transcript
+SECTION_LINE = re.compile(
+    r"^\s*(?:question[- ]and[- ]answer|q\s*&\s*a|prepared remarks|"
+    r"opening remarks|presentation)\b", re.IGNORECASE)
+
+
+def split_segments(text: str) -> List[str]:
+    """
+    Split a transcript into speaker turns and sections.
+
+    Args:
+        text (str): Transcript text
+
+    Returns:
+        List[str]: Segments in order; joining them with newlines gives back
+            the transcript
+    """
+    segments = []
+    current = []
+    for line in text.split('\n'):
+        if current and (SPEAKER_LINE.match(line) or SECTION_LINE.match(line)):
+            segments.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        segments.append('\n'.join(current))
+    return segments
+
+
+def split_transcript(text: str, max_chars: int) -> List[str]:
+    """
+    Split a transcript into chunks of at most max_chars, cutting on speaker
+    turn or section boundaries where possible.
+
+    Segments longer than max_chars are cut on line boundaries, and single
+    lines longer than that are cut on sentence ends.
+
+    Args:
+        text (str): Transcript text
+        max_chars (int): Largest chunk size in characters
+
+    Returns:
+        List[str]: Chunks in transcript order
+    """
+    pieces = []
+    for segment in split_segments(text):
+        if len(segment) <= max_chars:
+            pieces.append(segment)
+            continue
+        for line in segment.split('\n'):
+            if len(line) <= max_chars:
+                pieces.append(line)
+            else:
+                pieces.extend(_split_long_line(line, max_chars))
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) + 1 > max_chars:
+            chunks.append('\n'.join(current))
+            current = []
+            size = 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def _split_long_line(line: str, max_chars: int) -> List[str]:
+    """Cut an over-long line on sentence ends, or hard-cut as a last resort."""
+    parts = []
+    current = ''
+    for sentence in re.split(r'(?<=[.!?])\s+', line):
+        while len(sentence) > max_chars:
+            parts.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
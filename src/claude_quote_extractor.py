@@ -1,37 +1,82 @@
 import os
 import json
-import anthropic
-from typing import List, Dict
+import time
+import asyncio
+import hashlib
+import threading
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple
+from cache import DiskCache
+from chunking import split_transcript
+from rate_limiter import RateLimiter
+from resilience import RequestGuard
+from telemetry import Telemetry
+from utils import write_json_atomic
 
-if not os.getenv("ANTHROPIC_API_KEY"):
-    raise Exception("Missing ANTHROPIC_API_KEY in secrets")
+if TYPE_CHECKING:
+    import anthropic
 
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+MODEL = "claude-3-5-sonnet-20241022"
+# Room for 15 quotes as tool input JSON
+MAX_TOKENS = 4096
+TEMPERATURE = 0.5
+# Cheaper model that ranks the candidates found in each chunk
+REDUCE_MODEL = "claude-3-5-haiku-20241022"
+# Model that fixes malformed quotes, which needs no transcript
+REPAIR_MODEL = REDUCE_MODEL
+# Transcripts estimated above this many tokens are extracted chunk by chunk
+MAX_TRANSCRIPT_TOKENS = 150000
+QUOTE_COUNT = 15
+# Bump whenever the prompt or request format changes so cached responses
+# from the old prompt are not reused
+PROMPT_VERSION = 3
 
+# Quotes come back as the input of this tool, so every reply is typed JSON
+QUOTE_FIELDS = ('speaker', 'speaker_name', 'description', 'quote', 'hashtag')
+QUOTE_TOOL = {
+    "name": "record_quotes",
+    "description": "Record the selected quotes, most significant first.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "quotes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "speaker": {
+                            "type": "string",
+                            "description": "Speaker role, e.g. CEO or CFO"
+                        },
+                        "speaker_name": {
+                            "type": "string",
+                            "description": "Speaker name, empty if unknown"
+                        },
+                        "description": {
+                            "type": "string",
+                            "description": "Why the quote matters, in a few "
+                            "words"
+                        },
+                        "quote": {
+                            "type": "string",
+                            "description": "Exact words from the transcript, "
+                            "without surrounding quotation marks"
+                        },
+                        "hashtag": {
+                            "type": "string",
+                            "description": "The company hashtag, e.g. #Zomato"
+                        }
+                    },
+                    "required": ["speaker", "description", "quote", "hashtag"]
+                }
+            }
+        },
+        "required": ["quotes"]
+    }
+}
 
-class ClaudeQuoteExtractor:
-    """Extract quotes from earnings call transcripts using Claude API."""
-
-    def __init__(self):
-        """Initialize the Claude client."""
-        self.client = client  # Use the already initialized client
-
-    def extract_quotes(self,
-                       text: str,
-                       company_name: str,
-                       file_path: str = '') -> List[Dict]:
-        """
-        Extract the most compelling quotes using Claude API.
-        
-        Args:
-            text (str): The earnings call transcript text
-            company_name (str): Name of the company
-            file_path (str): Path to the PDF file
-            
-        Returns:
-            List[Dict]: List of extracted quotes with metadata
-        """
-        prompt = f"""You are an expert financial analyst with deep experience in earnings call analysis. Review this transcript and identify the 15 most strategically significant quotes, prioritizing those that reveal:
+# Static instruction block shared by every request; only the company name
+# and the transcript go into the per-call user message
+SYSTEM_PROMPT = """You are an expert financial analyst with deep experience in earnings call analysis. Review the transcript you are given and identify the 15 most strategically significant quotes, prioritizing those that reveal:
 
 HIGH PRIORITY SIGNALS:
 - Major strategic shifts and market or industry trends
@@ -57,18 +102,235 @@ QUOTE SELECTION CRITERIA:
 - Highlight unexpected or contrarian viewpoints
 
 For each quote, provide:
-1. Speaker role: [SPEAKER] (Role - CEO, CFO, CTO, etc.)
-2. Speaker name: [SPEAKER_NAME] (Name of the speaker)
-3. Strategic Impact: [DESCRIPTION] (Brief analysis of why this quote matters for the company's future)
-4. Verbatim Quote: [QUOTE] (Exact words from the transcript)
-5. Hashtag: #{company_name} (One-word Hashtag of the company name with no space)
+1. speaker: Speaker role (CEO, CFO, CTO, etc.)
+2. speaker_name: Name of the speaker
+3. description: Strategic impact (brief analysis of why this quote matters for the company's future)
+4. quote: Verbatim quote (exact words from the transcript)
+5. hashtag: The company hashtag given with the transcript (one word, no spaces)
+
+Record the quotes with the record_quotes tool, most significant first."""
+
+REPAIR_PROMPT = """Company: {company_name}
+Company hashtag: {hashtag}
+
+These quotes were recorded with missing or malformed fields:
+
+{items}
+
+Record them again with the record_quotes tool, fixing only the listed problems. Never change the words of a quote; leave out any quote that cannot be fixed without inventing content."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
 
-Format each quote as follows:
-{company_name} [SPEAKER] on [DESCRIPTION]:
-"[QUOTE]"
-#{company_name}
+class QuoteStreamParser:
+    """
+    Pull each complete item out of the record_quotes input,
+    {"quotes": [{...}, ...]}, while its JSON is still streaming in.
 
-Note: Do not include any numbering before or after the company name.
+    Tracks nesting and string state across chunks, so every character is
+    looked at once however the stream is split.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List:
+        """
+        Add streamed JSON text.
+
+        Args:
+            chunk (str): Next piece of the tool input JSON
+
+        Returns:
+            List: Items of the quotes array completed by this chunk (the
+                raw text of an item if it is not valid JSON)
+        """
+        self.buffer += chunk
+        items = []
+        for index in range(self._scanned, len(self.buffer)):
+            char = self.buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                # Depth 1 is the input object, 2 the quotes array
+                if self._depth == 3 and char == '{':
+                    self._item_start = index
+            elif char in '}]':
+                if self._depth == 3 and self._item_start is not None:
+                    raw = self.buffer[self._item_start:index + 1]
+                    try:
+                        items.append(json.loads(raw))
+                    except ValueError:
+                        items.append(raw)
+                    self._item_start = None
+                self._depth -= 1
+        self._scanned = len(self.buffer)
+        return items
+
+
+# Shared client of the default endpoint, created on first use
+_client = None
+_client_lock = threading.Lock()
+
+
+def api_key() -> str:
+    """The Anthropic API key, checked only when a client is needed."""
+    key = os.getenv("ANTHROPIC_API_KEY")
+    if not key:
+        raise Exception("Missing ANTHROPIC_API_KEY in secrets")
+    return key
+
+
+def make_client(base_url: Optional[str] = None, use_async: bool = False):
+    """
+    Build an Anthropic client. The SDK is imported here rather than at
+    module import, which keeps offline commands fast.
+
+    Retries are left to RequestGuard, which shares one policy across
+    callers, so the client itself never retries.
+
+    Args:
+        base_url (str): Alternative API endpoint
+        use_async (bool): Build an AsyncAnthropic client
+
+    Returns:
+        anthropic.Anthropic or anthropic.AsyncAnthropic
+    """
+    import anthropic
+    client_class = anthropic.AsyncAnthropic if use_async \
+        else anthropic.Anthropic
+    return client_class(api_key=api_key(), base_url=base_url, max_retries=0)
+
+
+def default_client():
+    """The shared client of the default endpoint."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = make_client()
+        return _client
+
+
+class ClaudeQuoteExtractor:
+    """Extract quotes from earnings call transcripts using Claude API."""
+
+    def __init__(self,
+                 base_url: Optional[str] = None,
+                 max_concurrency: int = 5,
+                 requests_per_minute: Optional[float] = 50,
+                 tokens_per_minute: Optional[float] = None,
+                 response_cache: Optional[DiskCache] = None,
+                 chunk_tokens: int = 30000,
+                 candidates_per_chunk: int = 8,
+                 always_chunk: bool = False,
+                 max_retries: int = 6,
+                 telemetry: Optional[Telemetry] = None):
+        """
+        Initialize the Claude client.
+
+        Args:
+            base_url (str): Alternative API endpoint, e.g. a local stub server
+            max_concurrency (int): Most requests in flight at once across
+                every thread and event loop; the limit adapts below this
+                when the API is overloaded
+            requests_per_minute (float): Request budget, unlimited if None
+            tokens_per_minute (float): Input plus output token budget,
+                unlimited if None
+            response_cache (DiskCache): Cache of raw Claude responses; an
+                identical request is answered from it without an API call
+            chunk_tokens (int): Size of each chunk in map-reduce mode
+            candidates_per_chunk (int): Candidate quotes asked for per chunk
+            always_chunk (bool): Use map-reduce mode for every transcript,
+                not only those above MAX_TRANSCRIPT_TOKENS
+            max_retries (int): Retries of a failed API call (rate limited,
+                overloaded, server error or timeout) before giving up
+            telemetry (Telemetry): Receives the latency, token usage and
+                cost of each call and the outcome of parsing each reply
+        """
+        # Clients are created on first use, see client
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.base_url = base_url
+        # Async client of the event loop running in each thread
+        self._loop_state = threading.local()
+        self._usage_lock = threading.Lock()
+        self.max_concurrency = max(1, max_concurrency)
+        self.chunk_tokens = chunk_tokens
+        self.candidates_per_chunk = candidates_per_chunk
+        self.always_chunk = always_chunk
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.guard = RequestGuard(self.max_concurrency, max_retries)
+        self.response_cache = response_cache
+        self.telemetry = telemetry or Telemetry()
+        # Token usage per stage ('extract', or 'map'/'reduce' when chunked,
+        # and 'repair')
+        self.usage_by_stage: Dict[str, Dict[str, int]] = {}
+        # Quotes received, malformed, repaired and dropped, see parse_summary
+        self.parse_stats: Dict[str, int] = {}
+
+    @property
+    def client(self):
+        """Sync client, created on the first request."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = make_client(self.base_url) \
+                        if self.base_url else default_client()
+        return self._client
+
+    @property
+    def async_client(self) -> 'anthropic.AsyncAnthropic':
+        """Async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        state = self._loop_state
+        if getattr(state, 'loop', None) is not loop:
+            # httpx connections cannot be shared between event loops
+            state.client = make_client(self.base_url, use_async=True)
+            state.loop = loop
+        return state.client
+
+    def run_async(self, coroutine):
+        """
+        Run a coroutine on a new event loop in this thread and close the
+        async client made for that loop before the loop ends.
+
+        Args:
+            coroutine: E.g. extract_quotes_chunked(...)
+
+        Returns:
+            The coroutine's result
+        """
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                state = self._loop_state
+                if getattr(state, 'loop', None) is asyncio.get_running_loop():
+                    client, state.client, state.loop = state.client, None, None
+                    await client.close()
+
+        return asyncio.run(run())
+
+    def _build_prompt(self, text: str, company_name: str) -> str:
+        """Build the per-call part of the prompt for one transcript."""
+        return f"""Company: {company_name}
+Company hashtag: #{company_name.replace(' ', '')}
 
 Transcript:
 {text}
@@ -78,69 +340,731 @@ Please analyze and return exactly 15 quotes that represent the most strategicall
 Note: Please maintain verbatim accuracy in quotes while ensuring the social media versions preserve the core message.
 """
 
-        # Get Claude's analysis
-        message = self.client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=2000,
-            temperature=0.5,
-            messages=[{
+    def build_request(self, text: str, company_name: str) -> Dict:
+        """Build the messages.create arguments for one transcript."""
+        return self._request(self._build_prompt(text, company_name))
+
+    def _request(self, prompt: str, model: str = MODEL) -> Dict:
+        """Wrap a per-call prompt with the shared, cached instructions."""
+        return {
+            'model': model,
+            'max_tokens': MAX_TOKENS,
+            'temperature': TEMPERATURE,
+            # The instructions are identical for every call, so they are
+            # marked for provider-side prompt caching
+            'system': [{
+                "type": "text",
+                "text": SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            'messages': [{
                 "role": "user",
                 "content": prompt
-            }])
+            }],
+            'tools': [QUOTE_TOOL],
+            'tool_choice': {"type": "tool", "name": QUOTE_TOOL['name']}
+        }
 
-        # Parse response and structure quotes
-        quotes = []
-        raw_quotes = message.content[0].text.strip().split('\n\n')
+    def _estimate_request_tokens(self, params: Dict) -> int:
+        """Estimate the input plus worst-case output tokens of a request."""
+        prompt = ''.join(block['text'] for block in params.get('system', []))
+        prompt += params['messages'][0]['content']
+        prompt += json.dumps(params.get('tools', []))
+        return estimate_tokens(prompt) + params['max_tokens']
 
-        for quote in raw_quotes:
-            if not quote.strip():
-                continue
+    def extract_quotes(self,
+                       text: str,
+                       company_name: str,
+                       file_path: str = '') -> List[Dict]:
+        """
+        Extract the most compelling quotes using Claude API.
+        
+        Args:
+            text (str): The earnings call transcript text
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+            
+        Returns:
+            List[Dict]: List of extracted quotes with metadata
+        """
+        if self.needs_chunking(text):
+            return self.run_async(
+                self.extract_quotes_chunked(text, company_name, file_path))
 
-            # Parse the quote components
-            try:
-                header, quote_text, hashtag = quote.split('\n')
-                speaker = header.split(' on ')[0].replace(
-                    f"{company_name} ", "")
-                description = header.split(' on ')[1].rstrip(':')
-
-                # Extract speaker role and name from format "ROLE [NAME]"
-                if '[' in speaker and ']' in speaker:
-                    speaker_role = speaker.split('[')[0].strip()
-                    speaker_name = speaker.split('[')[1].split(']')[0].strip()
+        params = self.build_request(text, company_name)
+        response_text = self._complete(params, company_name, file_path)
+        return self.finish_quotes(response_text, company_name, file_path)
+
+    def stream_quotes(self,
+                      text: str,
+                      company_name: str,
+                      file_path: str = '') -> Iterator[Dict]:
+        """
+        Extract quotes like extract_quotes, yielding each quote as soon as
+        it has streamed in instead of after the whole reply.
+
+        If the stream breaks, the quotes already yielded stand and the
+        error is raised. Malformed quotes are repaired once the reply is
+        complete and yielded last. Replies from the response cache and
+        transcripts that need map-reduce are yielded all at once.
+
+        Args:
+            text (str): The earnings call transcript text
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+
+        Yields:
+            Dict: Extracted quotes with metadata, most significant first
+        """
+        if self.needs_chunking(text):
+            yield from self.extract_quotes(text, company_name, file_path)
+            return
+        params = self.build_request(text, company_name)
+        response_text = self._cached_response(params)
+        if response_text is not None:
+            yield from self.finish_quotes(response_text, company_name,
+                                          file_path)
+            return
+
+        estimated = self._estimate_request_tokens(params)
+        self.rate_limiter.acquire(estimated)
+        started = time.monotonic()
+        parser = QuoteStreamParser()
+        malformed = []
+        count = 0
+        # Only opening the stream is retried; a reply cut off midway is not
+        with self.guard.open_stream(self._open_stream, params) as stream:
+            for event in stream:
+                if (event.type != 'content_block_delta' or
+                        event.delta.type != 'input_json_delta'):
+                    continue
+                for item in parser.feed(event.delta.partial_json):
+                    problems = self.validate_quote(item)
+                    if problems:
+                        malformed.append((count, item, problems))
+                    else:
+                        yield self._make_quote(item, company_name, file_path)
+                    count += 1
+            message = stream.get_final_message()
+
+        self.record_usage(message, company_name, estimated,
+                          model=params['model'],
+                          seconds=time.monotonic() - started,
+                          file_path=file_path)
+        if message.stop_reason is None:
+            # The connection closed before the reply was complete
+            raise Exception(f"Claude stream for {company_name} ended early "
+                            f"after {count} quotes")
+        response_text = self.response_text(message)
+        self.cache_response(params, response_text, company_name, file_path)
+        if count == 0:
+            # Nothing streamed, e.g. a text reply or quotes sent as a JSON
+            # string; parse the reply as a whole
+            yield from self.finish_quotes(response_text, company_name,
+                                          file_path)
+            return
+        self._count(replies=1, quotes=count, malformed=len(malformed))
+        if malformed:
+            print(f"Warning: {len(malformed)} of {count} quotes from "
+                  f"{company_name} (extract) are malformed: "
+                  f"{'; '.join(', '.join(p) for _, _, p in malformed)}")
+            repaired: List[Optional[Dict]] = [None] * count
+            self._merge_repaired(
+                repaired, malformed,
+                self._complete(self._repair_request(malformed, company_name),
+                               company_name, file_path, stage='repair'),
+                company_name, file_path)
+            yield from (quote for quote in repaired if quote is not None)
+
+    def _open_stream(self, params: Dict):
+        """Send a streaming request and return the stream once it answers."""
+        return self.client.messages.stream(**params).__enter__()
+
+    async def extract_quotes_async(self,
+                                   text: str,
+                                   company_name: str,
+                                   file_path: str = '') -> List[Dict]:
+        """
+        Extract quotes like extract_quotes, using the async client.
+
+        Args:
+            text (str): The earnings call transcript text
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+
+        Returns:
+            List[Dict]: List of extracted quotes with metadata
+        """
+        if self.needs_chunking(text):
+            return await self.extract_quotes_chunked(text, company_name,
+                                                     file_path)
+
+        params = self.build_request(text, company_name)
+        response_text = await self._complete_async(params, company_name,
+                                                   file_path)
+        return await self._finish_async(response_text, company_name,
+                                        file_path)
+
+    async def extract_quotes_chunked(self,
+                                     text: str,
+                                     company_name: str,
+                                     file_path: str = '') -> List[Dict]:
+        """
+        Extract quotes from a long transcript with map-reduce.
+
+        The transcript is split on speaker-turn/section boundaries, each
+        chunk yields a few candidate quotes in parallel (map), and a cheap
+        final call ranks the candidates and keeps the top 15 (reduce).
+
+        Args:
+            text (str): The earnings call transcript text
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+
+        Returns:
+            List[Dict]: List of extracted quotes with metadata
+        """
+        chunks = split_transcript(text, self.chunk_tokens * 4)
+
+        async def run_map(index, chunk):
+            params = self._request(
+                self._build_map_prompt(chunk, company_name, index,
+                                       len(chunks)))
+            response_text = await self._complete_async(
+                params, company_name, file_path, stage='map')
+            return await self._finish_async(response_text, company_name,
+                                            file_path, stage='map')
+
+        candidates = [
+            quote for quotes in await asyncio.gather(
+                *(run_map(i, chunk) for i, chunk in enumerate(chunks)))
+            for quote in quotes
+        ]
+        if len(candidates) <= QUOTE_COUNT:
+            return candidates
+
+        params = self._request(
+            self._build_reduce_prompt(candidates, company_name),
+            model=REDUCE_MODEL)
+        response_text = await self._complete_async(params, company_name,
+                                                   file_path, stage='reduce')
+        return await self._finish_async(response_text, company_name,
+                                        file_path, stage='reduce')
+
+    def needs_chunking(self, text: str) -> bool:
+        """Whether a transcript should go through map-reduce extraction."""
+        return (self.always_chunk or
+                estimate_tokens(text) > MAX_TRANSCRIPT_TOKENS)
+
+    def _build_map_prompt(self, chunk: str, company_name: str, index: int,
+                          total: int) -> str:
+        """Build the prompt asking one chunk for candidate quotes."""
+        return f"""Company: {company_name}
+Company hashtag: #{company_name.replace(' ', '')}
+
+Transcript excerpt {index + 1} of {total}:
+{chunk}
+
+This is only part of the transcript. Instead of 15 quotes, record at most {self.candidates_per_chunk} candidate quotes from this excerpt that are the strongest candidates for the final selection. Record fewer if the excerpt has nothing significant.
+
+Note: Please maintain verbatim accuracy in quotes.
+"""
+
+    def _build_reduce_prompt(self, candidates: List[Dict],
+                             company_name: str) -> str:
+        """Build the prompt ranking the candidates from every chunk."""
+        hashtag = f"#{company_name.replace(' ', '')}"
+        rendered = json.dumps(
+            [{'speaker': q['speaker'], 'speaker_name': q['speaker_name'],
+              'description': q['description'], 'quote': q['quote'],
+              'hashtag': hashtag} for q in candidates], indent=1)
+        return f"""Company: {company_name}
+Company hashtag: {hashtag}
+
+Candidate quotes collected from every part of the transcript:
+
+{rendered}
+
+Select the {QUOTE_COUNT} candidates that represent the most strategically significant insights for investors and analysts and record them unchanged, most significant first. Do not write new quotes.
+"""
+
+    def _complete(self, params: Dict, company_name: str, file_path: str,
+                  stage: str = 'extract') -> str:
+        """Return Claude's reply to a request, from the cache if possible."""
+        response_text = self._cached_response(params)
+        if response_text is None:
+            estimated = self._estimate_request_tokens(params)
+            self.rate_limiter.acquire(estimated)
+
+            # Get Claude's analysis
+            started = time.monotonic()
+            message = self.guard.call(self.client.messages.create, **params)
+            self.record_usage(message, company_name, estimated, stage,
+                              model=params['model'],
+                              seconds=time.monotonic() - started,
+                              file_path=file_path)
+            response_text = self.response_text(message)
+            self.cache_response(params, response_text, company_name,
+                                file_path, stage)
+        return response_text
+
+    async def _complete_async(self, params: Dict, company_name: str,
+                              file_path: str, stage: str = 'extract') -> str:
+        """
+        Async version of _complete. Requests in flight are bounded by the
+        guard's limit, which every thread and event loop shares.
+        """
+        response_text = self._cached_response(params)
+        if response_text is None:
+            estimated = self._estimate_request_tokens(params)
+            await self.rate_limiter.acquire_async(estimated)
+            started = time.monotonic()
+            message = await self.guard.call_async(
+                self.async_client.messages.create, **params)
+            self.record_usage(message, company_name, estimated, stage,
+                              model=params['model'],
+                              seconds=time.monotonic() - started,
+                              file_path=file_path)
+            response_text = self.response_text(message)
+            self.cache_response(params, response_text, company_name,
+                                file_path, stage)
+        return response_text
+
+    @staticmethod
+    def _cache_key(params: Dict) -> str:
+        """Hash the prompt version and the full request (model, temperature,
+        prompt and transcript) into a response cache key."""
+        payload = json.dumps({'prompt_version': PROMPT_VERSION, **params},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cached_response(self, params: Dict) -> Optional[str]:
+        """Return the cached response text for a request, if any."""
+        if self.response_cache is None:
+            return None
+        entry = self.response_cache.get(self._cache_key(params))
+        return entry['response_text'] if entry else None
+
+    def cache_response(self, params: Dict, response_text: str,
+                       company_name: str, file_path: str,
+                       stage: str = 'extract'):
+        """Store a response so identical requests skip the API."""
+        if self.response_cache is not None:
+            self.response_cache.put(self._cache_key(params), {
+                'stage': stage,
+                'model': params['model'],
+                'prompt_version': PROMPT_VERSION,
+                'temperature': params['temperature'],
+                'company_name': company_name,
+                'file_path': file_path,
+                'response_text': response_text
+            })
+
+    def reparse_cached(self, text: str, company_name: str,
+                       file_path: str = '') -> Optional[List[Dict]]:
+        """
+        Re-parse the cached response for a transcript with the current
+        parser, without calling the API.
+
+        Args:
+            text (str): The earnings call transcript text
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+
+        Returns:
+            Optional[List[Dict]]: Quotes, or None if nothing is cached
+        """
+        if self.needs_chunking(text):
+            # Only the final reduce step is re-parsed; rebuilding its key
+            # needs the map results, so look for the cached map replies
+            candidates = []
+            chunks = split_transcript(text, self.chunk_tokens * 4)
+            for index, chunk in enumerate(chunks):
+                response_text = self._cached_response(self._request(
+                    self._build_map_prompt(chunk, company_name, index,
+                                           len(chunks))))
+                if response_text is None:
+                    return None
+                candidates.extend(self.parse_response(
+                    response_text, company_name, file_path))
+            if len(candidates) <= QUOTE_COUNT:
+                return candidates
+            params = self._request(
+                self._build_reduce_prompt(candidates, company_name),
+                model=REDUCE_MODEL)
+        else:
+            params = self.build_request(text, company_name)
+
+        response_text = self._cached_response(params)
+        if response_text is None:
+            return None
+        return self.parse_response(response_text, company_name, file_path)
+
+    def record_usage(self, message, company_name: str,
+                     estimated: Optional[int] = None,
+                     stage: str = 'extract',
+                     model: str = MODEL,
+                     seconds: Optional[float] = None,
+                     file_path: str = '',
+                     batch: bool = False):
+        """
+        Report cached vs. uncached input tokens for one response, add them
+        to the running totals of its stage, correct the token budget and
+        pass usage and cost on to telemetry.
+
+        Args:
+            message: Claude response
+            company_name (str): Name of the company, for the report
+            estimated (int): Tokens reserved from the rate limiter
+            stage (str): 'extract', or 'map'/'reduce' in map-reduce mode
+            model (str): Model requested, if the response does not name it
+            seconds (float): Latency of the call, retries included
+            file_path (str): Path to the PDF file
+            batch (bool): Whether the response came from a Message Batch
+        """
+        usage = getattr(message, 'usage', None)
+        if usage is None:
+            return
+        cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+
+        with self._usage_lock:
+            totals = self.usage_by_stage.setdefault(stage, {
+                'requests': 0,
+                'input_tokens': 0,
+                'cache_read_input_tokens': 0,
+                'cache_creation_input_tokens': 0,
+                'output_tokens': 0
+            })
+            totals['requests'] += 1
+            totals['input_tokens'] += usage.input_tokens
+            totals['cache_read_input_tokens'] += cache_read
+            totals['cache_creation_input_tokens'] += cache_write
+            totals['output_tokens'] += usage.output_tokens
+        print(f"Token usage for {company_name} ({stage}): {usage.input_tokens} "
+              f"uncached input, {cache_read} cached input, {cache_write} "
+              f"written to cache, {usage.output_tokens} output")
+        self.telemetry.record_llm_call(
+            getattr(message, 'model', None) or model, stage,
+            usage.input_tokens, usage.output_tokens, cache_write, cache_read,
+            seconds=seconds, batch=batch, company=company_name,
+            file=file_path)
+
+        if estimated is not None:
+            self.rate_limiter.reconcile(
+                estimated, usage.input_tokens + cache_read + cache_write +
+                usage.output_tokens)
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:
+        """Token usage summed over every stage."""
+        totals: Dict[str, int] = {}
+        for stage_totals in self.usage_by_stage.values():
+            for key, value in stage_totals.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @staticmethod
+    def _format_usage(totals: Dict[str, int]) -> str:
+        total_input = (totals.get('input_tokens', 0) +
+                       totals.get('cache_read_input_tokens', 0) +
+                       totals.get('cache_creation_input_tokens', 0))
+        cache_read = totals.get('cache_read_input_tokens', 0)
+        cached_share = 100.0 * cache_read / total_input if total_input else 0.0
+        return (f"{totals.get('requests', 0)} requests, {total_input} input "
+                f"tokens ({cache_read} cached, {cached_share:.0f}%; "
+                f"{totals.get('cache_creation_input_tokens', 0)} written to "
+                f"cache), {totals.get('output_tokens', 0)} output tokens")
+
+    def usage_summary(self) -> str:
+        """Return a summary of token usage so far, per stage if chunked."""
+        summary = self._format_usage(self.usage_totals)
+        if len(self.usage_by_stage) > 1:
+            for stage, totals in self.usage_by_stage.items():
+                summary += f"\n  {stage}: {self._format_usage(totals)}"
+        return summary
+
+    @staticmethod
+    def response_text(message) -> str:
+        """
+        The reply of a message as cached and parsed: the record_quotes tool
+        input as JSON, or the text if Claude answered without the tool.
+        """
+        for block in message.content:
+            if (getattr(block, 'type', None) == 'tool_use' and
+                    block.name == QUOTE_TOOL['name']):
+                return json.dumps(block.input)
+        return ''.join(getattr(block, 'text', '') for block in message.content)
+
+    def _count(self, **counts: int):
+        with self._usage_lock:
+            for key, value in counts.items():
+                self.parse_stats[key] = self.parse_stats.get(key, 0) + value
+        for key, value in counts.items():
+            self.telemetry.count('parse_total', value, kind=key)
+
+    def parse_response(self, response_text: str, company_name: str,
+                       file_path: str) -> List[Dict]:
+        """
+        Parse Claude's reply into quote dicts without calling the API:
+        malformed quotes are replaced by a cached repair if there is one
+        and dropped otherwise.
+
+        Args:
+            response_text (str): Tool input JSON (or text) of Claude's reply
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+
+        Returns:
+            List[Dict]: List of extracted quotes with metadata
+        """
+        quotes, malformed = self._parse(response_text, company_name,
+                                        file_path)
+        if malformed:
+            repaired = self._cached_response(
+                self._repair_request(malformed, company_name))
+            self._merge_repaired(quotes, malformed, repaired or '',
+                                 company_name, file_path)
+        return [quote for quote in quotes if quote is not None]
+
+    def finish_quotes(self, response_text: str, company_name: str,
+                      file_path: str, stage: str = 'extract') -> List[Dict]:
+        """
+        Parse Claude's reply into quote dicts and send only the malformed
+        quotes, if any, back in one small repair call.
+
+        Args:
+            response_text (str): Tool input JSON (or text) of Claude's reply
+            company_name (str): Name of the company
+            file_path (str): Path to the PDF file
+            stage (str): Stage of the reply, for the repair call's usage
+
+        Returns:
+            List[Dict]: List of extracted quotes with metadata
+        """
+        quotes, malformed = self._parse(response_text, company_name,
+                                        file_path, stage)
+        if malformed:
+            repaired = self._complete(
+                self._repair_request(malformed, company_name), company_name,
+                file_path, stage='repair')
+            self._merge_repaired(quotes, malformed, repaired, company_name,
+                                 file_path)
+        return [quote for quote in quotes if quote is not None]
+
+    async def _finish_async(self, response_text: str, company_name: str,
+                            file_path: str, stage: str = 'extract'
+                            ) -> List[Dict]:
+        """Async version of finish_quotes."""
+        quotes, malformed = self._parse(response_text, company_name,
+                                        file_path, stage)
+        if malformed:
+            repaired = await self._complete_async(
+                self._repair_request(malformed, company_name), company_name,
+                file_path, stage='repair')
+            self._merge_repaired(quotes, malformed, repaired, company_name,
+                                 file_path)
+        return [quote for quote in quotes if quote is not None]
+
+    def _parse(self, response_text: str, company_name: str, file_path: str,
+               stage: str = 'extract'
+               ) -> Tuple[List[Optional[Dict]], List[Tuple[int, Dict,
+                                                           List[str]]]]:
+        """
+        Split a reply into valid quotes and malformed items.
+
+        Returns:
+            Tuple: Quotes in reply order with None where an item is
+                malformed, and (position, item, problems) of each malformed
+                item
+        """
+        with self.telemetry.stage('quote_parse', file=file_path,
+                                  company=company_name,
+                                  reply_stage=stage) as timer:
+            items = self._reply_items(response_text)
+            if items is None:
+                # Claude answered in text; fall back to the old text format
+                self._count(text_replies=1)
+                items = self._parse_text_items(response_text, company_name)
+            quotes: List[Optional[Dict]] = []
+            malformed = []
+            for position, item in enumerate(items):
+                problems = self.validate_quote(item)
+                if problems:
+                    malformed.append((position, item, problems))
+                    quotes.append(None)
                 else:
-                    speaker_role = speaker
-                    speaker_name = ''
-
-                # Get fiscal year and quarter from file path
-                path_parts = file_path.split(os.sep)
-                fiscal_year = next(
-                    (part for part in path_parts if part.startswith('FY')), '')
-                quarter = next(
-                    (part for part in path_parts if part.startswith('Q')), '')
-
-                quotes.append({
-                    'company':
-                    company_name,
-                    'speaker':
-                    speaker_role,
-                    'speaker_name':
-                    speaker_name,
-                    'description':
-                    description,
-                    'quote':
-                    quote_text.strip('"'),
-                    'hashtag':
-                    f"{hashtag.strip()} #{fiscal_year}{quarter}"
-                })
-            except Exception as e:
-                print(f"Warning: Failed to parse quote: {str(e)}")
-
-        return quotes
+                    quotes.append(self._make_quote(item, company_name,
+                                                   file_path))
+            timer.note(quotes=len(items), malformed=len(malformed))
+        self._count(replies=1, quotes=len(items), malformed=len(malformed))
+        if malformed:
+            print(f"Warning: {len(malformed)} of {len(items)} quotes from "
+                  f"{company_name} ({stage}) are malformed: "
+                  f"{'; '.join(', '.join(p) for _, _, p in malformed)}")
+        return quotes, malformed
+
+    @staticmethod
+    def _reply_items(response_text: str) -> Optional[List]:
+        """Quote items of a tool reply, or None if it is not one."""
+        try:
+            payload = json.loads(response_text)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        items = payload.get('quotes')
+        if isinstance(items, str):
+            # Occasionally the array arrives encoded as a string
+            try:
+                items = json.loads(items)
+            except ValueError:
+                return []
+        return items if isinstance(items, list) else []
+
+    @staticmethod
+    def validate_quote(item) -> List[str]:
+        """
+        Check one quote item from a reply.
+
+        Args:
+            item: Item of the record_quotes 'quotes' array
+
+        Returns:
+            List[str]: Problems found, empty if the item is usable
+        """
+        if not isinstance(item, dict):
+            return [f"not an object: {str(item)[:40]}"]
+        problems = []
+        for field in ('speaker', 'description', 'quote'):
+            value = item.get(field)
+            if not isinstance(value, str) or not value.strip():
+                problems.append(f"missing {field}")
+        for field in ('speaker_name', 'hashtag'):
+            if item.get(field) is not None and not isinstance(item[field],
+                                                              str):
+                problems.append(f"{field} is not text")
+        quote = item.get('quote')
+        if isinstance(quote, str) and len(quote.split()) < 3:
+            problems.append(f"quote too short: {quote[:40]!r}")
+        return problems
+
+    @staticmethod
+    def _make_quote(item: Dict, company_name: str, file_path: str) -> Dict:
+        """Build the saved quote dict from a valid item."""
+        # Get fiscal year and quarter from file path
+        path_parts = file_path.split(os.sep)
+        fiscal_year = next(
+            (part for part in path_parts if part.startswith('FY')), '')
+        quarter = next(
+            (part for part in path_parts if part.startswith('Q')), '')
+        hashtag = (item.get('hashtag') or '').strip().replace(' ', '')
+        if not hashtag.startswith('#'):
+            hashtag = f"#{hashtag or company_name.replace(' ', '')}"
+        return {
+            'company': company_name,
+            'speaker': item['speaker'].strip(),
+            'speaker_name': (item.get('speaker_name') or '').strip(),
+            'description': item['description'].strip().rstrip(':'),
+            'quote': ' '.join(item['quote'].split()).strip('"“”'),
+            'hashtag': f"{hashtag} #{fiscal_year}{quarter}"
+        }
+
+    @staticmethod
+    def _parse_text_items(response_text: str,
+                          company_name: str) -> List[Dict]:
+        """
+        Read quotes in the pre-tool text format:
+        "COMPANY ROLE [NAME] on DESCRIPTION:" / "QUOTE" / HASHTAG.
+        Blocks that do not fit give items with the fields left empty.
+        """
+        items = []
+        for block in response_text.strip().split('\n\n'):
+            if not block.strip():
+                continue
+            lines = block.strip().split('\n')
+            header = lines[0]
+            speaker, _, description = header.partition(' on ')
+            speaker = speaker.replace(f"{company_name} ", "")
+            speaker_name = ''
+            # Extract speaker role and name from format "ROLE [NAME]"
+            if '[' in speaker and ']' in speaker:
+                speaker_name = speaker.split('[')[1].split(']')[0].strip()
+                speaker = speaker.split('[')[0].strip()
+            items.append({
+                'speaker': speaker,
+                'speaker_name': speaker_name,
+                'description': description.rstrip(':'),
+                'quote': lines[1].strip('"') if len(lines) > 1 else '',
+                'hashtag': lines[2].strip() if len(lines) > 2 else ''
+            })
+        return items
+
+    def _repair_request(self, malformed: List[Tuple[int, Dict, List[str]]],
+                        company_name: str) -> Dict:
+        """Build the call that fixes only the malformed items."""
+        items = json.dumps(
+            [{'item': item, 'problems': problems}
+             for _, item, problems in malformed], indent=1)
+        params = self._request(REPAIR_PROMPT.format(
+            company_name=company_name,
+            hashtag=f"#{company_name.replace(' ', '')}", items=items),
+            model=REPAIR_MODEL)
+        params['max_tokens'] = min(MAX_TOKENS, 300 * len(malformed) + 200)
+        return params
+
+    def _merge_repaired(self, quotes: List[Optional[Dict]],
+                        malformed: List[Tuple[int, Dict, List[str]]],
+                        response_text: str, company_name: str,
+                        file_path: str):
+        """
+        Put repaired quotes back in the places of the malformed items;
+        items that are still malformed are dropped.
+        """
+        if response_text:
+            self._count(repair_calls=1)
+        fixed = [item for item in (self._reply_items(response_text) or [])
+                 if not self.validate_quote(item)]
+        # Match repairs to the originals by quote text where possible,
+        # otherwise in order
+        remaining = list(malformed)
+        for item in fixed:
+            match = next((entry for entry in remaining
+                          if isinstance(entry[1], dict) and
+                          entry[1].get('quote') == item['quote']),
+                         remaining[0] if remaining else None)
+            if match is None:
+                break
+            remaining.remove(match)
+            quotes[match[0]] = self._make_quote(item, company_name, file_path)
+        self._count(repaired=len(malformed) - len(remaining),
+                    dropped=len(remaining),
+                    wasted_output_tokens=sum(
+                        estimate_tokens(json.dumps(item))
+                        for _, item, _ in remaining))
+        print(f"Repaired {len(malformed) - len(remaining)} of "
+              f"{len(malformed)} malformed quotes from {company_name}")
+
+    def parse_summary(self) -> str:
+        """Return how many quotes were malformed, repaired and dropped."""
+        stats = self.parse_stats
+        quotes = stats.get('quotes', 0)
+        malformed = stats.get('malformed', 0)
+        rate = 100.0 * malformed / quotes if quotes else 0.0
+        summary = (f"{quotes} quotes in {stats.get('replies', 0)} replies, "
+                   f"{malformed} malformed ({rate:.1f}%), "
+                   f"{stats.get('repaired', 0)} repaired in "
+                   f"{stats.get('repair_calls', 0)} repair calls, "
+                   f"{stats.get('dropped', 0)} dropped (~"
+                   f"{stats.get('wasted_output_tokens', 0)} output tokens "
+                   f"wasted)")
+        if stats.get('text_replies'):
+            summary += f", {stats['text_replies']} replies without the tool"
+        return summary
 
     def save_quotes_to_json(self, quotes: List[Dict], output_path: str):
-        """Save extracted quotes to a JSON file."""
+        """Save extracted quotes to a JSON file, replacing it atomically."""
         try:
-            with open(output_path, 'w') as f:
-                json.dump(quotes, f, indent=2)
+            write_json_atomic(quotes, output_path)
         except Exception as e:
             print(f"Error saving quotes to JSON: {str(e)}")
@@ -0,0 +1,182 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+# Word endings accepted for inflected terms: "margin" also matches
+# "margins", "guide" matches "guided"/"guiding", "strategy" "strategies"
+_INFLECT = ('', 's', 'es', 'ed', 'ing')
+_INFLECT_E = ('e', 'es', 'ed', 'ing')
+_INFLECT_Y = ('y', 'ies', 'ied')
+_WILDCARD = None  # prefix term, matches any word continuation
+
+# A word of the text; '&' keeps "Q&A" and "M&A" in one word
+WORD = re.compile(r"\w+(?:&\w+)*")
+# What may separate the words of a phrase
+_SEPARATOR_RUN = re.compile(r"[\s\-]+")
+# Bound on remembered word lookups per matcher
+MAX_SEEN_WORDS = 100000
+
+
+class KeywordMatch(NamedTuple):
+    """
+    One lexicon hit: the lexicon term, its weight and where it matched, as
+    offsets into the UTF-8 encoding of the text.
+    """
+    term: str
+    weight: float
+    start: int
+    end: int
+
+
+def _split_term(term: str, inflect: bool) -> Tuple[List[str], Optional[tuple]]:
+    """Return the words of a term and the endings its last word may take."""
+    words = _SEPARATOR_RUN.split(term.lower().strip())
+    words = [word for word in words if word]
+    if not words:
+        return [], ('',)
+    last = words[-1]
+    if last.endswith('*'):
+        words[-1] = last[:-1]
+        return words, _WILDCARD
+    if not inflect or len(last) < 4 or not last.isalpha():
+        return words, ('',)
+    if last.endswith('e'):
+        words[-1] = last[:-1]
+        return words, _INFLECT_E
+    if last.endswith('y') and last[-2] not in 'aeiou':
+        words[-1] = last[:-1]
+        return words, _INFLECT_Y
+    return words, _INFLECT
+
+
+def _phrase_pattern(words: List[str], endings: Optional[tuple]) -> Pattern:
+    """Compile a phrase so it can be matched where its first word starts."""
+    body = r"[\s\-]+".join(re.escape(word) for word in words)
+    if endings is _WILDCARD:
+        tail = r"\w*"
+    else:
+        options = sorted((re.escape(e) for e in endings if e), key=len,
+                         reverse=True)
+        tail = f"(?:{'|'.join(options)})" if options else ''
+        if options and '' in endings:
+            tail += '?'
+    return re.compile(rf"{body}{tail}\b", re.IGNORECASE)
+
+
+class KeywordMatcher:
+    """
+    Single-pass matcher for a weighted lexicon of words and phrases.
+
+    The text is scanned once, word by word, and each word is looked up in
+    hash tables built from the lexicon, so the cost per word does not
+    depend on how many terms the lexicon has. Phrases are indexed by their
+    first word and only checked where that word occurs. Matching is
+    case-insensitive, phrases match across any run of spaces, hyphens or
+    line breaks, terms ending in '*' match as prefixes and other terms also
+    match their plural/past/-ing forms.
+    """
+
+    def __init__(self, lexicon: Dict[str, float], inflect: bool = True):
+        """
+        Build the lookup tables.
+
+        Args:
+            lexicon (Dict[str, float]): Term or phrase -> weight; words of a
+                phrase are separated by spaces or hyphens
+            inflect (bool): Also match simple inflections of each term
+        """
+        self.weights: Dict[str, float] = {}
+        self._forms: Dict[str, str] = {}     # word form -> term
+        self._prefixes: Dict[str, str] = {}  # wildcard prefix -> term
+        self._phrases: Dict[str, List[Tuple[Pattern, str]]] = {}
+        for term, weight in lexicon.items():
+            words, endings = _split_term(term, inflect)
+            if not words or not words[-1]:
+                continue
+            self.weights[term] = weight
+            if len(words) > 1:
+                self._phrases.setdefault(words[0], []).append(
+                    (_phrase_pattern(words, endings), term))
+            elif endings is _WILDCARD:
+                self._prefixes.setdefault(words[0], term)
+            else:
+                for ending in endings:
+                    self._forms.setdefault(words[0] + ending, term)
+
+        # Longer phrases first, so "gross margin" wins over "gross"
+        for candidates in self._phrases.values():
+            candidates.sort(key=lambda c: len(c[0].pattern), reverse=True)
+        self._prefix_lengths = sorted({len(p) for p in self._prefixes},
+                                      reverse=True)
+        # Lookups already made, so repeated words cost one dictionary probe
+        self._seen: Dict[str, Optional[str]] = {}
+
+    def _word_term(self, word: str) -> Optional[str]:
+        """Return the single-word term a lowercased word matches, if any."""
+        term = self._forms.get(word)
+        if term is None:
+            for length in self._prefix_lengths:
+                if length <= len(word):
+                    term = self._prefixes.get(word[:length])
+                    if term is not None:
+                        break
+        if len(self._seen) >= MAX_SEEN_WORDS:
+            self._seen.clear()
+        self._seen[word] = term
+        return term
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """
+        Find every non-overlapping lexicon match in one pass over the text.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            List[KeywordMatch]: Matches in text order, with UTF-8 byte
+            offsets
+        """
+        weights = self.weights
+        phrases = self._phrases
+        seen = self._seen
+        matches = []
+        covered = 0
+        # Byte offsets equal character offsets in ASCII text; otherwise they
+        # are counted up from the previous match as the scan goes
+        ascii_text = text.isascii()
+        char_position = byte_position = 0
+        for word_match in WORD.finditer(text):
+            start = word_match.start()
+            if start < covered:
+                continue
+            word = word_match.group().lower()
+            term = None
+            end = word_match.end()
+            for pattern, phrase_term in phrases.get(word, ()):
+                phrase_match = pattern.match(text, start)
+                if phrase_match:
+                    term, end = phrase_term, phrase_match.end()
+                    break
+            if term is None:
+                term = (seen[word] if word in seen
+                        else self._word_term(word))
+            if term is not None:
+                if ascii_text:
+                    byte_start, byte_end = start, end
+                else:
+                    byte_start = byte_position + len(
+                        text[char_position:start].encode('utf-8'))
+                    byte_end = byte_start + len(
+                        text[start:end].encode('utf-8'))
+                    char_position, byte_position = end, byte_end
+                matches.append(KeywordMatch(term, weights[term], byte_start,
+                                            byte_end))
+                covered = end
+        return matches
+
+    def score(self, text: str) -> float:
+        """Return the summed weight of every match in the text."""
+        return sum(match.weight for match in self.find(text))
+
+    def search(self, text: str) -> bool:
+        """Return whether the text contains any lexicon term."""
+        return bool(self.find(text))
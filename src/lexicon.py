@@ -0,0 +1,102 @@
+# Weighted financial lexicon used to score transcript passages. Terms ending
+# in '*' match as prefixes; other terms also match their simple inflections
+# (see keyword_matcher.KeywordMatcher).
+
+FORWARD_LOOKING_TERMS = [
+    'expect*', 'anticipat*', 'outlook', 'going forward', 'next year',
+    'next quarter', 'next fiscal', 'coming quarters', 'coming years',
+    'over the next', 'medium term', 'long term', 'near term', 'short term',
+    'plan', 'intend*', 'aim', 'target*', 'aspir*', 'ambition', 'pipeline',
+    'roadmap', 'will', 'should', 'would likely', 'likely to', 'on track',
+    'trajectory', 'runway', 'horizon', 'envisage', 'foresee*', 'estimate',
+    'projection', 'project', 'we believe', 'we think', 'we see',
+    'we are seeing', 'we are watching', 'we remain', 'confident',
+    'optimistic', 'cautious*', 'visibility', 'by the end of', 'exit rate',
+    'run rate', 'in the future', 'future', 'eventually', 'over time',
+    'inflection', 'turning point', 'sustainab*', 'structural*',
+]
+
+GUIDANCE_TERMS = [
+    'guidance', 'guide', 'forecast*', 'reiterate', 'reaffirm', 'raise',
+    'lower our', 'revise*', 'upgrade', 'downgrade', 'consensus',
+    'full year', 'full-year', 'annual', 'fy', 'h1', 'h2', 'ytd',
+    'year to date', 'year-on-year', 'year over year', 'yoy',
+    'quarter-on-quarter', 'quarter over quarter', 'qoq', 'sequential*',
+    'basis points', 'bps', 'cagr', 'compounded', 'double digit',
+    'high single digit', 'mid single digit', 'low single digit',
+    'mid-teens', 'high teens', 'break even', 'breakeven',
+]
+
+FINANCIAL_TERMS = [
+    'revenue*', 'sales', 'top line', 'bottom line', 'profit*', 'margin',
+    'gross margin', 'operating margin', 'contribution margin', 'ebitda',
+    'ebit', 'pat', 'net income', 'earnings', 'eps', 'cash flow',
+    'free cash flow', 'operating cash flow', 'cash burn', 'cash', 'capex',
+    'opex', 'cost', 'expense', 'fixed cost', 'variable cost', 'overhead',
+    'take rate', 'unit economics', 'aov', 'average order value', 'gov',
+    'gmv', 'arpu', 'ltv', 'cac', 'payback', 'churn', 'retention', 'growth',
+    'grow*', 'grew', 'decline', 'increase', 'decrease', 'expansion',
+    'contraction', 'dilution', 'accretive', 'roe', 'roa', 'roce', 'roi',
+    'return on', 'dividend', 'buyback', 'share repurchase', 'debt',
+    'leverage', 'balance sheet', 'liquidity', 'working capital',
+    'inventory', 'receivables', 'depreciation', 'amortization', 'tax',
+    'deferred tax', 'provision*', 'write-off', 'impairment', 'valuation',
+    'nim', 'net interest margin', 'net interest income', 'fee income',
+    'fees', 'deposit*', 'loan', 'advances', 'credit', 'credit cost',
+    'npa', 'gross npa', 'net npa', 'asset quality', 'slippage*',
+    'collection efficiency', 'casa', 'cost of funds', 'yield',
+    'spread', 'ldr', 'loan to deposit', 'capital adequacy', 'tier 1',
+    'liquidity coverage', 'ratio', 'mix', 'price', 'pricing', 'discount*',
+    'subsid*', 'incentive*', 'commission*', 'royalt*', 'backlog',
+    'order book', 'bookings', 'utilization', 'capacity', 'throughput',
+    'volume', 'realization', 'same store', 'like for like',
+]
+
+STRATEGY_TERMS = [
+    'strateg*', 'priorit*', 'focus', 'initiative', 'launch*', 'new product',
+    'new market', 'new cities', 'expan*', 'scale', 'scaling', 'invest*',
+    'capital allocation', 'allocat*', 'acqui*', 'merger', 'm&a',
+    'partnership', 'alliance', 'joint venture', 'divest*', 'spin off',
+    'restructur*', 'transformation', 'digital*', 'technology', 'platform',
+    'automation', 'artificial intelligence', 'ai', 'machine learning',
+    'r&d', 'research and development', 'innovation', 'moat',
+    'competitive advantage', 'differentiat*', 'market share', 'share gain',
+    'leadership', 'category', 'categories', 'vertical', 'segment',
+    'geograph*', 'international', 'domestic', 'rural', 'urban',
+    'tier 2', 'tier 3', 'omnichannel', 'distribution', 'branch',
+    'branches', 'store', 'stores', 'dark store*', 'warehouse*',
+    'supply chain', 'logistics', 'infrastructure', 'customer', 'consumer*',
+    'demand', 'adoption', 'penetration', 'engagement', 'user*',
+    'monthly transacting', 'cohort*', 'demographic*', 'wallet share',
+    'cross sell', 'upsell', 'ecosystem', 'brand', 'premium*',
+    'hiring', 'headcount', 'talent', 'succession', 'fundrais*',
+    'capital raise', 'qip', 'ipo', 'listing',
+]
+
+RISK_TERMS = [
+    'risk*', 'headwind*', 'tailwind*', 'uncertain*', 'volatil*',
+    'pressure', 'slowdown', 'weak*', 'soft*', 'challeng*', 'competiti*',
+    'competitor*', 'disrupt*', 'regulat*', 'regulator*', 'rbi', 'sebi',
+    'compliance', 'litigation', 'macro*', 'inflation*', 'interest rate*',
+    'rate cut*', 'rate hike*', 'currency', 'fx', 'geopolitic*', 'tariff*',
+    'recession', 'downturn', 'monsoon', 'seasonal*', 'one-off',
+    'one-time', 'exceptional', 'mitigat*', 'hedg*', 'stress*', 'default*',
+    'delinquen*', 'fraud', 'cyber*', 'attrition', 'impact',
+]
+
+FINANCIAL_LEXICON = {}
+for _terms, _weight in ((FORWARD_LOOKING_TERMS, 2.0), (GUIDANCE_TERMS, 2.0),
+                        (FINANCIAL_TERMS, 1.0), (STRATEGY_TERMS, 0.5),
+                        (RISK_TERMS, 0.5)):
+    for _term in _terms:
+        FINANCIAL_LEXICON.setdefault(_term, _weight)
+
+# The keywords QuoteExtractor.extract_quotes has always filtered on; the
+# prefix forms keep the old substring behaviour ("margin" in "margins")
+QUOTE_KEYWORDS = {
+    keyword: 1.0 for keyword in [
+        'revenue*', 'profit*', 'growth*', 'margin*', 'guidance*',
+        'forecast*', 'outlook*', 'increase*', 'decrease*', 'decline*',
+        'strategy*', 'performance*'
+    ]
+}
@@ -1,93 +1,619 @@
 #!/usr/bin/env python3
 import os
 import sys
-from pdf_processor import PDFProcessor
-from claude_quote_extractor import ClaudeQuoteExtractor
-from utils import setup_directory_structure, validate_pdf_file, get_processed_files
+import json
+import time
+import argparse
+import functools
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+# Each mode imports what it needs, so --help and light modes start fast
+if TYPE_CHECKING:
+    from pdf_processor import PDFProcessor
+    from pipeline import Pipeline
+    from quote_extractor import QuoteExtractor
+    from claude_quote_extractor import ClaudeQuoteExtractor
+    from manifest import Manifest
+    from quote_dedup import QuoteDedupIndex
+    from quote_store import QuoteStore
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line options for the analysis tool."""
+    parser = argparse.ArgumentParser(
+        description='Extract quotes from earnings call transcripts')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for PDF text extraction '
+                        '(defaults to the number of CPUs)')
+    parser.add_argument('--writers', type=int, default=1,
+                        help='Threads saving results')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='Transcripts waiting in front of each pipeline '
+                        'stage before the previous stage pauses')
+    parser.add_argument('--progress-interval', type=float, default=10,
+                        help='Seconds between pipeline progress reports '
+                        '(0 turns them off)')
+    parser.add_argument('--no-text-cache', action='store_true',
+                        help='Always re-parse PDFs instead of using cached text')
+    parser.add_argument('--invalidate-text-cache', action='store_true',
+                        help='Clear the extracted text cache before running')
+    parser.add_argument('--text-cache-mb', type=int, default=256,
+                        help='Size limit of the extracted text cache in MB')
+    parser.add_argument('--concurrency', type=int, default=5,
+                        help='Most Claude requests in flight at once')
+    parser.add_argument('--rpm', type=float, default=50,
+                        help='Claude requests per minute budget')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Claude tokens per minute budget (input + output)')
+    parser.add_argument('--max-retries', type=int, default=6,
+                        help='Retries of a rate limited, overloaded or failed '
+                        'Claude request before giving up on the transcript')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream Claude replies and append each quote to '
+                        'a partial output file as soon as it arrives')
+    parser.add_argument('--map-reduce', action='store_true',
+                        help='Extract every transcript chunk by chunk, not only '
+                        'those too long for a single call')
+    parser.add_argument('--chunk-tokens', type=int, default=30000,
+                        help='Chunk size in tokens for map-reduce extraction')
+    parser.add_argument('--candidates-per-chunk', type=int, default=8,
+                        help='Candidate quotes requested from each chunk')
+    parser.add_argument('--focus',
+                        choices=['all', 'prepared', 'qa', 'executives'],
+                        default='all',
+                        help='Send Claude only the prepared remarks, the Q&A '
+                        'or what executives said, as labelled speaker turns')
+    parser.add_argument('--speaker', action='append', default=[],
+                        metavar='NAME',
+                        help='Send Claude only what this speaker said, matched '
+                        'on name or title (e.g. "CFO"); may be repeated')
+    parser.add_argument('--prefilter', action='store_true',
+                        help='Send Claude only the most relevant passages of '
+                        'each transcript')
+    parser.add_argument('--prefilter-ratio', type=float, default=0.2,
+                        help='Share of sentences the pre-filter keeps, '
+                        'context sentences included')
+    parser.add_argument('--prefilter-context', type=int, default=1,
+                        help='Sentences kept around each pre-filter pick')
+    parser.add_argument('--compare-prefilter', action='store_true',
+                        help='Extract with and without the pre-filter and '
+                        'report quote overlap (runs both, saves the full run)')
+    parser.add_argument('--no-response-cache', action='store_true',
+                        help='Always call Claude instead of reusing cached responses')
+    parser.add_argument('--invalidate-response-cache', action='store_true',
+                        help='Clear the Claude response cache before running')
+    parser.add_argument('--response-cache-mb', type=int, default=512,
+                        help='Size limit of the Claude response cache in MB')
+    parser.add_argument('--reparse-cached', action='store_true',
+                        help='Rebuild outputs from cached Claude responses with '
+                        'the current parser, without calling the API')
+    parser.add_argument('--batch', nargs=2, metavar=('FISCAL_YEAR', 'QUARTER'),
+                        help='Submit all pending transcripts of one quarter as '
+                        'a Message Batches job (resumes an unfinished batch)')
+    parser.add_argument('--poll-interval', type=float, default=60,
+                        help='Seconds between batch status checks')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process transcripts as soon as '
+                        'they land in pdfs/')
+    parser.add_argument('--settle-seconds', type=float, default=2.0,
+                        help='How long a new PDF must stay unchanged before it '
+                        'is processed in watch mode')
+    parser.add_argument('--watch-polling', action='store_true',
+                        help='Poll for new PDFs instead of using filesystem '
+                        'events in watch mode')
+    parser.add_argument('--watch-poll-interval', type=float, default=5.0,
+                        help='Seconds between scans when polling in watch mode')
+    parser.add_argument('--reprocess', action='store_true',
+                        help='Also process PDFs that were already processed')
+    parser.add_argument('--verify', choices=['flag', 'reject', 'off'],
+                        default='flag',
+                        help='Check that quotes appear in the transcript and '
+                        'flag or reject those that do not')
+    parser.add_argument('--reject-score', type=float, default=None,
+                        help='Verification score (0-1) below which a quote '
+                        'counts as not in the transcript')
+    parser.add_argument('--dedup', choices=['flag', 'drop', 'off'],
+                        default='flag',
+                        help='Flag or drop quotes that nearly repeat another '
+                        'quote of the same call or any quote under output/')
+    parser.add_argument('--dedup-threshold', type=float,
+                        default=None,
+                        help='Similarity (0-1) from which quotes count as '
+                        'near-duplicates')
+    parser.add_argument('--metrics-jsonl', metavar='PATH',
+                        help='Append per-file stage timings, token usage, '
+                        'cost and outcomes to this JSON Lines file')
+    parser.add_argument('--metrics-textfile', metavar='PATH',
+                        help='Keep running totals in this Prometheus textfile '
+                        'collector file (e.g. /var/lib/node_exporter/'
+                        'earnings_bot.prom)')
+    args = parser.parse_args(argv)
+    # Defaults that live with their modules, loaded once the options parse
+    if args.reject_score is None:
+        from quote_verifier import REJECT_SCORE
+        args.reject_score = REJECT_SCORE
+    if args.dedup_threshold is None:
+        from quote_dedup import DEFAULT_THRESHOLD
+        args.dedup_threshold = DEFAULT_THRESHOLD
+    return args
+
+
+def output_path(filename: str, fiscal_year: str, quarter: str) -> str:
+    """Where a transcript's quotes are saved."""
+    return os.path.join('output', fiscal_year, quarter,
+                        filename.replace('.pdf', '_quotes.json'))
+
+
+def partial_output_path(filename: str, fiscal_year: str, quarter: str) -> str:
+    """Where a transcript's quotes are appended while they stream in."""
+    return output_path(filename, fiscal_year, quarter).replace(
+        '_quotes.json', '_quotes.partial.jsonl')
+
+
+def save_results(quote_extractor: 'ClaudeQuoteExtractor', quotes: list,
+                 filename: str, fiscal_year: str, quarter: str,
+                 dedup: Optional['QuoteDedupIndex'] = None,
+                 drop_duplicates: bool = False,
+                 store: Optional['QuoteStore'] = None):
+    """
+    Tag quotes with their quarter, check them for near-duplicates when a
+    dedup index is given, save them to JSON and to the quote store (when
+    given), and print them.
+    """
+    # Add fiscal year and quarter info to each quote
+    for quote in quotes:
+        quote['fiscal_year'] = fiscal_year
+        quote['quarter'] = quarter
+
+    path = output_path(filename, fiscal_year, quarter)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if dedup is not None:
+        quotes = dedup.check(quotes, path, drop=drop_duplicates)
+
+    # Save quotes to JSON
+    quote_extractor.save_quotes_to_json(quotes, path)
+    # Stamped with the file's mtime, so import_outputs sees it as current
+    # and the dedup index as in sync with the store
+    saved_at = os.path.getmtime(path) if os.path.exists(path) else None
+    if store is not None:
+        store.save(path, quotes, pdf_path=os.path.join(
+            'pdfs', fiscal_year, quarter, filename), saved_at=saved_at)
+    if dedup is not None:
+        dedup.add_file(path, quotes, saved_at=saved_at)
+    # The complete output replaces any quotes streamed in so far
+    partial_path = partial_output_path(filename, fiscal_year, quarter)
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    # Print results
+    print(f"\nAnalysis results for {filename}:")
+    print("-" * 50)
+    for quote in quotes:
+        print(
+            f"{quote['company']} {quote['speaker']} on {quote['description']}:"
+        )
+        print(f"\"{quote['quote']}\"")
+        print(f"{quote['hashtag']}")
+        if quote.get('duplicate_of'):
+            print(f"(near-duplicate of {quote['duplicate_of']['source_path']})")
+        print("-" * 30)
+
+
+def verify_transcript(pdf_processor: 'PDFProcessor',
+                      args: argparse.Namespace, quotes: list,
+                      pdf_path: str) -> list:
+    """Verify quotes against their transcript's (usually cached) text."""
+    if args.verify == 'off' or not os.path.exists(pdf_path):
+        return quotes
+    from quote_verifier import verify_quotes
+    document = pdf_processor.extract_document(pdf_path)
+    return verify_quotes(quotes, document['text'], document['page_offsets'],
+                         reject=args.verify == 'reject',
+                         reject_score=args.reject_score,
+                         transcript_index=document.get('transcript_index'))
+
+
+def reparse_cached(quote_extractor: 'ClaudeQuoteExtractor',
+                   pdf_processor: 'PDFProcessor',
+                   prefilter: Optional['QuoteExtractor'],
+                   args: argparse.Namespace, write: Callable[..., None]):
+    """
+    Rewrite outputs from cached Claude responses without any API calls.
+    Each transcript's request is rebuilt from the current options, so only
+    the response a normal run would save is re-parsed.
+    """
+    from utils import find_transcript_pdfs, validate_pdf_file
+    for pdf_path, fiscal_year, quarter in find_transcript_pdfs():
+        filename = os.path.basename(pdf_path)
+        if not validate_pdf_file(pdf_path):
+            print(f"Warning: Invalid PDF file: {pdf_path}")
+            continue
+        document = pdf_processor.extract_document(pdf_path)
+        # Extract company name from filename (split by _Q and take first part)
+        company_name = filename.split('_Q')[0].replace('_', ' ')
+        text = request_text(prefilter, args, document['text'],
+                            document.get('transcript_index'), company_name)
+        quotes = quote_extractor.reparse_cached(text, company_name, pdf_path)
+        if quotes is None:
+            print(f"No cached response for {filename}")
+            continue
+        quotes = verify_transcript(pdf_processor, args, quotes, pdf_path)
+        write(quotes, filename, fiscal_year, quarter)
+
+
+def run_batch(quote_extractor: 'ClaudeQuoteExtractor',
+              pdf_processor: 'PDFProcessor',
+              prefilter: Optional['QuoteExtractor'], manifest: 'Manifest',
+              pending: list, args: argparse.Namespace,
+              write: Callable[..., None]):
+    """Process one quarter's pending transcripts as a single batch job."""
+    from batch_processor import BatchBackfill
+    from claude_quote_extractor import MODEL, PROMPT_VERSION
+    from utils import validate_pdf_file
+    fiscal_year, quarter = args.batch
+    pdf_dir = os.path.join('pdfs', fiscal_year, quarter)
+    if not os.path.exists(pdf_dir):
+        raise FileNotFoundError(f"PDF directory not found: {pdf_dir}")
+
+    valid = []
+    for pdf_path, pdf_fiscal_year, pdf_quarter in pending:
+        if (pdf_fiscal_year, pdf_quarter) != (fiscal_year, quarter):
+            continue
+        if validate_pdf_file(pdf_path):
+            valid.append(pdf_path)
+        else:
+            print(f"Warning: Invalid PDF file: {pdf_path}")
+            manifest.mark_failed(pdf_path, "Invalid PDF file")
+
+    def batch_text(text: str, company_name: str, pdf_path: str) -> str:
+        # The text cache holds the speaker turns --focus needs
+        document = pdf_processor.extract_document(pdf_path)
+        return request_text(prefilter, args, text,
+                            document.get('transcript_index'), company_name)
+
+    backfill = BatchBackfill(quote_extractor, pdf_processor,
+                             poll_interval=args.poll_interval,
+                             request_text=batch_text)
+    for pdf_path, quotes in backfill.run(fiscal_year, quarter, valid):
+        filename = os.path.basename(pdf_path)
+        if isinstance(quotes, Exception):
+            print(f"Error processing {filename}: {str(quotes)}")
+            manifest.mark_failed(pdf_path, str(quotes))
+            continue
+        try:
+            quotes = verify_transcript(pdf_processor, args, quotes, pdf_path)
+        except Exception as e:
+            print(f"Warning: Could not verify quotes of {filename}: {str(e)}")
+        write(quotes, filename, fiscal_year, quarter)
+        manifest.mark_done(pdf_path, MODEL, PROMPT_VERSION)
+
+
+def stream_transcript(quote_extractor: 'ClaudeQuoteExtractor', text: str,
+                      company_name: str, pdf_path: str) -> list:
+    """
+    Stream one transcript's quotes, appending each to a partial JSON Lines
+    file next to the output as it arrives. The partial file is replaced
+    once the transcript is saved and keeps the finished quotes if the
+    stream breaks.
+    """
+    fiscal_year, quarter = pdf_path.split(os.sep)[-3:-1]
+    path = partial_output_path(os.path.basename(pdf_path), fiscal_year,
+                               quarter)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    started = time.monotonic()
+    quotes = []
+    with open(path, 'w') as f:
+        for quote in quote_extractor.stream_quotes(text, company_name,
+                                                   pdf_path):
+            if not quotes:
+                print(f"First quote from {company_name} after "
+                      f"{time.monotonic() - started:.1f}s")
+            quote['fiscal_year'] = fiscal_year
+            quote['quarter'] = quarter
+            f.write(json.dumps(quote) + '\n')
+            f.flush()
+            quotes.append(quote)
+    return quotes
+
+
+def focus_transcript(args: argparse.Namespace, text: str,
+                     transcript_index: Optional[dict],
+                     company_name: str) -> str:
+    """The speaker turns selected by --focus and --speaker, if any."""
+    if args.focus == 'all' and not args.speaker:
+        return text
+    if not transcript_index or not transcript_index['turns']:
+        print(f"Warning: No speaker turns found for {company_name}; "
+              f"sending the whole transcript")
+        return text
+    from transcript_index import Transcript
+    focused = Transcript(text, transcript_index).render(
+        sections={'prepared': ['prepared_remarks'],
+                  'qa': ['qa']}.get(args.focus),
+        roles=['executive'] if args.focus == 'executives' else None,
+        speakers=args.speaker or None)
+    if not focused:
+        print(f"Warning: Nothing in {company_name} matches --focus "
+              f"{args.focus} {' '.join(args.speaker)}; sending the whole "
+              f"transcript")
+        return text
+    print(f"Focus kept {len(focused)} of {len(text)} characters for "
+          f"{company_name}")
+    return focused
+
+
+def prefilter_transcript(prefilter: 'QuoteExtractor',
+                         args: argparse.Namespace, text: str,
+                         company_name: str) -> str:
+    """The passages of a transcript the pre-filter sends to Claude."""
+    filtered = prefilter.select_passages(
+        text, context=args.prefilter_context,
+        keep_ratio=args.prefilter_ratio)
+    print(f"Pre-filter kept {len(filtered)} of {len(text)} characters "
+          f"({100.0 * (1 - len(filtered) / max(len(text), 1)):.0f}% cut) "
+          f"for {company_name}")
+    return filtered
+
+
+def request_text(prefilter: Optional['QuoteExtractor'],
+                 args: argparse.Namespace, text: str,
+                 transcript_index: Optional[dict], company_name: str) -> str:
+    """
+    The part of a transcript whose quotes a run saves: the speaker turns
+    picked by --focus and --speaker, pre-filtered when the pre-filter is on
+    (--compare-prefilter saves the unfiltered run).
+    """
+    text = focus_transcript(args, text, transcript_index, company_name)
+    if prefilter is not None and not args.compare_prefilter:
+        text = prefilter_transcript(prefilter, args, text, company_name)
+    return text
+
+
+def extract_transcript(quote_extractor: 'ClaudeQuoteExtractor',
+                       prefilter: Optional['QuoteExtractor'],
+                       args: argparse.Namespace, text: str,
+                       company_name: str, pdf_path: str,
+                       transcript_index: Optional[dict] = None) -> list:
+    """
+    Extract one transcript's quotes, from the speaker turns picked by
+    --focus and --speaker, and from its pre-filtered passages when the
+    pre-filter is on, or from both versions when comparing recall.
+    """
+    text = focus_transcript(args, text, transcript_index, company_name)
+    extract = quote_extractor.extract_quotes
+    if args.stream:
+        extract = functools.partial(stream_transcript, quote_extractor)
+    if prefilter is None:
+        return extract(text, company_name, pdf_path)
+
+    filtered = prefilter_transcript(prefilter, args, text, company_name)
+    filtered_quotes = extract(filtered, company_name, pdf_path)
+    if not args.compare_prefilter:
+        return filtered_quotes
+
+    full_quotes = extract(text, company_name, pdf_path)
+    from quote_extractor import quote_overlap
+    print(f"Pre-filter recall for {company_name}: "
+          f"{100.0 * quote_overlap(full_quotes, filtered_quotes):.0f}% of "
+          f"{len(full_quotes)} quotes")
+    return full_quotes
+
+
+def build_pipeline(pdf_processor: 'PDFProcessor',
+                   quote_extractor: 'ClaudeQuoteExtractor',
+                   prefilter: Optional['QuoteExtractor'],
+                   args: argparse.Namespace,
+                   write: Callable[..., None],
+                   on_done: Callable[[str], None],
+                   on_failure: Callable[[str, str], None]) -> 'Pipeline':
+    """Build the parse/extract/write pipeline from the command line options."""
+    from pipeline import Pipeline
+    from quote_verifier import verify_quotes
+    return Pipeline(
+        pdf_processor,
+        functools.partial(extract_transcript, quote_extractor, prefilter,
+                          args),
+        write,
+        parse_workers=args.workers,
+        llm_workers=args.concurrency,
+        writer_workers=args.writers,
+        queue_size=args.queue_size,
+        monitor_interval=args.progress_interval or None,
+        on_done=on_done,
+        on_failure=on_failure,
+        verify=None if args.verify == 'off' else functools.partial(
+            verify_quotes, reject=args.verify == 'reject',
+            reject_score=args.reject_score),
+        telemetry=quote_extractor.telemetry)
+
+
+def run_watch(pdf_processor: 'PDFProcessor',
+              quote_extractor: 'ClaudeQuoteExtractor',
+              prefilter: Optional['QuoteExtractor'], manifest: 'Manifest',
+              pending: list, args: argparse.Namespace,
+              write: Callable[..., None]):
+    """
+    Process pending PDFs, then keep running and send every transcript that
+    lands in pdfs/ (or is replaced) straight into the pipeline.
+    """
+    from claude_quote_extractor import MODEL, PROMPT_VERSION
+    from utils import find_transcript_pdfs
+    from watcher import TranscriptWatcher
+    lock = threading.Lock()
+    in_flight = set()
+    # PDFs that changed again while they were being processed
+    changed = set()
+
+    def finished(pdf_path: str):
+        with lock:
+            in_flight.discard(pdf_path)
+            rerun = pdf_path in changed
+            changed.discard(pdf_path)
+        if rerun:
+            watcher.notice(pdf_path)
+
+    def on_done(pdf_path: str):
+        manifest.mark_done(pdf_path, MODEL, PROMPT_VERSION)
+        finished(pdf_path)
+
+    def on_failure(pdf_path: str, error: str):
+        manifest.mark_failed(pdf_path, error)
+        finished(pdf_path)
+
+    pipeline = build_pipeline(pdf_processor, quote_extractor, prefilter, args,
+                              write, on_done, on_failure)
+
+    def submit(pdf_path: str, fiscal_year: str, quarter: str,
+               force: bool = False):
+        with lock:
+            if pdf_path in in_flight:
+                changed.add(pdf_path)
+                return
+        manifest.sync([(pdf_path, fiscal_year, quarter)])
+        if not force and not manifest.needs_processing(pdf_path, MODEL,
+                                                       PROMPT_VERSION):
+            return
+        with lock:
+            in_flight.add(pdf_path)
+        print(f"\nQueued {pdf_path}")
+        pipeline.submit(pdf_path, fiscal_year, quarter)
+
+    watcher = TranscriptWatcher(submit,
+                                settle_seconds=args.settle_seconds,
+                                poll_interval=args.watch_poll_interval,
+                                use_events=not args.watch_polling)
+    for pdf_path, _, _ in find_transcript_pdfs():
+        watcher.mark_known(pdf_path)
+
+    pipeline.start()
+    try:
+        for pdf_path, fiscal_year, quarter in pending:
+            submit(pdf_path, fiscal_year, quarter, force=True)
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nStopping watch mode")
+    finally:
+        pipeline.finish()
 
 
 def main():
     """Main entry point for the earnings call analysis tool."""
+    args = parse_args()
+    from cache import DiskCache
+    from pdf_processor import PDFProcessor
+    from claude_quote_extractor import (ClaudeQuoteExtractor, MODEL,
+                                        PROMPT_VERSION, api_key)
+    from quote_store import open_store
+    from telemetry import Telemetry
+    from utils import setup_directory_structure, find_transcript_pdfs
+    telemetry = Telemetry(args.metrics_jsonl, args.metrics_textfile)
+    telemetry.event('run', command='main', argv=sys.argv[1:])
+    dedup = store = manifest = None
     try:
         # Setup directory structure
         setup_directory_structure()
 
         # Initialize processors
-        pdf_processor = PDFProcessor()
-        quote_extractor = ClaudeQuoteExtractor()
-
-        # Get already processed files
-        processed_files = get_processed_files()
-
-        # Process only new PDFs in the directory structure
-        for fiscal_year in ['FY25', 'FY26']:
-            for quarter in ['Q1', 'Q2', 'Q3', 'Q4']:
-                pdf_dir = os.path.join('pdfs', fiscal_year, quarter)
-                if not os.path.exists(pdf_dir):
-                    continue
-
-                # Only process files that haven't been processed before
-                new_pdfs = [
-                    f for f in os.listdir(pdf_dir) if f.endswith('.pdf')
-                    and os.path.join(pdf_dir, f) not in processed_files
-                ]
-
-                if not new_pdfs:
-                    continue
-
-                print(f"\nProcessing new PDFs in {fiscal_year}/{quarter}:")
-
-                # Process only new PDFs
-                for filename in new_pdfs:
-                    pdf_path = os.path.join(pdf_dir, filename)
-                    try:
-                        if not validate_pdf_file(pdf_path):
-                            print(f"Warning: Invalid PDF file: {pdf_path}")
-                            continue
-
-                        # Extract text from PDF
-                        text = pdf_processor.extract_text(pdf_path)
-
-                        # Extract company name from filename (split by _Q and take first part)
-                        company_name = filename.split('_Q')[0].replace(
-                            '_', ' ')
-
-                        # Extract quotes using Claude
-                        quotes = quote_extractor.extract_quotes(
-                            text, company_name, pdf_path)
-                            
-                        # Add fiscal year and quarter info to each quote
-                        for quote in quotes:
-                            quote['fiscal_year'] = fiscal_year
-                            quote['quarter'] = quarter
-
-                        # Save quotes to JSON
-                        output_dir = os.path.join('output', fiscal_year,
-                                                  quarter)
-                        os.makedirs(output_dir, exist_ok=True)
-                        output_path = os.path.join(
-                            output_dir,
-                            f"{filename.replace('.pdf', '_quotes.json')}")
-                        quote_extractor.save_quotes_to_json(
-                            quotes, output_path)
-
-                        # Print results
-                        print(f"\nAnalysis results for {filename}:")
-                        print("-" * 50)
-                        for quote in quotes:
-                            print(
-                                f"{quote['company']} {quote['speaker']} on {quote['description']}:"
-                            )
-                            print(f"\"{quote['quote']}\"")
-                            print(f"{quote['hashtag']}")
-                            print("-" * 30)
-
-                    except Exception as e:
-                        print(f"Error processing {filename}: {str(e)}")
+        text_cache = None
+        if not args.no_text_cache:
+            text_cache = DiskCache('text',
+                                   max_bytes=args.text_cache_mb * 1024 * 1024)
+            if args.invalidate_text_cache:
+                text_cache.invalidate()
+        pdf_processor = PDFProcessor(max_workers=args.workers,
+                                     cache=text_cache)
+        response_cache = None
+        if not args.no_response_cache:
+            response_cache = DiskCache(
+                'responses', max_bytes=args.response_cache_mb * 1024 * 1024)
+            if args.invalidate_response_cache:
+                response_cache.invalidate()
+        quote_extractor = ClaudeQuoteExtractor(
+            max_concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            response_cache=response_cache,
+            chunk_tokens=args.chunk_tokens,
+            candidates_per_chunk=args.candidates_per_chunk,
+            always_chunk=args.map_reduce,
+            max_retries=args.max_retries,
+            telemetry=telemetry)
+
+        prefilter = None
+        if args.prefilter or args.compare_prefilter:
+            from quote_extractor import QuoteExtractor
+            prefilter = QuoteExtractor()
+
+        store = open_store()
+        # Near-duplicate check against every quote saved so far
+        if args.dedup != 'off':
+            from quote_dedup import QuoteDedupIndex
+            dedup = QuoteDedupIndex(threshold=args.dedup_threshold)
+            indexed = dedup.sync_store(store)
+            if indexed:
+                print(f"Indexed {indexed} quote files for near-duplicate "
+                      f"checks ({dedup.count()} quotes)")
+        write = functools.partial(save_results, quote_extractor, dedup=dedup,
+                                  drop_duplicates=args.dedup == 'drop',
+                                  store=store)
+
+        if args.reparse_cached:
+            reparse_cached(quote_extractor, pdf_processor, prefilter, args,
+                           write)
+            return
+
+        # Find new, changed and stale PDFs through the manifest
+        from manifest import Manifest
+        manifest = Manifest()
+        if manifest.is_empty():
+            imported = manifest.import_outputs()
+            if imported:
+                print(f"Recorded {imported} previously processed PDFs in "
+                      f"{manifest.path}")
+        pdfs = find_transcript_pdfs()
+        manifest.sync(pdfs)
+        manifest.remove_missing(pdf_path for pdf_path, _, _ in pdfs)
+        if args.reprocess:
+            pending = pdfs
+        else:
+            pending = manifest.pending(MODEL, PROMPT_VERSION)
+        if pending or args.watch:
+            # Fail now rather than on every transcript
+            api_key()
+
+        if args.batch:
+            run_batch(quote_extractor, pdf_processor, prefilter, manifest,
+                      pending, args, write)
+            return
+
+        if args.watch:
+            run_watch(pdf_processor, quote_extractor, prefilter, manifest,
+                      pending, args, write)
+        elif pending:
+            print(f"\nProcessing {len(pending)} new or changed PDFs")
+            pipeline = build_pipeline(
+                pdf_processor, quote_extractor, prefilter, args, write,
+                on_done=functools.partial(manifest.mark_done, model=MODEL,
+                                          prompt_version=PROMPT_VERSION),
+                on_failure=manifest.mark_failed)
+            pipeline.run(pending)
+
+        print(f"\nClaude usage: {quote_extractor.usage_summary()}")
+        print(f"Quote parsing: {quote_extractor.parse_summary()}")
+        print(f"Claude requests: {quote_extractor.guard.summary()}")
+        if response_cache is not None:
+            print(f"Response cache: {response_cache.stats()}")
+        if telemetry.enabled:
+            print(f"Telemetry: {telemetry.summary()}")
 
     except Exception as e:
         print(f"Fatal error: {str(e)}")
         sys.exit(1)
+    finally:
+        for database in (dedup, store, manifest):
+            if database is not None:
+                database.close()
+        telemetry.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,251 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+from cache import file_sha256
+from utils import get_processed_files
+
+MANIFEST_PATH = os.path.join('state', 'manifest.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    pdf_path TEXT PRIMARY KEY,
+    fiscal_year TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    content_hash TEXT,
+    mtime REAL,
+    size INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    model TEXT,
+    prompt_version INTEGER,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS files_status ON files (status, fiscal_year, quarter);
+"""
+
+
+class Manifest:
+    """
+    SQLite record of every transcript PDF and how it was last processed.
+
+    Each row holds the PDF's path, content hash, mtime and size, its status
+    ('pending', 'done' or 'failed') and the model and prompt version of its
+    last successful run. A PDF whose content changes goes back to
+    'pending', and a 'done' PDF processed with another (or an unrecorded)
+    model or prompt version counts as pending again.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        """
+        Open (and create if needed) the manifest database.
+
+        Args:
+            path (str): SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Shared by the pipeline threads; every access holds the lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def is_empty(self) -> bool:
+        """Whether no PDF has been recorded yet."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def import_outputs(self) -> int:
+        """
+        Record PDFs that already have output from before the manifest
+        existed as done. Their model and prompt version are unknown and
+        left empty, so pending() re-queues them for the current prompt.
+
+        Returns:
+            int: Number of PDFs imported
+        """
+        imported = 0
+        for pdf_path in sorted(get_processed_files()):
+            parts = pdf_path.split(os.sep)
+            if not os.path.exists(pdf_path):
+                continue
+            self.sync([(pdf_path, parts[-3], parts[-2])])
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE files SET status = 'done', updated_at = ? "
+                    "WHERE pdf_path = ?", (time.time(), pdf_path))
+            imported += 1
+        return imported
+
+    def sync(self, pdfs: Iterable[Tuple[str, str, str]]):
+        """
+        Add new PDFs and re-queue PDFs whose content changed.
+
+        Only files whose size or mtime changed are hashed again.
+
+        Args:
+            pdfs (Iterable[Tuple[str, str, str]]): (pdf_path, fiscal_year,
+                quarter) of every PDF on disk
+        """
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self._db.execute(
+                    "SELECT pdf_path, content_hash, mtime, size FROM files")
+            }
+        updates = []
+        for pdf_path, fiscal_year, quarter in pdfs:
+            try:
+                stat = os.stat(pdf_path)
+                row = known.get(pdf_path)
+                if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+                    continue
+                content_hash = file_sha256(pdf_path)
+            except OSError as e:
+                print(f"Warning: Cannot read {pdf_path}: {str(e)}")
+                continue
+            updates.append((pdf_path, fiscal_year, quarter, content_hash,
+                            stat.st_mtime, stat.st_size, time.time()))
+
+        with self._lock, self._db:
+            # A touched file with the same content keeps its status
+            self._db.executemany(
+                "INSERT INTO files (pdf_path, fiscal_year, quarter, "
+                "content_hash, mtime, size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (pdf_path) DO UPDATE SET "
+                "status = CASE WHEN content_hash = excluded.content_hash "
+                "THEN status ELSE 'pending' END, "
+                "content_hash = excluded.content_hash, "
+                "mtime = excluded.mtime, size = excluded.size, "
+                "updated_at = excluded.updated_at", updates)
+        for pdf_path, _, _, content_hash, *_ in updates:
+            if pdf_path in known and known[pdf_path][0] != content_hash:
+                print(f"PDF changed since it was processed: {pdf_path}")
+
+    def pending(self, model: str, prompt_version: int,
+                fiscal_year: Optional[str] = None,
+                quarter: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """
+        List PDFs that need processing, sorted by path: new, changed or
+        failed PDFs, and PDFs done with a different model or prompt
+        version, which are set back to 'pending' here.
+
+        Args:
+            model (str): Current model
+            prompt_version (int): Current prompt version
+            fiscal_year (str): Only this fiscal year, if given
+            quarter (str): Only this quarter, if given
+
+        Returns:
+            List[Tuple[str, str, str]]: (pdf_path, fiscal_year, quarter)
+        """
+        query = ("SELECT pdf_path, fiscal_year, quarter FROM files "
+                 "WHERE status IN ('pending', 'failed')")
+        params = []
+        if fiscal_year:
+            query += " AND fiscal_year = ?"
+            params.append(fiscal_year)
+        if quarter:
+            query += " AND quarter = ?"
+            params.append(quarter)
+        with self._lock, self._db:
+            requeued = self._db.execute(
+                "UPDATE files SET status = 'pending', updated_at = ? "
+                "WHERE status = 'done' AND (prompt_version IS NULL "
+                "OR model IS NULL OR prompt_version != ? OR model != ?)",
+                (time.time(), prompt_version, model)).rowcount
+            if requeued:
+                print(f"Re-queued {requeued} PDFs processed with another "
+                      f"model or prompt version")
+            return [tuple(row) for row in self._db.execute(
+                query + " ORDER BY pdf_path", params)]
+
+    def needs_processing(self, pdf_path: str, model: str,
+                         prompt_version: int) -> bool:
+        """
+        Whether one PDF is new, changed, failed or done with a different
+        model or prompt version.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            model (str): Current model
+            prompt_version (int): Current prompt version
+
+        Returns:
+            bool: True if the PDF should be processed
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, model, prompt_version FROM files "
+                "WHERE pdf_path = ?", (pdf_path,)).fetchone()
+        if row is None or row[0] != 'done':
+            return True
+        # Imported outputs have no model or prompt version recorded and
+        # were made with an older prompt
+        return row[1] != model or row[2] != prompt_version
+
+    def all(self, fiscal_year: Optional[str] = None,
+            quarter: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """List every recorded PDF, optionally for one quarter."""
+        query = "SELECT pdf_path, fiscal_year, quarter FROM files WHERE 1"
+        params = []
+        if fiscal_year:
+            query += " AND fiscal_year = ?"
+            params.append(fiscal_year)
+        if quarter:
+            query += " AND quarter = ?"
+            params.append(quarter)
+        with self._lock:
+            return [tuple(row) for row in self._db.execute(
+                query + " ORDER BY pdf_path", params)]
+
+    def mark_done(self, pdf_path: str, model: str, prompt_version: int):
+        """Record a successful run of a PDF."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE files SET status = 'done', model = ?, "
+                "prompt_version = ?, error = NULL, updated_at = ? "
+                "WHERE pdf_path = ?",
+                (model, prompt_version, time.time(), pdf_path))
+
+    def mark_failed(self, pdf_path: str, error: str):
+        """Record a failed run of a PDF; it is retried on the next run."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE files SET status = 'failed', error = ?, "
+                "updated_at = ? WHERE pdf_path = ?",
+                (error, time.time(), pdf_path))
+
+    def remove_missing(self, pdf_paths: Iterable[str]) -> int:
+        """
+        Forget PDFs that are no longer on disk.
+
+        Args:
+            pdf_paths (Iterable[str]): Every PDF path currently on disk
+
+        Returns:
+            int: Number of rows removed
+        """
+        present = set(pdf_paths)
+        with self._lock, self._db:
+            missing = [row[0] for row in self._db.execute(
+                "SELECT pdf_path FROM files") if row[0] not in present]
+            self._db.executemany("DELETE FROM files WHERE pdf_path = ?",
+                                 [(path,) for path in missing])
+        return len(missing)
+
+    def counts(self) -> dict:
+        """Number of PDFs per status."""
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM files GROUP BY status"))
@@ -1,54 +1,294 @@
-import PyPDF2
-from typing import Optional
+import os
+import math
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from cache import DiskCache, file_sha256
+from transcript_index import INDEX_VERSION, index_transcript
+
+# PyPDF2 is imported where PDFs are read, so that commands which never
+# parse one (or hit the text cache) start faster
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) from a PDF file.
+
+    Runs inside a worker process, so it opens its own reader.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        start (int): Index of the first page to extract
+        stop (int): Index one past the last page to extract
+
+    Returns:
+        List[str]: Text of each page in page order
+    """
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or ''
+                for i in range(start, stop)]
+
+
+def _inspect(pdf_path: str) -> Tuple[int, dict]:
+    """Return the page count and metadata of a PDF file."""
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        metadata = {str(k): str(v) for k, v in (pdf_reader.metadata or {}).items()}
+        return len(pdf_reader.pages), metadata
+
+
+def _read_document(pdf_path: str) -> Tuple[List[str], dict]:
+    """Return the text of every page and the metadata of a PDF file."""
+    page_count, metadata = _inspect(pdf_path)
+    return _extract_page_range(pdf_path, 0, page_count), metadata
+
 
 class PDFProcessor:
     """Handles PDF file processing and text extraction."""
-    
-    def __init__(self):
-        """Initialize the PDF processor."""
-        pass
-        
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 min_pages_per_shard: int = 8,
+                 cache: Optional[DiskCache] = None):
+        """
+        Initialize the PDF processor.
+
+        Args:
+            max_workers (int): Number of worker processes used by the parallel
+                extraction methods (defaults to the number of CPUs)
+            min_pages_per_shard (int): Smallest page range handed to a worker
+            cache (DiskCache): Cache of extracted documents keyed by the
+                PDF's content hash; PyPDF2 is skipped on a hit
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_pages_per_shard = max(1, min_pages_per_shard)
+        self.cache = cache
+
     def extract_text(self, pdf_path: str) -> str:
         """
         Extract text content from a PDF file.
-        
+
         Args:
             pdf_path (str): Path to the PDF file
-            
+
         Returns:
             str: Extracted text content
-            
+
+        Raises:
+            Exception: If PDF processing fails
+        """
+        return self.extract_document(pdf_path)['text']
+
+    def extract_document(self, pdf_path: str,
+                         executor: Optional[Executor] = None) -> dict:
+        """
+        Extract text, page layout and metadata from a PDF file.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            executor (Executor): Pool to parse the PDF in, e.g. a process
+                pool shared by pipeline threads; parsed in this thread if None
+
+        Returns:
+            dict: Document with 'text', 'page_count', 'page_offsets' (start
+                of each page in the text), 'transcript_index' (speaker turns
+                and sections, see index_transcript) and 'metadata'
+
         Raises:
             Exception: If PDF processing fails
         """
         try:
-            text_content = []
-            with open(pdf_path, 'rb') as file:
-                # Create PDF reader object
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Process each page
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-                        
-            return "\n".join(text_content)
-            
+            cached = self._cache_get(pdf_path)
+            if cached is not None:
+                if cached.get('transcript_index', {}).get(
+                        'version') != INDEX_VERSION:
+                    # Cached before the index existed or changed
+                    cached['transcript_index'] = index_transcript(
+                        cached['text'], cached['page_offsets'])
+                    self._cache_put(pdf_path, cached)
+                return cached
+
+            if executor is None:
+                page_texts, metadata = _read_document(pdf_path)
+            else:
+                page_texts, metadata = executor.submit(
+                    _read_document, pdf_path).result()
+            document = self._build_document(page_texts, metadata)
+            self._cache_put(pdf_path, document)
+            return document
+
         except Exception as e:
             raise Exception(f"Failed to process PDF: {str(e)}")
-            
+
+    def extract_text_parallel(self, pdf_path: str) -> str:
+        """
+        Extract text content from a PDF file, sharding its pages across
+        the worker pool.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+
+        Returns:
+            str: Extracted text content
+
+        Raises:
+            Exception: If PDF processing fails
+        """
+        texts = self.extract_texts([pdf_path])
+        if pdf_path not in texts:
+            raise Exception(f"Failed to process PDF: {pdf_path}")
+        return texts[pdf_path]
+
+    def extract_texts(self, pdf_paths: List[str]) -> Dict[str, str]:
+        """
+        Extract text from many PDF files at once using a process pool.
+
+        Large files are split into page ranges so that a handful of long
+        transcripts still keeps every worker busy; the page ranges are put
+        back together in page order. Cached files are not re-parsed.
+
+        Args:
+            pdf_paths (List[str]): Paths to the PDF files
+
+        Returns:
+            Dict[str, str]: Extracted text keyed by PDF path. Files that
+                could not be processed are left out.
+        """
+        texts = {}
+        page_counts = {}
+        metadata = {}
+        for pdf_path in pdf_paths:
+            try:
+                cached = self._cache_get(pdf_path)
+                if cached is not None:
+                    texts[pdf_path] = cached['text']
+                    continue
+                page_counts[pdf_path], metadata[pdf_path] = _inspect(pdf_path)
+            except Exception as e:
+                print(f"Warning: Failed to process PDF {pdf_path}: {str(e)}")
+
+        shards = self._plan_shards(page_counts)
+        pages: Dict[str, Dict[int, List[str]]] = {
+            path: {} for path in page_counts}
+        failed = set()
+
+        if self.max_workers == 1 or len(shards) <= 1:
+            for pdf_path, start, stop in shards:
+                try:
+                    pages[pdf_path][start] = _extract_page_range(
+                        pdf_path, start, stop)
+                except Exception as e:
+                    failed.add(pdf_path)
+                    print(f"Warning: Failed to process PDF {pdf_path}: {str(e)}")
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pool.submit(_extract_page_range, *shard): shard
+                    for shard in shards
+                }
+                for future, (pdf_path, start, _) in futures.items():
+                    try:
+                        pages[pdf_path][start] = future.result()
+                    except Exception as e:
+                        failed.add(pdf_path)
+                        print(f"Warning: Failed to process PDF {pdf_path}: {str(e)}")
+
+        for pdf_path, ranges in pages.items():
+            if pdf_path in failed:
+                continue
+            document = self._build_document(
+                [text for start in sorted(ranges) for text in ranges[start]],
+                metadata[pdf_path])
+            self._cache_put(pdf_path, document)
+            texts[pdf_path] = document['text']
+        return texts
+
+    def _plan_shards(self,
+                     page_counts: Dict[str, int]) -> List[Tuple[str, int, int]]:
+        """
+        Split files into (path, start, stop) page ranges for the workers.
+
+        Args:
+            page_counts (Dict[str, int]): Number of pages per PDF path
+
+        Returns:
+            List[Tuple[str, int, int]]: Page ranges to extract
+        """
+        total_pages = sum(page_counts.values())
+        # Aim for a few shards per worker so uneven pages still balance out
+        shard_size = max(self.min_pages_per_shard,
+                         math.ceil(total_pages / (self.max_workers * 4)))
+
+        shards = []
+        for pdf_path, count in page_counts.items():
+            for start in range(0, count, shard_size):
+                shards.append((pdf_path, start, min(start + shard_size, count)))
+            if count == 0:
+                shards.append((pdf_path, 0, 0))
+        return shards
+
+    @staticmethod
+    def _build_document(page_texts: List[str], metadata: dict) -> dict:
+        """
+        Join page texts, skipping pages without any text, record where
+        each page starts in the joined text and index its speaker turns.
+        """
+        parts = []
+        page_offsets = []
+        position = 0
+        for text in page_texts:
+            if text and parts:
+                position += 1  # newline separator
+            page_offsets.append(position)
+            if text:
+                parts.append(text)
+                position += len(text)
+        text = "\n".join(parts)
+        return {
+            'text': text,
+            'page_count': len(page_texts),
+            'page_offsets': page_offsets,
+            'transcript_index': index_transcript(text, page_offsets),
+            'metadata': metadata
+        }
+
+    def _cache_get(self, pdf_path: str) -> Optional[dict]:
+        """Return the cached document for a PDF, if any."""
+        if self.cache is None:
+            return None
+        return self.cache.get(file_sha256(pdf_path))
+
+    def _cache_put(self, pdf_path: str, document: dict):
+        """Store an extracted document in the cache."""
+        if self.cache is not None:
+            self.cache.put(file_sha256(pdf_path), document)
+
+    def invalidate_cache(self, pdf_path: Optional[str] = None):
+        """
+        Drop cached text for one PDF, or the whole cache.
+
+        Args:
+            pdf_path (str): PDF whose cached text should be dropped
+        """
+        if self.cache is not None:
+            self.cache.invalidate(file_sha256(pdf_path) if pdf_path else None)
+
     def get_metadata(self, pdf_path: str) -> dict:
         """
         Extract metadata from PDF file.
-        
+
         Args:
             pdf_path (str): Path to the PDF file
-            
+
         Returns:
             dict: PDF metadata
         """
         try:
+            cached = self._cache_get(pdf_path)
+            if cached is not None:
+                return cached['metadata']
+            import PyPDF2
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 return pdf_reader.metadata
@@ -0,0 +1,317 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from pdf_processor import PDFProcessor
+from telemetry import Telemetry
+from utils import validate_pdf_file
+
+# Put on a stage's queue once per worker to shut the stage down
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline stage: worker threads draining a bounded input queue.
+
+    A worker that finishes an item blocks until the next stage's queue has
+    room, so a slow stage holds back the stages before it instead of
+    letting work pile up in memory.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Dict], Optional[Dict]],
+                 workers: int, queue_size: int,
+                 output: Optional['Stage'] = None,
+                 on_error: Optional[Callable[[Dict, Exception], None]] = None,
+                 telemetry: Optional[Telemetry] = None):
+        """
+        Initialize the stage.
+
+        Args:
+            name (str): Stage name used in progress reports
+            handler (Callable): Processes one job and returns it for the next
+                stage, or None to drop it
+            workers (int): Number of worker threads
+            queue_size (int): Capacity of the input queue
+            output (Stage): Stage that receives the handled jobs
+            on_error (Callable): Called with a job and the exception its
+                handler raised
+            telemetry (Telemetry): Receives the wall time of every job
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.output = output
+        self.on_error = on_error
+        self.telemetry = telemetry or Telemetry()
+        self.done = 0
+        self.failed = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker threads."""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work,
+                                      name=f"{self.name}-{index}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """Wait for queued jobs to be handled, then stop the workers."""
+        for _ in self._threads:
+            self.queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is _DONE:
+                return
+            with self._lock:
+                self.busy += 1
+            started = time.perf_counter()
+            ok = False
+            try:
+                result = self.handler(job)
+                ok = True
+            except Exception as e:
+                print(f"Error processing {job['filename']}: {str(e)}")
+                result = None
+                with self._lock:
+                    self.failed += 1
+                if self.on_error is not None:
+                    # A failing callback must not kill the worker, or
+                    # submit() blocks forever on the full queue
+                    try:
+                        self.on_error(job, e)
+                    except Exception as callback_error:
+                        print(f"Error recording failure of "
+                              f"{job['filename']}: {str(callback_error)}")
+            finally:
+                self.telemetry.record_stage(
+                    self.name, time.perf_counter() - started, ok=ok,
+                    file=job['pdf_path'])
+                with self._lock:
+                    self.busy -= 1
+                    self.done += 1
+            if result is not None and self.output is not None:
+                self.output.queue.put(result)
+
+    def status(self, elapsed: float) -> str:
+        """Return queue depth, jobs in progress and throughput."""
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        return (f"{self.name} queue {self.queue.qsize()}/{self.queue.maxsize}"
+                f", {self.busy} busy, {self.done} done ({rate:.2f}/s)"
+                f"{f', {self.failed} failed' if self.failed else ''}")
+
+
+class Pipeline:
+    """
+    Run transcripts through PDF parsing, quote extraction, optional quote
+    verification and writing as concurrent stages connected by bounded
+    queues, so PDF parsing overlaps with Claude calls and with writing
+    results.
+    """
+
+    def __init__(self,
+                 pdf_processor: PDFProcessor,
+                 extract: Callable[[str, str, str], List[Dict]],
+                 write: Callable[[List[Dict], str, str, str], None],
+                 parse_workers: Optional[int] = None,
+                 llm_workers: int = 5,
+                 writer_workers: int = 1,
+                 queue_size: int = 8,
+                 monitor_interval: Optional[float] = 10,
+                 on_done: Optional[Callable[[str], None]] = None,
+                 on_failure: Optional[Callable[[str, str], None]] = None,
+                 verify: Optional[Callable[..., List[Dict]]] = None,
+                 telemetry: Optional[Telemetry] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            pdf_processor (PDFProcessor): Extracts (and caches) PDF text
+            extract (Callable): (text, company_name, pdf_path,
+                transcript_index) -> quotes
+            write (Callable): (quotes, filename, fiscal_year, quarter) -> None
+            parse_workers (int): Parser processes (defaults to the number of
+                CPUs)
+            llm_workers (int): Quote extraction threads, i.e. Claude requests
+                in flight
+            writer_workers (int): Threads saving results
+            queue_size (int): Capacity of the queue in front of each stage
+            monitor_interval (float): Seconds between progress reports, or
+                None for no reports
+            on_done (Callable): Called with the PDF path once its results
+                are written
+            on_failure (Callable): Called with the PDF path and the error
+                when any stage fails on it
+            verify (Callable): (quotes, text, page_offsets,
+                transcript_index=...) -> quotes to keep, checked against the
+                full transcript text
+            telemetry (Telemetry): Receives the wall time of each stage and
+                the outcome of each transcript
+        """
+        self.pdf_processor = pdf_processor
+        self.extract = extract
+        self.write = write
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.monitor_interval = monitor_interval
+        self.on_done = on_done
+        self.on_failure = on_failure
+        self.verify = verify
+        self.telemetry = telemetry or Telemetry()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._started = 0.0
+        self._stop_monitor = threading.Event()
+        self._monitor_thread: Optional[threading.Thread] = None
+
+        self.writer = Stage('write', self._write, writer_workers, queue_size,
+                            on_error=self._failed, telemetry=self.telemetry)
+        after_llm = self.writer
+        self.verifier = None
+        if verify is not None:
+            self.verifier = Stage('verify', self._verify, 1, queue_size,
+                                  output=self.writer, on_error=self._failed,
+                                  telemetry=self.telemetry)
+            after_llm = self.verifier
+        self.llm = Stage('extract', self._extract, llm_workers, queue_size,
+                         output=after_llm, on_error=self._failed,
+                         telemetry=self.telemetry)
+        self.parser = Stage('parse', self._parse, self.parse_workers,
+                            queue_size, output=self.llm,
+                            on_error=self._failed, telemetry=self.telemetry)
+        self.stages = [self.parser, self.llm] + (
+            [self.verifier] if self.verifier else []) + [self.writer]
+
+    def run(self, pdfs: List[Tuple[str, str, str]]):
+        """
+        Process transcripts and return once every result has been written.
+
+        Args:
+            pdfs (List[Tuple[str, str, str]]): (pdf_path, fiscal_year,
+                quarter) for each transcript
+        """
+        self.start()
+        try:
+            for pdf_path, fiscal_year, quarter in pdfs:
+                self.submit(pdf_path, fiscal_year, quarter)
+        finally:
+            self.finish()
+
+    def start(self):
+        """Start the stages and the progress monitor."""
+        self._started = time.monotonic()
+        if self.monitor_interval:
+            self._monitor_thread = threading.Thread(target=self._monitor,
+                                                    daemon=True)
+            self._monitor_thread.start()
+        if self.parse_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, pdf_path: str, fiscal_year: str, quarter: str):
+        """
+        Queue one transcript; blocks while the parse queue is full.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            fiscal_year (str): Fiscal year, e.g. 'FY25'
+            quarter (str): Quarter, e.g. 'Q2'
+        """
+        self.parser.queue.put({
+            'pdf_path': pdf_path,
+            'filename': os.path.basename(pdf_path),
+            'fiscal_year': fiscal_year,
+            'quarter': quarter,
+            'submitted': time.monotonic()
+        })
+
+    def finish(self):
+        """Wait for every queued transcript to be written, then stop."""
+        try:
+            # Close stages front to back so each drains before the next stops
+            for stage in self.stages:
+                stage.close()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            self._stop_monitor.set()
+            if self._monitor_thread is not None:
+                self._monitor_thread.join()
+
+        elapsed = time.monotonic() - self._started
+        print(f"Pipeline finished in {elapsed:.1f}s: {self.status(elapsed)}")
+
+    def status(self, elapsed: float) -> str:
+        """Return the status of every stage on one line."""
+        return ' | '.join(stage.status(elapsed) for stage in self.stages)
+
+    def _monitor(self):
+        """Print per-stage progress while there is work in the pipeline."""
+        last = None
+        while not self._stop_monitor.wait(self.monitor_interval):
+            snapshot = [(stage.queue.qsize(), stage.busy, stage.done)
+                        for stage in self.stages]
+            if snapshot != last:
+                last = snapshot
+                print(f"Pipeline: "
+                      f"{self.status(time.monotonic() - self._started)}")
+
+    def _parse(self, job: Dict) -> Dict:
+        """Validate a PDF and extract its text."""
+        if not validate_pdf_file(job['pdf_path']):
+            raise Exception(f"Invalid PDF file: {job['pdf_path']}")
+        document = self.pdf_processor.extract_document(
+            job['pdf_path'], executor=self._pool)
+        job['text'] = document['text']
+        job['page_offsets'] = document['page_offsets']
+        job['transcript_index'] = document.get('transcript_index')
+        # Extract company name from filename (split by _Q and take first part)
+        job['company_name'] = job['filename'].split('_Q')[0].replace('_', ' ')
+        return job
+
+    def _extract(self, job: Dict) -> Dict:
+        """Extract quotes from a transcript's text."""
+        # The text is only kept for verification
+        text = job['text'] if self.verify is not None else job.pop('text')
+        job['quotes'] = self.extract(text, job['company_name'],
+                                     job['pdf_path'], job['transcript_index'])
+        return job
+
+    def _verify(self, job: Dict) -> Dict:
+        """Check a transcript's quotes against its text."""
+        job['quotes'] = self.verify(
+            job['quotes'], job.pop('text'), job.pop('page_offsets'),
+            transcript_index=job.pop('transcript_index'))
+        return job
+
+    def _write(self, job: Dict) -> None:
+        """Save a transcript's quotes."""
+        self.write(job['quotes'], job['filename'], job['fiscal_year'],
+                   job['quarter'])
+        if self.on_done is not None:
+            self.on_done(job['pdf_path'])
+        self._finished(job, 'done', quotes=len(job['quotes']))
+
+    def _failed(self, job: Dict, error: Exception):
+        """Report a job that failed in any stage."""
+        if self.on_failure is not None:
+            self.on_failure(job['pdf_path'], str(error))
+        self._finished(job, 'failed', error=str(error))
+
+    def _finished(self, job: Dict, outcome: str, **fields):
+        """Record a transcript's outcome and its time in the pipeline."""
+        self.telemetry.count('files_total', outcome=outcome)
+        self.telemetry.event('file', file=job['pdf_path'], outcome=outcome,
+                             seconds=round(time.monotonic() -
+                                           job['submitted'], 3), **fields)
@@ -0,0 +1,330 @@
+import os
+import re
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from quote_store import QuoteStore
+
+DEDUP_PATH = os.path.join('state', 'quotes_dedup.db')
+# Estimated Jaccard similarity (of word pair sets) above which two quotes
+# count as the same
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_NUM_PERM = 64
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+WORD = re.compile(r"\w+(?:[.,%]\w+)*%?")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+-- mtime is the quote store's saved_at, the quotes file's mtime
+CREATE TABLE IF NOT EXISTS files (
+    source_path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    source_path TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    company TEXT,
+    fiscal_year TEXT,
+    quarter TEXT,
+    speaker TEXT,
+    quote TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_source ON quotes (source_path);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    quote_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS buckets_quote ON buckets (quote_id);
+"""
+
+
+def shingles(text: str) -> Set[int]:
+    """
+    Hash the overlapping word pairs of a quote, after lowercasing and
+    dropping punctuation (numbers such as '3.45%' are kept whole).
+
+    Args:
+        text (str): Quote text
+
+    Returns:
+        Set[int]: 64-bit shingle hashes
+    """
+    words = WORD.findall(text.lower())
+    pairs = [' '.join(words[i:i + 2]) for i in range(max(1, len(words) - 1))]
+    return {int.from_bytes(hashlib.blake2b(pair.encode('utf-8'),
+                                           digest_size=8).digest(), 'big')
+            for pair in pairs if pair}
+
+
+def _lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows = num_perm whose S-curve turns at
+    the threshold, i.e. (1 / bands) ** (1 / rows) is closest to it.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1)
+               if num_perm % b == 0]
+    return min(options,
+               key=lambda o: abs((1 / o[0]) ** (1 / o[1]) - threshold))
+
+
+class MinHasher:
+    """MinHash signatures from num_perm universal hash permutations."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, hashes: Set[int]) -> array:
+        """MinHash signature of a set of shingle hashes."""
+        if not hashes:
+            return array('Q', [_MAX_HASH] * self.num_perm)
+        return array('Q', [min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+                           for a, b in self._perms])
+
+
+def similarity(first: array, second: array) -> float:
+    """Jaccard similarity estimated from two MinHash signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class QuoteDedupIndex:
+    """
+    Persistent MinHash/LSH index of every quote in the quote store, for
+    finding near-duplicates without comparing against the whole archive.
+
+    Each quote's signature is cut into bands, and quotes sharing a band
+    bucket are the only candidates compared, so a lookup costs a few index
+    probes however many quotes are stored. Candidates are confirmed by the
+    similarity of their full signatures.
+    """
+
+    def __init__(self, path: str = DEDUP_PATH,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM):
+        """
+        Open (and create if needed) the index.
+
+        Args:
+            path (str): SQLite database file
+            threshold (float): Estimated Jaccard similarity of word pairs
+                from which quotes count as duplicates
+            num_perm (int): MinHash signature length
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = _lsh_bands(threshold, num_perm)
+        # Shared by the pipeline's writer threads; every access holds it
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+        settings = f"{num_perm}/{self.bands}x{self.rows}"
+        row = self._db.execute(
+            "SELECT value FROM settings WHERE key = 'lsh'").fetchone()
+        if row is not None and row[0] != settings:
+            # Signatures and buckets from other settings cannot be compared
+            print(f"Dedup index settings changed ({row[0]} -> {settings}); "
+                  f"rebuilding")
+            with self._db:
+                for table in ('files', 'quotes', 'buckets'):
+                    self._db.execute(f"DELETE FROM {table}")
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO settings VALUES "
+                             "('lsh', ?)", (settings,))
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def _band_keys(self, signature: array) -> List[Tuple[int, int]]:
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(chunk.tobytes(), digest_size=8).digest()
+            keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+        return keys
+
+    def matches(self, signature: array, exclude_source: Optional[str] = None
+                ) -> List[Dict]:
+        """
+        Stored quotes similar to a signature, most similar first.
+
+        Args:
+            signature (array): MinHash signature of the new quote
+            exclude_source (str): Ignore quotes from this file (e.g. the
+                earlier output of a transcript being reprocessed)
+
+        Returns:
+            List[Dict]: Matching quotes with their 'similarity'
+        """
+        with self._lock:
+            candidates = set()
+            for band, bucket in self._band_keys(signature):
+                candidates.update(row[0] for row in self._db.execute(
+                    "SELECT quote_id FROM buckets WHERE band = ? "
+                    "AND bucket = ?", (band, bucket)))
+            rows = [self._db.execute(
+                "SELECT source_path, company, fiscal_year, quarter, speaker, "
+                "quote, signature FROM quotes WHERE id = ?",
+                (quote_id,)).fetchone() for quote_id in candidates]
+
+        found = []
+        for source_path, company, fiscal_year, quarter, speaker, quote, \
+                stored in rows:
+            if source_path == exclude_source:
+                continue
+            score = similarity(signature, array('Q', stored))
+            if score >= self.threshold:
+                found.append({'source_path': source_path, 'company': company,
+                              'fiscal_year': fiscal_year, 'quarter': quarter,
+                              'speaker': speaker, 'quote': quote,
+                              'similarity': score})
+        found.sort(key=lambda match: -match['similarity'])
+        return found
+
+    def check(self, quotes: List[Dict], source_path: str, drop: bool = False
+              ) -> List[Dict]:
+        """
+        Find near-duplicates among a transcript's new quotes, both within
+        the call (a later quote repeating an earlier, higher-ranked one)
+        and against quotes already in the index from other files.
+
+        Duplicates get a 'duplicate_of' field naming the quote they repeat,
+        or are removed when drop is set.
+
+        Args:
+            quotes (List[Dict]): New quotes, most significant first
+            source_path (str): Output file the quotes will be saved to
+            drop (bool): Remove duplicates instead of flagging them
+
+        Returns:
+            List[Dict]: The quotes to save
+        """
+        kept = []
+        seen: List[Tuple[Dict, array]] = []
+        for quote in quotes:
+            quote.pop('duplicate_of', None)
+            signature = self.hasher.signature(shingles(quote['quote']))
+            duplicate = None
+            for earlier, earlier_signature in seen:
+                if similarity(signature, earlier_signature) >= self.threshold:
+                    duplicate = {'source_path': source_path,
+                                 'speaker': earlier.get('speaker'),
+                                 'quote': earlier['quote']}
+                    break
+            if duplicate is None:
+                found = self.matches(signature, exclude_source=source_path)
+                if found:
+                    duplicate = {key: found[0][key] for key in
+                                 ('source_path', 'speaker', 'quote')}
+            if duplicate is None:
+                seen.append((quote, signature))
+                kept.append(quote)
+                continue
+            print(f"Near-duplicate quote from {quote.get('company')} "
+                  f"{quote.get('speaker')} repeats {duplicate['source_path']}"
+                  f"{' (dropped)' if drop else ''}")
+            if not drop:
+                quote['duplicate_of'] = duplicate
+                kept.append(quote)
+        return kept
+
+    def add_file(self, source_path: str, quotes: List[Dict],
+                 saved_at: Optional[float] = None):
+        """
+        Index a saved quotes file, replacing what was indexed for it before.
+        Quotes flagged as duplicates are not indexed.
+
+        Args:
+            source_path (str): Quotes JSON file
+            quotes (List[Dict]): Its quotes, most significant first
+            saved_at (float): When the quote store saved them, which
+                sync_store compares against
+        """
+        rows = [(rank, quote, self.hasher.signature(shingles(quote['quote'])))
+                for rank, quote in enumerate(quotes)
+                if not quote.get('duplicate_of')]
+        mtime, size = saved_at, None
+
+        with self._lock, self._db:
+            self._remove(source_path)
+            for rank, quote, signature in rows:
+                quote_id = self._db.execute(
+                    "INSERT INTO quotes (source_path, rank, company, "
+                    "fiscal_year, quarter, speaker, quote, signature) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source_path, rank, quote.get('company'),
+                     quote.get('fiscal_year'), quote.get('quarter'),
+                     quote.get('speaker'), quote['quote'],
+                     signature.tobytes())).lastrowid
+                self._db.executemany(
+                    "INSERT INTO buckets (band, bucket, quote_id) "
+                    "VALUES (?, ?, ?)",
+                    [(band, bucket, quote_id) for band, bucket
+                     in self._band_keys(signature)])
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                             (source_path, mtime, size))
+
+    def _remove(self, source_path: str):
+        self._db.execute(
+            "DELETE FROM buckets WHERE quote_id IN "
+            "(SELECT id FROM quotes WHERE source_path = ?)", (source_path,))
+        self._db.execute("DELETE FROM quotes WHERE source_path = ?",
+                         (source_path,))
+        self._db.execute("DELETE FROM files WHERE source_path = ?",
+                         (source_path,))
+
+    def sync_store(self, store: 'QuoteStore') -> int:
+        """
+        Bring the index up to date with the quote store: index new and
+        re-saved transcripts and forget removed ones.
+
+        Args:
+            store (QuoteStore): Store holding every saved quote
+
+        Returns:
+            int: Number of files (re)indexed
+        """
+        saved = store.saved()
+        with self._lock:
+            known = dict(self._db.execute(
+                "SELECT source_path, mtime FROM files"))
+        indexed = 0
+        for source_path in sorted(saved):
+            if known.get(source_path) == saved[source_path]:
+                continue
+            self.add_file(source_path, store.quotes_of(source_path),
+                          saved_at=saved[source_path])
+            indexed += 1
+
+        missing = set(known) - set(saved)
+        with self._lock, self._db:
+            for source_path in missing:
+                self._remove(source_path)
+        return indexed
+
+    def count(self) -> int:
+        """Number of indexed quotes."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
@@ -1,15 +1,44 @@
-import nltk
-from typing import List
+import math
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
 import re
-from nlp_setup import initialize_nltk
+from chunking import SPEAKER_LINE, split_segments
+from keyword_matcher import KeywordMatcher
+from lexicon import FINANCIAL_LEXICON, QUOTE_KEYWORDS
+
+# Numeric language scored alongside the lexicon, with weights
+QUANTITATIVE = re.compile(
+    r"(?:\d+(?:\.\d+)?\s*(?:%|percent|bps|basis points|x\b)|"
+    r"(?:inr|rs\.?|usd|\$|₹)\s*\d|\b\d+(?:\.\d+)?\s*(?:crore|lakh|million|"
+    r"billion|bn|mn|cr)\b)", re.IGNORECASE)
+FISCAL_PERIOD = re.compile(r"\b(?:fy|q[1-4])\s*'?\d{2}\b", re.IGNORECASE)
+NUMBER = re.compile(r"\b\d{2,}(?:[.,]\d+)?\b")
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+PATTERN_WEIGHTS = ((QUANTITATIVE, 2.0), (FISCAL_PERIOD, 1.5), (NUMBER, 0.5))
+
+# PDF artifacts removed from quotes
+PARENTHESIZED = re.compile(r'\s*\([^)]*\)')
+SPECIAL_CHARS = re.compile(r'[^\w\s.,!?-]')
+
 
 class QuoteExtractor:
     """Handles extraction of relevant quotes from text content."""
 
-    def __init__(self):
-        """Initialize the quote extractor."""
-        # Initialize NLTK
-        initialize_nltk()
+    def __init__(self,
+                 lexicon: Optional[Dict[str, float]] = None,
+                 keywords: Optional[Dict[str, float]] = None):
+        """
+        Initialize the quote extractor.
+
+        Args:
+            lexicon (Dict[str, float]): Weighted terms used to score passages
+                (defaults to FINANCIAL_LEXICON)
+            keywords (Dict[str, float]): Terms a sentence needs for
+                extract_quotes (defaults to QUOTE_KEYWORDS)
+        """
+        self.lexicon_matcher = KeywordMatcher(lexicon or FINANCIAL_LEXICON)
+        self.keyword_matcher = KeywordMatcher(keywords or QUOTE_KEYWORDS)
 
     def extract_quotes(self, text: str) -> List[str]:
         """
@@ -25,26 +54,32 @@ class QuoteExtractor:
 
         try:
             # Simple sentence splitting as fallback
-            if '\n' in text:
-                sentences = [s.strip() for s in text.split('\n') if s.strip()]
-            else:
-                sentences = [s.strip() + '.' for s in text.split('.') if s.strip()]
-
-            # Keywords that might indicate important quotes
-            keywords = [
-                'revenue', 'profit', 'growth', 'margin',
-                'guidance', 'forecast', 'outlook',
-                'increase', 'decrease', 'decline',
-                'strategy', 'performance'
-            ]
-
-            for sentence in sentences:
-                # Check if sentence contains any keywords
-                if any(keyword in sentence.lower() for keyword in keywords):
-                    # Clean the quote
-                    clean_quote = self._clean_quote(sentence)
-                    if clean_quote:
-                        quotes.append(clean_quote)
+            separator = '\n' if '\n' in text else '.'
+            starts = []
+            sentences = []
+            position = 0
+            for part in text.split(separator):
+                if part.strip():
+                    starts.append(position)
+                    sentences.append(part.strip() +
+                                     ('.' if separator == '.' else ''))
+                # Matcher offsets are in bytes
+                position += len(part.encode('utf-8')) + 1
+
+            # One pass of the keyword matcher over the whole text, then map
+            # each hit back to the sentence it falls in
+            matched = sorted({
+                bisect_right(starts, match.start) - 1
+                for match in self.keyword_matcher.find(text)
+            })
+
+            for index in matched:
+                if index < 0:
+                    continue
+                # Clean the quote
+                clean_quote = self._clean_quote(sentences[index])
+                if clean_quote:
+                    quotes.append(clean_quote)
 
         except Exception as e:
             print(f"Warning: Quote extraction failed: {str(e)}")
@@ -52,6 +87,94 @@ class QuoteExtractor:
 
         return quotes
 
+    def score_passage(self, passage: str) -> float:
+        """
+        Score a passage for forward-looking, guidance and quantitative
+        language. The score is damped by length so long sentences do not
+        win on word count alone.
+
+        Args:
+            passage (str): Sentence or speaker turn
+
+        Returns:
+            float: Relevance score, 0 when nothing matches
+        """
+        score = self.lexicon_matcher.score(passage) + sum(
+            weight * len(pattern.findall(passage))
+            for pattern, weight in PATTERN_WEIGHTS)
+        return score / math.sqrt(1 + len(passage.split()) / 20)
+
+    def select_passages(self,
+                        text: str,
+                        top_k: Optional[int] = None,
+                        context: int = 1,
+                        keep_ratio: float = 0.2,
+                        header_chars: int = 1500) -> str:
+        """
+        Shrink a transcript to its most relevant sentences before it is sent
+        to Claude.
+
+        Sentences are scored within their speaker turn; the best are kept
+        together with up to `context` neighbouring sentences on each side,
+        under their speaker label and in transcript order, until top_k
+        sentences (context included) are kept. The start of the transcript
+        (usually the list of participants and their roles) is always kept.
+
+        Args:
+            text (str): Transcript text
+            top_k (int): Sentences to keep, counting context sentences;
+                defaults to keep_ratio of them
+            context (int): Neighbouring sentences kept around each pick
+            keep_ratio (float): Share of sentences kept when top_k is None
+            header_chars (int): Characters of the transcript start to keep
+
+        Returns:
+            str: Reduced transcript
+        """
+        segments = split_segments(text)
+        turns: List[Tuple[str, List[str]]] = []
+        for segment in segments:
+            label = ''
+            match = SPEAKER_LINE.match(segment)
+            if match:
+                label = match.group(0).strip()
+                segment = segment[match.end():]
+            sentences = [s for s in SENTENCE_END.split(' '.join(segment.split()))
+                         if s]
+            turns.append((label, sentences))
+
+        scored = [(self.score_passage(sentence), t, i)
+                  for t, (_, sentences) in enumerate(turns)
+                  for i, sentence in enumerate(sentences)]
+        if top_k is None:
+            top_k = max(1, round(len(scored) * keep_ratio))
+
+        keep = set()
+        for _, t, i in sorted((s for s in scored if s[0] > 0), reverse=True):
+            if len(keep) >= top_k:
+                break
+            # The pick first, then its neighbours nearest first
+            window = [i] + [j for offset in range(1, context + 1)
+                            for j in (i - offset, i + offset)]
+            for j in window:
+                if len(keep) >= top_k:
+                    break
+                if 0 <= j < len(turns[t][1]):
+                    keep.add((t, j))
+
+        passages = [' '.join(text[:header_chars].split())]
+        for t, (label, sentences) in enumerate(turns):
+            kept = [i for i in range(len(sentences)) if (t, i) in keep]
+            if not kept:
+                continue
+            parts = []
+            for previous, i in zip([None] + kept, kept):
+                if previous is not None and i != previous + 1:
+                    parts.append('[...]')
+                parts.append(sentences[i])
+            passages.append(f"{label} {' '.join(parts)}".strip())
+        return '\n\n'.join(passages)
+
     def _clean_quote(self, quote: str) -> str:
         """
         Clean and format a quote.
@@ -66,9 +189,39 @@ class QuoteExtractor:
         quote = ' '.join(quote.split())
 
         # Remove common PDF artifacts
-        quote = re.sub(r'\s*\([^)]*\)', '', quote)
+        quote = PARENTHESIZED.sub('', quote)
 
         # Remove any remaining special characters
-        quote = re.sub(r'[^\w\s.,!?-]', '', quote)
-
-        return quote.strip()
\ No newline at end of file
+        quote = SPECIAL_CHARS.sub('', quote)
+
+        return quote.strip()
+
+
+def quote_overlap(reference: List[dict], candidate: List[dict],
+                  threshold: float = 0.5) -> float:
+    """
+    Share of reference quotes that also appear among candidate quotes,
+    matching on word overlap (Jaccard) of the quote text.
+
+    Used to check that the pre-filter does not lose quotes that extraction
+    from the full transcript finds.
+
+    Args:
+        reference (List[dict]): Quotes from the full transcript
+        candidate (List[dict]): Quotes from the filtered transcript
+        threshold (float): Jaccard similarity counted as the same quote
+
+    Returns:
+        float: Recall between 0 and 1 (1 when reference is empty)
+    """
+    def words(quote):
+        return set(re.findall(r'\w+', quote['quote'].lower()))
+
+    candidate_words = [words(q) for q in candidate]
+    matched = 0
+    for quote in reference:
+        ref = words(quote)
+        if any(ref and len(ref & c) / len(ref | c) >= threshold
+               for c in candidate_words):
+            matched += 1
+    return matched / len(reference) if reference else 1.0
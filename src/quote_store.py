@@ -0,0 +1,404 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from tweet_queue import TWEET_QUEUE_PATH, make_post_id
+
+STORE_PATH = os.path.join('state', 'quotes.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    source_path TEXT PRIMARY KEY,
+    pdf_path TEXT,
+    company TEXT COLLATE NOCASE,
+    fiscal_year TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    quote_count INTEGER NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quotes (
+    source_path TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    quote_id TEXT NOT NULL,
+    company TEXT COLLATE NOCASE,
+    fiscal_year TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    speaker TEXT COLLATE NOCASE,
+    speaker_name TEXT COLLATE NOCASE,
+    description TEXT,
+    quote TEXT NOT NULL,
+    data TEXT NOT NULL,
+    posted_at REAL,
+    tweet_id TEXT,
+    PRIMARY KEY (source_path, rank)
+);
+CREATE INDEX IF NOT EXISTS quotes_period
+    ON quotes (fiscal_year, quarter, company);
+CREATE INDEX IF NOT EXISTS quotes_company
+    ON quotes (company, fiscal_year, quarter);
+CREATE INDEX IF NOT EXISTS quotes_speaker
+    ON quotes (speaker, fiscal_year, quarter);
+CREATE INDEX IF NOT EXISTS quotes_speaker_name
+    ON quotes (speaker_name, fiscal_year, quarter);
+CREATE INDEX IF NOT EXISTS quotes_unposted
+    ON quotes (fiscal_year, quarter) WHERE posted_at IS NULL;
+CREATE INDEX IF NOT EXISTS quotes_id ON quotes (quote_id);
+"""
+
+
+class QuoteStore:
+    """
+    SQLite store of every saved quote, indexed by company, fiscal year,
+    quarter, speaker and posted status.
+
+    Quotes are stored per transcript under the path of its quotes file
+    (output/<FY>/<Q>/<name>_quotes.json), the same key the tweet queue and
+    dedup index use. Saving a transcript replaces its quotes in one
+    transaction, so readers see either the old set or the new one, and
+    quotes that were already posted stay marked as posted.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        """
+        Open (and create if needed) the store.
+
+        Args:
+            path (str): SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Shared by the pipeline's writer threads; every access holds it
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # The poster reads while the extractor writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def is_empty(self) -> bool:
+        """Whether no transcript has been stored yet."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM transcripts LIMIT 1").fetchone() is None
+
+    def save(self, source_path: str, quotes: List[Dict],
+             pdf_path: Optional[str] = None,
+             saved_at: Optional[float] = None):
+        """
+        Store a transcript's quotes, replacing any stored before.
+
+        Args:
+            source_path (str): Path of the transcript's quotes file
+            quotes (List[Dict]): Quotes, most significant first
+            pdf_path (str): Transcript PDF, if known
+            saved_at (float): When the quotes were saved (defaults to now)
+        """
+        # output/<FY>/<Q>/ gives the quarter of quotes that lack it
+        parts = source_path.split(os.sep)
+        fiscal_year, quarter = (parts[-3], parts[-2]) if len(parts) >= 3 \
+            else ('', '')
+        rows = []
+        for rank, quote in enumerate(quotes):
+            rows.append((
+                source_path, rank, make_post_id(quote), quote.get('company'),
+                quote.get('fiscal_year') or fiscal_year,
+                quote.get('quarter') or quarter, quote.get('speaker'),
+                quote.get('speaker_name'), quote.get('description'),
+                quote.get('quote', ''), json.dumps(quote)))
+        company = quotes[0].get('company') if quotes else None
+        with self._lock, self._db:
+            posted = {row[0]: row[1:] for row in self._db.execute(
+                "SELECT quote_id, posted_at, tweet_id FROM quotes "
+                "WHERE source_path = ? AND posted_at IS NOT NULL",
+                (source_path,))}
+            self._db.execute("DELETE FROM quotes WHERE source_path = ?",
+                             (source_path,))
+            self._db.executemany(
+                "INSERT INTO quotes (source_path, rank, quote_id, company, "
+                "fiscal_year, quarter, speaker, speaker_name, description, "
+                "quote, data, posted_at, tweet_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + posted.get(row[2], (None, None)) for row in rows])
+            self._db.execute(
+                "INSERT OR REPLACE INTO transcripts (source_path, pdf_path, "
+                "company, fiscal_year, quarter, quote_count, saved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_path, pdf_path, company, fiscal_year, quarter,
+                 len(rows), saved_at or time.time()))
+
+    def remove(self, source_path: str):
+        """Forget a transcript and its quotes."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM quotes WHERE source_path = ?",
+                             (source_path,))
+            self._db.execute("DELETE FROM transcripts WHERE source_path = ?",
+                             (source_path,))
+
+    def import_outputs(self, root: str = 'output') -> int:
+        """
+        Import quotes files under root that are not stored yet or changed
+        since they were stored, e.g. everything written before the store
+        existed.
+
+        Args:
+            root (str): Output directory
+
+        Returns:
+            int: Number of files imported
+        """
+        with self._lock:
+            stored = dict(self._db.execute(
+                "SELECT source_path, saved_at FROM transcripts"))
+        imported = 0
+        for source_path in sorted(glob.glob(
+                os.path.join(root, '*', '*', '*_quotes.json'))):
+            mtime = os.stat(source_path).st_mtime
+            if source_path in stored and stored[source_path] >= mtime:
+                continue
+            try:
+                with open(source_path, 'r') as f:
+                    quotes = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Cannot import {source_path}: {str(e)}")
+                continue
+            self.save(source_path, quotes, saved_at=mtime)
+            imported += 1
+        return imported
+
+    def import_posted(self, queue_path: str = TWEET_QUEUE_PATH) -> int:
+        """
+        Mark quotes posted according to the tweet queue, for posts made
+        before the store existed.
+
+        Args:
+            queue_path (str): Tweet queue database
+
+        Returns:
+            int: Number of quotes newly marked as posted
+        """
+        if not os.path.exists(queue_path):
+            return 0
+        queue = sqlite3.connect(queue_path)
+        try:
+            posts = queue.execute(
+                "SELECT post_id, quote_ids, tweet_id, posted_at FROM posts "
+                "WHERE status = 'posted'").fetchall()
+        except sqlite3.OperationalError:
+            # Queue from before threads were recorded per quote
+            posts = [(post_id, None, tweet_id, posted_at)
+                     for post_id, tweet_id, posted_at in queue.execute(
+                         "SELECT post_id, tweet_id, posted_at FROM posts "
+                         "WHERE status = 'posted'")]
+        finally:
+            queue.close()
+        marked = 0
+        for post_id, quote_ids, tweet_id, posted_at in posts:
+            marked += self.mark_posted((quote_ids or post_id).split(),
+                                       tweet_id, posted_at)
+        return marked
+
+    def mark_posted(self, quote_ids: Iterable[str],
+                    tweet_id: Optional[str] = None,
+                    posted_at: Optional[float] = None) -> int:
+        """
+        Record that quotes were posted.
+
+        Args:
+            quote_ids (Iterable[str]): IDs of the quotes (see make_post_id)
+            tweet_id (str): ID of the tweet, if known
+            posted_at (float): When they were posted (defaults to now)
+
+        Returns:
+            int: Number of stored quotes newly marked
+        """
+        posted_at = posted_at or time.time()
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "UPDATE quotes SET posted_at = ?, tweet_id = ? "
+                "WHERE quote_id = ? AND posted_at IS NULL",
+                [(posted_at, tweet_id, quote_id) for quote_id in quote_ids])
+            return self._db.total_changes - before
+
+    @staticmethod
+    def _where(company: Optional[str] = None,
+               fiscal_year: Optional[str] = None,
+               quarter: Optional[str] = None,
+               speaker: Optional[str] = None,
+               posted: Optional[bool] = None,
+               text: Optional[str] = None) -> Tuple[str, List]:
+        clauses = []
+        params: List = []
+        for column, value in (('company', company),
+                              ('fiscal_year', fiscal_year),
+                              ('quarter', quarter)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if speaker:
+            # A role such as CFO, or a name
+            clauses.append("(speaker = ? OR speaker_name = ?)")
+            params += [speaker, speaker]
+        if posted is not None:
+            clauses.append("posted_at IS NOT NULL" if posted
+                           else "posted_at IS NULL")
+        if text:
+            clauses.append("(quote LIKE ? OR description LIKE ?)")
+            params += [f"%{text}%", f"%{text}%"]
+        return ' AND '.join(clauses) or '1', params
+
+    def query(self, company: Optional[str] = None,
+              fiscal_year: Optional[str] = None,
+              quarter: Optional[str] = None,
+              speaker: Optional[str] = None,
+              posted: Optional[bool] = None,
+              text: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """
+        Find stored quotes. Every filter is optional; company and speaker
+        match regardless of case.
+
+        Args:
+            company (str): Company name
+            fiscal_year (str): Fiscal year, e.g. 'FY25'
+            quarter (str): Quarter, e.g. 'Q2'
+            speaker (str): Speaker role (e.g. 'CFO') or name
+            posted (bool): Only posted (True) or unposted (False) quotes
+            text (str): Words found in the quote or its description
+            limit (int): Most quotes to return
+
+        Returns:
+            List[Dict]: Quotes as saved, plus 'source_path', 'rank',
+                'posted_at' and 'tweet_id', by transcript and rank
+        """
+        where, params = self._where(company, fiscal_year, quarter, speaker,
+                                    posted, text)
+        sql = (f"SELECT data, source_path, rank, posted_at, tweet_id "
+               f"FROM quotes WHERE {where} ORDER BY fiscal_year, quarter, "
+               f"source_path, rank")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(json.loads(data), source_path=source_path, rank=rank,
+                     posted_at=posted_at, tweet_id=tweet_id)
+                for data, source_path, rank, posted_at, tweet_id in rows]
+
+    def files(self, fiscal_year: Optional[str] = None,
+              quarter: Optional[str] = None,
+              company: Optional[str] = None
+              ) -> List[Tuple[str, List[Dict]]]:
+        """
+        Stored transcripts with their quotes in rank order, as read from
+        their quotes files, e.g. for TweetPacker.pack().
+
+        Returns:
+            List[Tuple[str, List[Dict]]]: (source_path, quotes)
+        """
+        where, params = self._where(company, fiscal_year, quarter)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT source_path, data FROM quotes WHERE {where} "
+                f"ORDER BY source_path, rank", params).fetchall()
+        files: Dict[str, List[Dict]] = {}
+        for source_path, data in rows:
+            files.setdefault(source_path, []).append(json.loads(data))
+        return list(files.items())
+
+    def saved(self) -> Dict[str, float]:
+        """When each stored transcript was saved, keyed by source_path."""
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT source_path, saved_at FROM transcripts"))
+
+    def quotes_of(self, source_path: str) -> List[Dict]:
+        """A stored transcript's quotes as saved, in rank order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM quotes WHERE source_path = ? ORDER BY rank",
+                (source_path,)).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of transcripts, quotes and posted quotes stored."""
+        with self._lock:
+            transcripts = self._db.execute(
+                "SELECT COUNT(*) FROM transcripts").fetchone()[0]
+            quotes, posted = self._db.execute(
+                "SELECT COUNT(*), COUNT(posted_at) FROM quotes").fetchone()
+        return {'transcripts': transcripts, 'quotes': quotes,
+                'posted': posted}
+
+
+def open_store(path: str = STORE_PATH) -> QuoteStore:
+    """Open the store, importing output/ and posted tweets when it is new."""
+    store = QuoteStore(path)
+    if store.is_empty():
+        imported = store.import_outputs()
+        if imported:
+            posted = store.import_posted()
+            print(f"Imported {imported} quote files into {store.path} "
+                  f"({posted} quotes already posted)")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query the quote store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate = subparsers.add_parser(
+        'import', help='Import new and changed quote files under output/ '
+        'and posted tweets from the tweet queue')
+    migrate.add_argument('--root', default='output')
+    query = subparsers.add_parser('query', help='Print matching quotes')
+    query.add_argument('--company')
+    query.add_argument('--quarter', nargs=2,
+                       metavar=('FISCAL_YEAR', 'QUARTER'))
+    query.add_argument('--fiscal-year')
+    query.add_argument('--speaker', help='Role (e.g. CFO) or name')
+    query.add_argument('--text', help='Words in the quote or description')
+    posted = query.add_mutually_exclusive_group()
+    posted.add_argument('--posted', action='store_true', default=None)
+    posted.add_argument('--unposted', dest='posted', action='store_false')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--json', action='store_true',
+                       help='Print JSON Lines instead of text')
+    args = parser.parse_args()
+
+    store = QuoteStore()
+    try:
+        if args.command == 'import':
+            imported = store.import_outputs(args.root)
+            posted = store.import_posted()
+            print(f"Imported {imported} quote files, marked {posted} quotes "
+                  f"posted: {store.counts()}")
+        else:
+            fiscal_year, quarter = args.quarter or (args.fiscal_year, None)
+            started = time.perf_counter()
+            quotes = store.query(args.company, fiscal_year, quarter,
+                                 args.speaker, args.posted, args.text,
+                                 args.limit)
+            elapsed = time.perf_counter() - started
+            for quote in quotes:
+                if args.json:
+                    print(json.dumps(quote))
+                    continue
+                print(f"{quote['company']} {quote['speaker']} on "
+                      f"{quote['description']} ({quote.get('fiscal_year')} "
+                      f"{quote.get('quarter')}):")
+                print(f"\"{quote['quote']}\"")
+                print("-" * 30)
+            if not args.json:
+                print(f"{len(quotes)} quotes in {elapsed * 1000:.1f} ms")
+    finally:
+        store.close()
@@ -0,0 +1,216 @@
+import re
+import bisect
+import difflib
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from transcript_index import Transcript
+
+# Quotes scoring at least this are verbatim (up to PDF extraction noise)
+VERIFIED_SCORE = 0.9
+# Quotes scoring below this are treated as fabricated
+REJECT_SCORE = 0.6
+NGRAM = 3
+# A changed figure matters more than a changed word
+NUMBER_WEIGHT = 5
+# Best n-gram alignments of a segment scored in full
+MAX_CANDIDATES = 5
+# Where Claude marked words as left out of a quote
+ELLIPSIS = re.compile(r"\s*(?:\.\s*\.\s*\.|…|\[\.\.\.\])\s*")
+# Words; NUL characters stand in for hyphenated line breaks inside a word
+TOKEN = re.compile(r"[^\W_]+(?:\0+[^\W_]+)*")
+# Words split over a line break by the PDF, e.g. "manage-\nment"
+LINE_BREAK_HYPHEN = re.compile(r"(?<=\w)-[ \t]*\n\s*(?=\w)")
+
+
+def _weight(token: str) -> int:
+    return NUMBER_WEIGHT if any(char.isdigit() for char in token) else 1
+
+
+def tokenize(text: str) -> Tuple[List[str], List[int]]:
+    """
+    Split text into lowercase word tokens, so that punctuation, quote
+    styles and whitespace do not matter; ligatures and other compatibility
+    characters are normalized.
+
+    Args:
+        text (str): Transcript or quote text
+
+    Returns:
+        Tuple[List[str], List[int]]: Tokens and the offset of each in text
+    """
+    tokens, offsets = [], []
+    for match in TOKEN.finditer(text):
+        tokens.append(unicodedata.normalize(
+            'NFKC', match.group().replace('\0', '')).lower())
+        offsets.append(match.start())
+    return tokens, offsets
+
+
+class TranscriptIndex:
+    """
+    Word n-gram index of one transcript, built once and used to locate
+    every quote extracted from it.
+
+    A quote segment is aligned by letting each of its n-grams vote for the
+    transcript position it implies; only the best few alignments are
+    compared word by word, so a lookup costs roughly the length of the
+    quote rather than of the transcript.
+    """
+
+    def __init__(self, text: str, page_offsets: Optional[List[int]] = None):
+        """
+        Index a transcript.
+
+        Args:
+            text (str): Transcript text as extracted from the PDF
+            page_offsets (List[int]): Start of each page in text, as
+                returned by PDFProcessor.extract_document
+        """
+        self.page_offsets = page_offsets or [0]
+        # Rejoin hyphenated line breaks without moving any offset
+        tokens, offsets = tokenize(LINE_BREAK_HYPHEN.sub(
+            lambda m: '\0' * len(m.group()), text))
+        self.tokens = tokens
+        self.offsets = offsets
+        self.ngrams: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for position in range(len(tokens) - NGRAM + 1):
+            self.ngrams[tuple(tokens[position:position + NGRAM])].append(
+                position)
+
+    def page_of(self, offset: int) -> int:
+        """1-based page number holding a character offset."""
+        return max(1, bisect.bisect_right(self.page_offsets, offset))
+
+    def _candidates(self, words: List[str]) -> List[int]:
+        """Transcript token positions where a segment may start."""
+        if len(words) < NGRAM:
+            # Too short for n-grams: every occurrence of its first word
+            return [i for i, token in enumerate(self.tokens)
+                    if token == words[0]][:MAX_CANDIDATES * 20]
+        votes = Counter()
+        for index in range(len(words) - NGRAM + 1):
+            for position in self.ngrams.get(
+                    tuple(words[index:index + NGRAM]), ()):
+                votes[position - index] += 1
+        return [start for start, _ in votes.most_common(MAX_CANDIDATES)]
+
+    def locate(self, segment: str) -> Tuple[float, Optional[int]]:
+        """
+        Find the best match of one quote segment.
+
+        Args:
+            segment (str): Quote text without ellipses
+
+        Returns:
+            Tuple[float, Optional[int]]: Share of the segment's words found
+                in order at the best match, figures weighing NUMBER_WEIGHT
+                words, and the character offset of that match (None if
+                nothing matched)
+        """
+        words, _ = tokenize(segment)
+        if not words:
+            return 1.0, None
+        weights = [_weight(word) for word in words]
+        best_score, best_offset = 0.0, None
+        for start in self._candidates(words):
+            start = max(0, start)
+            # Allow a few words of slack for insertions in the transcript
+            window = self.tokens[start:start + len(words) + len(words) // 4
+                                 + 2]
+            if window[:len(words)] == words:
+                return 1.0, self.offsets[start]
+            matcher = difflib.SequenceMatcher(None, words, window,
+                                              autojunk=False)
+            blocks = matcher.get_matching_blocks()
+            score = sum(sum(weights[block.a:block.a + block.size])
+                        for block in blocks) / sum(weights)
+            if score > best_score and blocks[0].size:
+                first = blocks[0]
+                best_score = score
+                best_offset = self.offsets[min(start + first.b,
+                                               len(self.offsets) - 1)]
+        return best_score, best_offset
+
+    def verify(self, quote_text: str) -> Dict:
+        """
+        Locate a quote in the transcript. Parts separated by an ellipsis
+        are located separately and the score weighs each part by its length.
+
+        Args:
+            quote_text (str): The quote as returned by Claude
+
+        Returns:
+            Dict: 'score' (0-1), 'page' and 'offset' of the match, and
+                'verified' (score >= VERIFIED_SCORE)
+        """
+        segments = [s for s in ELLIPSIS.split(quote_text.strip('"')) if s]
+        total = 0
+        matched = 0.0
+        first_offset = None
+        for segment in segments:
+            weight = sum(map(_weight, tokenize(segment)[0]))
+            score, offset = self.locate(segment)
+            total += weight
+            matched += score * weight
+            if first_offset is None and offset is not None:
+                first_offset = offset
+        score = matched / total if total else 0.0
+        return {
+            'score': round(score, 3),
+            'page': self.page_of(first_offset)
+            if first_offset is not None else None,
+            'offset': first_offset,
+            'verified': score >= VERIFIED_SCORE
+        }
+
+
+def verify_quotes(quotes: List[Dict], text: str,
+                  page_offsets: Optional[List[int]] = None,
+                  reject: bool = False,
+                  reject_score: float = REJECT_SCORE,
+                  transcript_index: Optional[Dict] = None) -> List[Dict]:
+    """
+    Check every quote of a transcript against its text, adding a
+    'verification' field to each. With the transcript's speaker index,
+    quotes found in it also get their speaker's name and role and their
+    section from the turn they were found in.
+
+    Args:
+        quotes (List[Dict]): Quotes extracted from the transcript
+        text (str): Full transcript text
+        page_offsets (List[int]): Start of each page in text
+        reject (bool): Drop quotes scoring below reject_score instead of
+            keeping them flagged
+        reject_score (float): Score below which a quote counts as fabricated
+        transcript_index (Dict): Speaker turns of the text, from
+            index_transcript
+
+    Returns:
+        List[Dict]: The quotes to keep
+    """
+    if not quotes:
+        return quotes
+    index = TranscriptIndex(text, page_offsets)
+    transcript = Transcript(text, transcript_index) \
+        if transcript_index and transcript_index['turns'] else None
+    kept = []
+    for quote in quotes:
+        result = index.verify(quote['quote'])
+        quote['verification'] = result
+        if result['score'] < reject_score:
+            print(f"Quote not found in transcript ({result['score']:.0%} "
+                  f"match{', rejected' if reject else ''}): "
+                  f"{quote.get('company')} {quote.get('speaker')}: "
+                  f"\"{quote['quote'][:60]}...\"")
+            if reject:
+                continue
+        else:
+            if not result['verified']:
+                print(f"Quote only approximately matches page "
+                      f"{result['page']} ({result['score']:.0%}): "
+                      f"{quote.get('company')} {quote.get('speaker')}")
+            if transcript is not None and result['offset'] is not None:
+                transcript.attribute(quote, result['offset'])
+        kept.append(quote)
+    return kept
@@ -0,0 +1,90 @@
+import time
+import asyncio
+import threading
+from typing import Optional
+
+
+class _Bucket:
+    """Token bucket that refills continuously up to a per-minute capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket and return how long to wait for it."""
+        self.level = min(self.capacity,
+                         self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float):
+        """Give back (or, if negative, take more) reserved capacity."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by callers."""
+
+    def __init__(self,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute (float): Request budget, unlimited if None
+            tokens_per_minute (float): Token budget, unlimited if None
+        """
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve one request and the given tokens; return the wait time."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: int = 0):
+        """
+        Block until a request using the given tokens fits the budget.
+
+        Args:
+            tokens (int): Estimated tokens the request will use
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """
+        Wait, without blocking the event loop, until a request using the
+        given tokens fits the budget.
+
+        Args:
+            tokens (int): Estimated tokens the request will use
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Correct the token budget once the real usage of a request is known.
+
+        Args:
+            estimated_tokens (int): Tokens reserved when acquiring
+            actual_tokens (int): Tokens the request actually used
+        """
+        if self._tokens and actual_tokens != estimated_tokens:
+            with self._lock:
+                self._tokens.refund(estimated_tokens - actual_tokens)
@@ -0,0 +1,461 @@
+import time
+import random
+import asyncio
+import threading
+import email.utils
+from collections import Counter
+from typing import Callable, Optional
+
+# Statuses worth another attempt; 529 is Anthropic's "overloaded"
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Failures that mean we are sending too much, so concurrency is cut
+OVERLOAD_REASONS = {'429', '503', '529', 'timeout'}
+# Longest server-requested wait honored before a retry
+MAX_RETRY_AFTER = 300.0
+# Concurrency is cut at most once per this many seconds, so a burst of
+# failures from one overload does not collapse the limit
+DECREASE_INTERVAL = 2.0
+
+
+class CircuitOpenError(Exception):
+    """The API kept failing and the circuit breaker gave up waiting."""
+
+
+def classify(error: Exception) -> Optional[str]:
+    """
+    Reason an API error is worth retrying.
+
+    Args:
+        error (Exception): Error raised by an anthropic client call
+
+    Returns:
+        Optional[str]: The HTTP status, 'timeout' or 'connection', or None
+            if retrying cannot help (e.g. a bad request)
+    """
+    # Only reached once a request failed, so the SDK is already loaded
+    import anthropic
+    if isinstance(error, anthropic.APITimeoutError):
+        return 'timeout'
+    if isinstance(error, anthropic.APIConnectionError):
+        return 'connection'
+    if isinstance(error, anthropic.APIStatusError):
+        headers = error.response.headers
+        if headers.get('x-should-retry') == 'false':
+            return None
+        if (error.status_code in RETRY_STATUSES or
+                headers.get('x-should-retry') == 'true'):
+            return str(error.status_code)
+    return None
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from retry-after(-ms) headers."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP date form
+            date = email.utils.parsedate_to_datetime(value)
+            return max(0.0, date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit: grows by one request per limit's worth of
+    successes and halves on overload, like TCP congestion control.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, decrease: float = 0.5):
+        """
+        Initialize the limit at its maximum.
+
+        Args:
+            maximum (int): Most requests in flight at once
+            minimum (int): The limit never drops below this
+            decrease (float): Factor the limit is multiplied by on overload
+        """
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.decrease = decrease
+        self.limit = float(self.maximum)
+        self.lowest = self.limit
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # (loop, event) of each coroutine waiting for a slot; callers on
+        # any thread's event loop share the limit with blocking callers
+        self._async_waiters = []
+
+    def acquire(self):
+        """Block until a request may start."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may start."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1].wait()
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, overloaded: Optional[bool]):
+        """
+        Finish a request and adjust the limit.
+
+        Args:
+            overloaded (Optional[bool]): True if the API signalled overload,
+                False on success, None for other failures (no change)
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                if now - self._last_decrease >= DECREASE_INTERVAL:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.lowest = min(self.lowest, self.limit)
+                    self._last_decrease = now
+            elif overloaded is False:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Its event loop has closed
+                pass
+
+
+class HeldStream:
+    """
+    Response stream that keeps its request's concurrency slot until it is
+    closed, so a long stream counts against the limit while it runs.
+    """
+
+    def __init__(self, stream, limit: AdaptiveLimit):
+        self._stream = stream
+        self._limit = limit
+        self._held = True
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return iter(self._stream)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # A stream read to the end counts as a success
+        self.close(overloaded=False if exc_type is None else None)
+
+    def close(self, overloaded: Optional[bool] = None):
+        """Close the stream and free its slot (see AdaptiveLimit.release)."""
+        try:
+            self._stream.close()
+        finally:
+            if self._held:
+                self._held = False
+                self._limit.release(overloaded)
+
+
+class CircuitBreaker:
+    """
+    Stops all requests after repeated consecutive failures, then lets a
+    single probe through after a pause; the pause doubles each time the
+    probe fails too.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_timeout: float = 300.0):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open it
+            reset_timeout (float): First pause before a probe, in seconds
+            max_timeout (float): Longest pause before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """
+        Seconds before the caller may send a request; 0 means go ahead. The
+        first caller after a pause becomes the probe.
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return 0.0
+            if self.state == 'open':
+                remaining = self._opened_at + self._timeout - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state = 'half_open'
+                return 0.0
+            # Half open: wait for the probe's outcome
+            return min(1.0, self._timeout)
+
+    def record(self, success: bool):
+        """Record the outcome of a request."""
+        with self._lock:
+            if success:
+                if self.state != 'closed':
+                    print("Claude API is answering again; resuming requests")
+                self.state = 'closed'
+                self.failures = 0
+                self._timeout = self.reset_timeout
+                return
+            self.failures += 1
+            if self.state == 'half_open':
+                self._timeout = min(self.max_timeout, self._timeout * 2)
+            elif (self.state == 'open' or
+                  self.failures < self.failure_threshold):
+                return
+            else:
+                self.opened += 1
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+            print(f"Warning: Claude API failed {self.failures} times in a "
+                  f"row; pausing requests for {self._timeout:.0f}s")
+
+
+class RequestGuard:
+    """
+    Retry, concurrency and circuit-breaker policy around Claude API calls,
+    shared by every thread and event loop of one extractor.
+
+    Retryable failures (429, 529, 5xx, timeouts, dropped connections) are
+    retried with full-jitter exponential backoff, or after the server's
+    retry-after when it sends one. Overload cuts the AIMD concurrency limit
+    and sustained failure opens the circuit breaker, which pauses every
+    caller instead of letting each burn its retries.
+    """
+
+    def __init__(self, max_concurrency: int = 5, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_breaker_wait: float = 600.0):
+        """
+        Initialize the guard.
+
+        Args:
+            max_concurrency (int): Most requests in flight when healthy
+            max_retries (int): Retries per call before the error is raised
+            base_delay (float): Backoff before the first retry, in seconds
+            max_delay (float): Longest backoff between retries
+            failure_threshold (int): Consecutive failures that open the
+                circuit breaker
+            reset_timeout (float): Pause before probing an open breaker
+            max_breaker_wait (float): Longest one call waits on an open
+                breaker before raising CircuitOpenError
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_breaker_wait = max_breaker_wait
+        self.limit = AdaptiveLimit(max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.retries: Counter = Counter()
+        self.metrics = {'calls': 0, 'attempts': 0, 'gave_up': 0,
+                        'call_seconds': 0.0, 'backoff_seconds': 0.0,
+                        'breaker_seconds': 0.0, 'failed_seconds': 0.0}
+
+    def _add(self, **amounts: float):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.metrics[key] += amount
+
+    def _breaker_wait(self, waited: float) -> float:
+        """Time to wait on the breaker; raise if waited too long already."""
+        wait = self.breaker.wait_time()
+        if wait and waited + wait > self.max_breaker_wait:
+            raise CircuitOpenError(
+                f"Claude API unavailable for over {waited:.0f}s")
+        return wait
+
+    def _failed(self, error: Exception, attempt: int,
+                elapsed: float) -> Optional[float]:
+        """
+        Account for a failed attempt.
+
+        Returns:
+            Optional[float]: Backoff before the next attempt, or None if
+                the error should be raised
+        """
+        reason = classify(error)
+        self.limit.release(reason in OVERLOAD_REASONS if reason else None)
+        # Anything but a retryable failure shows the API is up
+        self.breaker.record(reason is None)
+        self._add(failed_seconds=elapsed)
+        if reason is None or attempt >= self.max_retries:
+            if reason is not None:
+                self._add(gave_up=1)
+            return None
+        with self._lock:
+            self.retries[reason] += 1
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(error)
+        if requested is not None:
+            # Honor the server, with a little jitter so callers spread out
+            delay = min(requested, MAX_RETRY_AFTER) + delay * 0.1
+        return delay
+
+    def call(self, function: Callable, *args, **kwargs):
+        """
+        Call an API method under the policy.
+
+        Args:
+            function (Callable): Client method, e.g. client.messages.create
+            *args, **kwargs: Passed to function
+
+        Returns:
+            The function's result
+        """
+        return self._call(function, args, kwargs)
+
+    def open_stream(self, function: Callable, *args, **kwargs) -> HeldStream:
+        """
+        Open a response stream under the policy. Only opening it is
+        retried, and its concurrency slot is held until it is closed.
+
+        Args:
+            function (Callable): Opens the stream and returns it once the
+                API answers
+            *args, **kwargs: Passed to function
+
+        Returns:
+            HeldStream: The stream; close it (or use it in a with block)
+        """
+        return HeldStream(self._call(function, args, kwargs, hold=True),
+                          self.limit)
+
+    def _call(self, function: Callable, args, kwargs, hold: bool = False):
+        start = time.monotonic()
+        self._add(calls=1)
+        attempt = 0
+        waited = 0.0
+        try:
+            while True:
+                wait = self._breaker_wait(waited)
+                if wait:
+                    waited += wait
+                    self._add(breaker_seconds=wait)
+                    time.sleep(wait)
+                    continue
+                self.limit.acquire()
+                self._add(attempts=1)
+                begin = time.monotonic()
+                try:
+                    result = function(*args, **kwargs)
+                except Exception as e:
+                    delay = self._failed(e, attempt,
+                                         time.monotonic() - begin)
+                    if delay is None:
+                        raise
+                    self._add(backoff_seconds=delay)
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                if not hold:
+                    self.limit.release(False)
+                self.breaker.record(True)
+                return result
+        finally:
+            self._add(call_seconds=time.monotonic() - start)
+
+    async def call_async(self, function: Callable, *args, **kwargs):
+        """Async version of call, for async client methods."""
+        start = time.monotonic()
+        self._add(calls=1)
+        attempt = 0
+        waited = 0.0
+        try:
+            while True:
+                wait = self._breaker_wait(waited)
+                if wait:
+                    waited += wait
+                    self._add(breaker_seconds=wait)
+                    await asyncio.sleep(wait)
+                    continue
+                await self.limit.acquire_async()
+                self._add(attempts=1)
+                begin = time.monotonic()
+                try:
+                    result = await function(*args, **kwargs)
+                except Exception as e:
+                    delay = self._failed(e, attempt,
+                                         time.monotonic() - begin)
+                    if delay is None:
+                        raise
+                    self._add(backoff_seconds=delay)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self.limit.release(False)
+                self.breaker.record(True)
+                return result
+        finally:
+            self._add(call_seconds=time.monotonic() - start)
+
+    def summary(self) -> str:
+        """Retries and the share of request time lost to throttling."""
+        with self._lock:
+            metrics = dict(self.metrics)
+            retries = dict(self.retries)
+        if not metrics['calls']:
+            return "no requests"
+        retried = sum(retries.values())
+        text = f"{metrics['calls']} calls, {retried} retries"
+        if retries:
+            text += " (" + ', '.join(f"{reason}: {count}" for reason, count
+                                     in sorted(retries.items())) + ")"
+        if metrics['gave_up']:
+            text += f", {metrics['gave_up']} gave up"
+        lost = (metrics['backoff_seconds'] + metrics['breaker_seconds'] +
+                metrics['failed_seconds'])
+        if retried or metrics['gave_up']:
+            text += (f"; {metrics['backoff_seconds']:.1f}s backing off, "
+                     f"{metrics['failed_seconds']:.1f}s in failed attempts")
+        if self.breaker.opened:
+            text += (f", breaker opened {self.breaker.opened}x "
+                     f"({metrics['breaker_seconds']:.1f}s paused)")
+        text += (f"; concurrency limit {self.limit.limit:.1f} of "
+                 f"{self.limit.maximum} (lowest {self.limit.lowest:.1f})")
+        if metrics['call_seconds']:
+            text += (f"; {lost / metrics['call_seconds']:.0%} of request "
+                     f"time lost to throttling")
+        return text
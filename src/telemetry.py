@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import threading
+from typing import Dict, Optional, Tuple
+
+# USD per million tokens: input, output, cache write, cache read. Models
+# are matched on these prefixes, so dated versions share a price
+PRICING = {
+    'claude-3-5-sonnet': (3.00, 15.00, 3.75, 0.30),
+    'claude-3-5-haiku': (0.80, 4.00, 1.00, 0.08),
+    'claude-3-7-sonnet': (3.00, 15.00, 3.75, 0.30),
+    'claude-sonnet-4': (3.00, 15.00, 3.75, 0.30),
+}
+# Message Batches requests are billed at half price
+BATCH_DISCOUNT = 0.5
+
+# Upper bounds in seconds of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+                   300)
+METRIC_PREFIX = 'earnings_bot'
+METRIC_HELP = {
+    'stage_seconds': 'Wall time of a stage for one file or call',
+    'stage_failures_total': 'Stage runs that raised',
+    'files_total': 'Transcripts finished, by outcome',
+    'tokens_total': 'Claude tokens, by model and kind',
+    'cost_usd_total': 'Estimated Claude cost in USD, by model',
+    'requests_total': 'Claude requests, by model and stage',
+    'parse_total': 'Claude replies and quotes parsed, malformed, repaired '
+                   'and dropped',
+    'tweets_total': 'Tweets attempted, by outcome',
+}
+
+
+def cost_usd(model: str, input_tokens: int, output_tokens: int,
+             cache_write_tokens: int = 0, cache_read_tokens: int = 0,
+             batch: bool = False) -> Optional[float]:
+    """
+    Estimate the price of one Claude request.
+
+    Args:
+        model (str): Model that answered
+        input_tokens (int): Uncached input tokens
+        output_tokens (int): Output tokens
+        cache_write_tokens (int): Input tokens written to the prompt cache
+        cache_read_tokens (int): Input tokens read from the prompt cache
+        batch (bool): Whether the request went through Message Batches
+
+    Returns:
+        float: Cost in USD, or None if the model is not in PRICING
+    """
+    prices = next((prices for prefix, prices in PRICING.items()
+                   if model.startswith(prefix)), None)
+    if prices is None:
+        return None
+    cost = (input_tokens * prices[0] + output_tokens * prices[1] +
+            cache_write_tokens * prices[2] +
+            cache_read_tokens * prices[3]) / 1e6
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def _escape(value) -> str:
+    """Escape a Prometheus label value."""
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+class _Timer:
+    """Times a `with` block and records it as one stage run."""
+
+    __slots__ = ('telemetry', 'stage', 'fields', 'started')
+
+    def __init__(self, telemetry: 'Telemetry', stage: str, fields: Dict):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.fields = fields
+
+    def note(self, **fields):
+        """Add fields to the stage event, e.g. how many quotes it parsed."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        self.telemetry.record_stage(self.stage,
+                                    time.perf_counter() - self.started,
+                                    ok=error_type is None, **self.fields)
+        return False
+
+
+class _NullTimer:
+    """Stand-in for _Timer when telemetry is off."""
+
+    __slots__ = ()
+
+    def note(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Telemetry:
+    """
+    Per-file stage timings, Claude token usage and cost, quote parse
+    outcomes and tweet outcomes.
+
+    Every record is appended as one JSON object per line to a JSON Lines
+    file, and running totals are rewritten to a Prometheus textfile
+    collector file (node_exporter --collector.textfile.directory). With
+    neither path set telemetry is off and every method returns at once.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None,
+                 textfile_path: Optional[str] = None,
+                 textfile_interval: float = 15.0):
+        """
+        Initialize telemetry.
+
+        Args:
+            jsonl_path (str): JSON Lines file events are appended to
+            textfile_path (str): Prometheus textfile (ending in .prom)
+                rewritten with the running totals
+            textfile_interval (float): Least seconds between rewrites of
+                the textfile; it is always written on close
+        """
+        self.jsonl_path = jsonl_path
+        self.textfile_path = textfile_path
+        self.textfile_interval = textfile_interval
+        self.enabled = bool(jsonl_path or textfile_path)
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._jsonl = None
+        # monotonic() of the last textfile write; None until the first
+        self._written: Optional[float] = None
+        self._unpriced = set()
+        # (name, labels) -> value, and (name, labels) -> [buckets, sum, count]
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], list] = {}
+
+    def stage(self, stage: str, **fields):
+        """
+        Time a `with` block as one run of a stage, e.g.
+        `with telemetry.stage('quote_parse', file=pdf_path) as timer:`.
+        Use timer.note(...) to add fields to the recorded event.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, fields)
+
+    def record_stage(self, stage: str, seconds: float, ok: bool = True,
+                     **fields):
+        """
+        Record one run of a stage.
+
+        Args:
+            stage (str): Stage name, e.g. 'parse' or 'claude_call'
+            seconds (float): Wall time
+            ok (bool): Whether the stage succeeded
+            **fields: Extra event fields, e.g. file=pdf_path
+        """
+        if not self.enabled:
+            return
+        labels = (('stage', stage),)
+        with self._lock:
+            self._observe('stage_seconds', labels, seconds)
+            if not ok:
+                self._add('stage_failures_total', labels, 1)
+        self.event('stage', stage=stage, seconds=round(seconds, 6), ok=ok,
+                   **fields)
+
+    def record_llm_call(self, model: str, stage: str, input_tokens: int,
+                        output_tokens: int, cache_write_tokens: int = 0,
+                        cache_read_tokens: int = 0,
+                        seconds: Optional[float] = None,
+                        batch: bool = False, **fields):
+        """
+        Record the token usage and estimated cost of one Claude response.
+
+        Args:
+            model (str): Model that answered
+            stage (str): 'extract', 'map', 'reduce' or 'repair'
+            input_tokens (int): Uncached input tokens
+            output_tokens (int): Output tokens
+            cache_write_tokens (int): Input tokens written to the cache
+            cache_read_tokens (int): Input tokens read from the cache
+            seconds (float): Latency of the call, None for batch results
+            batch (bool): Whether the request went through Message Batches
+            **fields: Extra event fields, e.g. company and file
+        """
+        if not self.enabled:
+            return
+        cost = cost_usd(model, input_tokens, output_tokens,
+                        cache_write_tokens, cache_read_tokens, batch)
+        if cost is None and model not in self._unpriced:
+            self._unpriced.add(model)
+            print(f"Warning: No price for {model}; its cost is not counted")
+        with self._lock:
+            self._add('requests_total',
+                      (('model', model), ('stage', stage)), 1)
+            for kind, tokens in (('input', input_tokens),
+                                 ('output', output_tokens),
+                                 ('cache_write', cache_write_tokens),
+                                 ('cache_read', cache_read_tokens)):
+                self._add('tokens_total', (('model', model), ('kind', kind)),
+                          tokens)
+            if cost is not None:
+                self._add('cost_usd_total', (('model', model),), cost)
+            if seconds is not None:
+                self._observe('stage_seconds', (('stage', 'claude_call'),),
+                              seconds)
+        self.event('llm_call', model=model, stage=stage,
+                   input_tokens=input_tokens, output_tokens=output_tokens,
+                   cache_write_tokens=cache_write_tokens,
+                   cache_read_tokens=cache_read_tokens,
+                   cost_usd=None if cost is None else round(cost, 6),
+                   seconds=None if seconds is None else round(seconds, 6),
+                   batch=batch, **fields)
+
+    def count(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter without writing an event, e.g.
+        count('quotes_total', 3, outcome='malformed').
+        """
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self._add(name, tuple(sorted(labels.items())), value)
+
+    def event(self, kind: str, **fields):
+        """Append one event to the JSON Lines file."""
+        if not self.enabled:
+            return
+        record = {'ts': round(time.time(), 3), 'run': self.run_id,
+                  'event': kind, **fields}
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self.jsonl_path:
+                if self._jsonl is None:
+                    directory = os.path.dirname(self.jsonl_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    # Line buffered, so each event lands as a whole line
+                    self._jsonl = open(self.jsonl_path, 'a', buffering=1)
+                self._jsonl.write(line)
+            due = (self._written is None or time.monotonic() -
+                   self._written >= self.textfile_interval)
+        if self.textfile_path and due:
+            self.write_textfile()
+
+    def _add(self, name: str, labels: Tuple, value: float):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name: str, labels: Tuple, value: float):
+        histogram = self._histograms.get((name, labels))
+        if histogram is None:
+            histogram = self._histograms[(name, labels)] = [
+                [0] * len(LATENCY_BUCKETS), 0.0, 0]
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def totals(self) -> Dict[str, float]:
+        """Counter totals summed over their labels, e.g. 'cost_usd_total'."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for (name, _), value in self._counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def summary(self) -> str:
+        """Return wall time per stage and the estimated cost so far."""
+        with self._lock:
+            stages = sorted((dict(labels)['stage'], histogram[1],
+                             histogram[2])
+                            for (_, labels), histogram in
+                            self._histograms.items())
+        parts = [f"{stage} {seconds:.1f}s over {count}"
+                 for stage, seconds, count in stages]
+        cost = self.totals().get('cost_usd_total', 0.0)
+        return f"{', '.join(parts) or 'no stages timed'}; ~${cost:.2f} Claude"
+
+    def render_textfile(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(
+                f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{labels_text(labels)} {value:g}")
+        for (name, labels), (buckets, total, count) in histograms:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f"{metric}_bucket"
+                             f"{labels_text(labels, [('le', f'{bound:g}')])}"
+                             f" {cumulative}")
+            lines.append(f"{metric}_bucket"
+                         f"{labels_text(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{metric}_sum{labels_text(labels)} {total:g}")
+            lines.append(f"{metric}_count{labels_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self):
+        """
+        Rewrite the Prometheus textfile. It is replaced atomically, so the
+        collector never reads a half-written file.
+        """
+        if not self.textfile_path:
+            return
+        with self._lock:
+            self._written = time.monotonic()
+        try:
+            directory = os.path.dirname(self.textfile_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.textfile_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(self.render_textfile())
+            os.replace(temp_path, self.textfile_path)
+        except Exception as e:
+            print(f"Warning: Could not write metrics to "
+                  f"{self.textfile_path}: {str(e)}")
+
+    def close(self):
+        """Write the final textfile and close the JSON Lines file."""
+        if not self.enabled:
+            return
+        self.write_textfile()
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
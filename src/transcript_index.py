@@ -0,0 +1,396 @@
+import re
+import bisect
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Bump whenever the index format or parsing changes so cached documents
+# are re-indexed
+INDEX_VERSION = 1
+
+HONORIFIC = re.compile(r"^(?:mr|ms|mrs|dr|shri|smt)\.?\s+", re.IGNORECASE)
+NAME_WORD = r"[A-Z][\w'’.\-]*"
+# A speaker label at the start of a line, e.g. "Akshant Goyal:" or
+# "Mr. Srinivasan Vaidyanathan :"
+LABEL_LINE = re.compile(
+    rf"^[ \t]*((?:(?:Mr|Ms|Mrs|Dr)\.?[ \t]+)?{NAME_WORD}"
+    rf"(?:[ \t]+{NAME_WORD}){{0,4}})[ \t]*:", re.MULTILINE)
+# Labels that open a line but are not speakers
+NOT_SPEAKERS = {
+    'sub', 'subject', 'ref', 'encl', 'email', 'website', 'tel', 'fax', 'cin',
+    'note', 'notes', 'date', 'time', 'source', 'disclaimer', 'management',
+    'managementrepresentatives', 'participants', 'analysts', 'speakers',
+    'companyparticipants', 'corporateparticipants',
+    'conferencecallparticipants', 'transcript', 'agenda', 'first', 'second',
+    'third', 'finally', 'also', 'so', 'and', 'but', 'now', 'yes', 'no',
+    'ok', 'okay', 'question', 'answer', 'q', 'a'}
+MODERATORS = {'moderator', 'operator'}
+# Moderator lines that hand over to an analyst; PDF text often splits
+# words ("que stion"), so the name runs up to the firm's "from"
+ANNOUNCEMENT = re.compile(
+    r"(?:from the line of|question (?:is |comes )?from)\s+"
+    r"(?P<name>[A-Z][^.,;]{1,40}?)\s+(?:from|of|with)\s+"
+    r"(?P<firm>[A-Z][\w&'’.\- ]*?)\s*(?:[.,;]|\s(?:please|Please)\b|$)")
+# The moderator opening the floor marks the start of the Q&A
+QA_CUE = re.compile(r"\b(?:first|next) question\b|\bquestion (?:is|comes) "
+                    r"from\b|\bquestion[- ]and[- ]answer session\b",
+                    re.IGNORECASE)
+QA_HEADER = re.compile(r"^[ \t]*(?:question[- ]and[- ]answer|q[ \t]*&[ \t]*a)"
+                       r"\b", re.IGNORECASE | re.MULTILINE)
+CHIEF_TITLE = re.compile(r"\bChief(?:\s+\w+){1,2}?\s+Officer\b",
+                         re.IGNORECASE)
+PAGE_MARK = re.compile(r"\bPage \d+ of \d+\b", re.IGNORECASE)
+SMALL_WORDS = {'and', 'of', 'the', 'for', 'in', 'at', '&'}
+
+
+def _key(name: str) -> str:
+    """Compare names regardless of case, spacing and honorifics."""
+    return re.sub(r"[^a-z]", '', HONORIFIC.sub('', name.strip()).lower())
+
+
+def _clean_title(title: str) -> str:
+    """Collapse whitespace and fix the case of an all-caps title."""
+    title = ' '.join(title.split()).strip(' ,;:–—-')
+    if title.isupper():
+        title = ' '.join(word.lower() if word.lower() in SMALL_WORDS
+                         else word.capitalize() for word in title.split())
+    return title
+
+
+def _find_speakers(text: str) -> Dict[str, str]:
+    """Speaker labels used at the start of a line, keyed by _key."""
+    counts = Counter()
+    labels = {}
+    for match in LABEL_LINE.finditer(text):
+        label = ' '.join(match.group(1).split())
+        key = _key(label)
+        if not key or key in NOT_SPEAKERS:
+            continue
+        counts[key] += 1
+        labels.setdefault(key, label)
+    # One-off labels are usually headings; speakers talk more than once
+    return {key: label for key, label in labels.items()
+            if counts[key] > 1 or key in MODERATORS}
+
+
+def _find_roster(preamble: str, keys: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Titles of speakers listed before the call starts, e.g.
+    "2. Akshant Goyal – Chief Financial Officer, Zomato Limited".
+    """
+    # Letters of the preamble, mapped back to their offsets, so a name
+    # matches however the PDF spaced or capitalized it
+    letters = []
+    positions = []
+    for position, char in enumerate(preamble):
+        if char.isalpha():
+            letters.append(char.lower())
+            positions.append(position)
+    flat = ''.join(letters)
+    found = {}
+    for key in keys:
+        index = flat.find(key)
+        if index < 0:
+            continue
+        found[key] = (positions[index], positions[index + len(key) - 1] + 1)
+
+    roster = {}
+    starts = sorted(start for start, _ in found.values())
+    for key, (start, end) in found.items():
+        following = bisect.bisect_right(starts, start)
+        stop = starts[following] if following < len(starts) else len(preamble)
+        entry = preamble[end:stop]
+        # The entry ends at a blank line or the next numbered/titled entry
+        entry = re.split(r"\n\s*\n|\n\s*(?:\d+\.|MR\.|MS\.|MRS\.|DR\.)",
+                         entry)[0]
+        if not re.match(r"\s*[–—,-]", entry):
+            continue
+        parts = [' '.join(part.split()).strip(' ,;:–—-') for part in
+                 re.split(r"\s[–—-]\s|,\s|\s[–—]", entry.strip(' ,–—-\n'))]
+        parts = [part for part in parts if part]
+        if parts:
+            roster[key] = {'title': _clean_title(parts[0]),
+                           'organization': parts[-1] if len(parts) > 1
+                           else None}
+    return roster
+
+
+def index_transcript(text: str, page_offsets: Optional[List[int]] = None
+                     ) -> Dict:
+    """
+    Split a transcript into speaker turns and sections.
+
+    Speakers are the labels that open lines ("Name:") more than once, plus
+    the moderator. Executives are the speakers listed in the participants
+    roster before the call, whose titles are taken from it; analysts are
+    those the moderator announces, with their firm. The Q&A starts at a
+    "Question-and-Answer" heading or where the moderator first hands over
+    to an analyst.
+
+    Args:
+        text (str): Transcript text as extracted from the PDF
+        page_offsets (List[int]): Start of each page in text, as returned
+            by PDFProcessor.extract_document
+
+    Returns:
+        Dict: JSON-compatible index with 'version', 'speakers' (name ->
+            role, title, organization), 'sections' (name, start, end) and
+            'turns' (speaker, section, start and end of the spoken text,
+            page); offsets index into text
+    """
+    page_offsets = page_offsets or [0]
+    labels = _find_speakers(text)
+    index = {'version': INDEX_VERSION, 'speakers': {}, 'sections': [],
+             'turns': []}
+    if not labels:
+        return index
+
+    # Find every use of a label, including after page headers mid-line and
+    # with stray spaces inside words ("Srini vasan")
+    alternatives = sorted(
+        (r"[ \t]*".join(re.escape(char) for char in label
+                         if not char.isspace())
+         for label in labels.values()), key=len, reverse=True)
+    turn_start = re.compile(
+        rf"(?:(?<=\s)|^)({'|'.join(alternatives)})[ \t]*:", re.MULTILINE)
+    matches = list(turn_start.finditer(text))
+    turns = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        speaker = labels[_key(match.group(1))]
+        start = match.end()
+        # Trim the whitespace around the spoken text
+        while start < end and text[start].isspace():
+            start += 1
+        stop = end
+        while stop > start and text[stop - 1].isspace():
+            stop -= 1
+        turns.append({'speaker': speaker, 'start': start, 'end': stop,
+                      'page': max(1, bisect.bisect_right(
+                          page_offsets, match.start()))})
+    if not turns:
+        return index
+
+    preamble_end = matches[0].start()
+    roster = _find_roster(text[:preamble_end], labels)
+    analysts = {}
+    qa_start = None
+    for turn in turns:
+        if _key(turn['speaker']) not in MODERATORS:
+            continue
+        spoken = text[turn['start']:turn['end']]
+        for announced in ANNOUNCEMENT.finditer(' '.join(spoken.split())):
+            analysts[_key(announced.group('name'))] = ' '.join(
+                announced.group('firm').split())
+        if qa_start is None and QA_CUE.search(spoken):
+            qa_start = turn['start']
+    header = QA_HEADER.search(text, preamble_end)
+    if header and (qa_start is None or header.start() < qa_start):
+        qa_start = header.start()
+
+    sections = [{'name': 'preamble', 'start': 0, 'end': preamble_end}]
+    if qa_start is None:
+        sections.append({'name': 'prepared_remarks', 'start': preamble_end,
+                         'end': len(text)})
+    else:
+        # Start the Q&A with the turn it falls in
+        qa_turn = next((turn for turn in turns if turn['end'] >= qa_start),
+                       None)
+        qa_start = min(qa_start, matches[turns.index(qa_turn)].start()) \
+            if qa_turn else qa_start
+        sections.append({'name': 'prepared_remarks', 'start': preamble_end,
+                         'end': qa_start})
+        sections.append({'name': 'qa', 'start': qa_start, 'end': len(text)})
+    sections = [section for section in sections
+                if section['end'] > section['start']]
+
+    previous = None
+    first_seen = {}
+    for match, turn in zip(matches, turns):
+        turn['section'] = next(
+            section['name'] for section in reversed(sections)
+            if section['start'] <= match.start())
+        first_seen.setdefault(turn['speaker'], (turn['section'], previous))
+        previous = turn['speaker']
+
+    for key, speaker in labels.items():
+        if speaker not in first_seen:
+            continue
+        entry = {'role': 'unknown', 'title': None, 'organization': None}
+        if key in MODERATORS:
+            entry['role'] = 'moderator'
+        elif key in roster:
+            entry.update(role='executive', **roster[key])
+        elif key in analysts:
+            entry.update(role='analyst', organization=analysts[key])
+        else:
+            # Unlisted: an analyst if first heard right after the moderator
+            # in the Q&A, otherwise management
+            section, before = first_seen[speaker]
+            entry['role'] = 'analyst' if (
+                section == 'qa' and before is not None and
+                _key(before) in MODERATORS) else 'executive'
+        index['speakers'][speaker] = entry
+    index['sections'] = sections
+    index['turns'] = turns
+    return index
+
+
+def short_title(info: Dict) -> Optional[str]:
+    """
+    Short form of a speaker's title for tweets: 'CFO' for "Chief Financial
+    Officer", 'Analyst' for analysts, otherwise the title itself.
+    """
+    if info['role'] == 'analyst':
+        return 'Analyst'
+    title = info.get('title')
+    if not title:
+        return None
+    chief = CHIEF_TITLE.search(title)
+    if chief:
+        return ''.join(word[0].upper() for word in chief.group().split())
+    return title
+
+
+class Transcript:
+    """A transcript's text with its speaker index, for querying turns."""
+
+    def __init__(self, text: str, index: Dict):
+        """
+        Wrap an indexed transcript.
+
+        Args:
+            text (str): Transcript text
+            index (Dict): Its index_transcript output
+        """
+        self.text = text
+        self.index = index
+        self._starts = [turn['start'] for turn in index['turns']]
+
+    def speaker(self, name: str) -> Dict:
+        """Role, title and organization of a speaker."""
+        return self.index['speakers'].get(
+            name, {'role': 'unknown', 'title': None, 'organization': None})
+
+    def turns(self, sections: Optional[Iterable[str]] = None,
+              roles: Optional[Iterable[str]] = None,
+              speakers: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Speaker turns, optionally filtered.
+
+        Args:
+            sections (Iterable[str]): Keep turns in these sections
+                ('prepared_remarks', 'qa')
+            roles (Iterable[str]): Keep turns by speakers in these roles
+                ('executive', 'analyst', 'moderator')
+            speakers (Iterable[str]): Keep turns whose speaker's name,
+                title or title initials contain one of these
+                (case-insensitive), e.g. 'Goyal' or 'CFO'
+
+        Returns:
+            List[Dict]: Matching turns in transcript order
+        """
+        sections = set(sections) if sections else None
+        roles = set(roles) if roles else None
+        wanted = [s.lower() for s in speakers] if speakers else None
+        found = []
+        for turn in self.index['turns']:
+            info = self.speaker(turn['speaker'])
+            if sections is not None and turn['section'] not in sections:
+                continue
+            if roles is not None and info['role'] not in roles:
+                continue
+            if wanted is not None:
+                title = info['title'] or ''
+                # Initials let "CFO" match "Chief Financial Officer"
+                initials = ''.join(word[0] for word in title.split()
+                                   if word[0].isupper())
+                names = f"{turn['speaker']} {title} {initials}".lower()
+                if not any(term in names for term in wanted):
+                    continue
+            found.append(turn)
+        return found
+
+    def turn_text(self, turn: Dict) -> str:
+        """What was said in a turn, without page headers and footers."""
+        lines = [line for line in
+                 PAGE_MARK.sub('', self.text[turn['start']:turn['end']])
+                 .split('\n') if line.strip() and
+                 line.strip() not in self._boilerplate]
+        return ' '.join(' '.join(lines).split())
+
+    @property
+    def _boilerplate(self) -> set:
+        """Short lines repeated on many pages, such as running headers."""
+        if not hasattr(self, '_repeated'):
+            counts = Counter(line.strip() for line in self.text.split('\n')
+                             if 0 < len(line.strip()) < 80)
+            self._repeated = {line for line, count in counts.items()
+                              if count >= 3}
+        return self._repeated
+
+    def turn_at(self, offset: int) -> Optional[Dict]:
+        """The turn containing a character offset, if any."""
+        position = bisect.bisect_right(self._starts, offset) - 1
+        if position < 0:
+            return None
+        turn = self.index['turns'][position]
+        return turn if offset <= turn['end'] else None
+
+    def label(self, name: str) -> str:
+        """Speaker label with title or firm, e.g. "Akshant Goyal (CFO)"."""
+        info = self.speaker(name)
+        details = [detail for detail in (
+            info['title'] or ('Analyst' if info['role'] == 'analyst'
+                              else None), info['organization']) if detail]
+        return f"{name} ({', '.join(details)})" if details else name
+
+    def render(self, sections: Optional[Iterable[str]] = None,
+               roles: Optional[Iterable[str]] = None,
+               speakers: Optional[Iterable[str]] = None) -> str:
+        """
+        The selected turns as text for Claude, each under its speaker's
+        name and title, with a heading where a section starts.
+
+        Args:
+            sections, roles, speakers: Filters, see turns()
+
+        Returns:
+            str: Rendered turns, empty if none match
+        """
+        parts = []
+        section = None
+        for turn in self.turns(sections, roles, speakers):
+            if turn['section'] != section:
+                section = turn['section']
+                parts.append('[Q&A]' if section == 'qa'
+                             else '[Prepared remarks]')
+            parts.append(f"{self.label(turn['speaker'])}:\n"
+                         f"{self.turn_text(turn)}")
+        return '\n\n'.join(parts)
+
+    def attribute(self, quote: Dict, offset: int) -> bool:
+        """
+        Set a quote's speaker from the turn it was found in.
+
+        Args:
+            quote (Dict): Quote to update with 'speaker_name',
+                'speaker_role' and 'section'
+            offset (int): Where the quote was found in the text
+
+        Returns:
+            bool: Whether a turn was found
+        """
+        turn = self.turn_at(offset)
+        if turn is None:
+            return False
+        info = self.speaker(turn['speaker'])
+        if (quote.get('speaker_name') and
+                _key(quote['speaker_name']) != _key(turn['speaker'])):
+            print(f"Quote attributed to {quote['speaker_name']} was said by "
+                  f"{turn['speaker']} ({quote.get('company')})")
+            # Claude's role for the wrong person is wrong too
+            quote['speaker'] = short_title(info) or quote.get('speaker')
+        quote['speaker_name'] = turn['speaker']
+        quote['speaker_role'] = info['role']
+        quote['section'] = turn['section']
+        return True
@@ -0,0 +1,312 @@
+import re
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+from tweet_queue import make_post_id
+
+MAX_TWEET_LENGTH = 280
+# Every URL is wrapped in a t.co link of this length
+TCO_URL_LENGTH = 23
+# twitter-text v3: code points in these ranges weigh 1, all others 2
+_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F),
+                 (0x2032, 0x2037))
+URL = re.compile(r"https?://\S+|\bwww\.\S+", re.IGNORECASE)
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;])\s+')
+ELLIPSIS = '…'
+# Shortest description kept before it is dropped altogether
+MIN_DESCRIPTION = 20
+
+
+def _char_weight(char: str) -> int:
+    code = ord(char)
+    for low, high in _LIGHT_RANGES:
+        if low <= code <= high:
+            return 1
+    return 2
+
+
+def tweet_length(text: str) -> int:
+    """
+    Length of a tweet as Twitter counts it: NFC-normalized code points,
+    most CJK characters and emoji counting double, and every URL counting
+    as a t.co link.
+
+    Args:
+        text (str): Tweet text
+
+    Returns:
+        int: Weighted length, to compare with MAX_TWEET_LENGTH
+    """
+    text = unicodedata.normalize('NFC', text)
+    length = 0
+    position = 0
+    for match in URL.finditer(text):
+        length += sum(map(_char_weight, text[position:match.start()]))
+        length += TCO_URL_LENGTH
+        position = match.end()
+    return length + sum(map(_char_weight, text[position:]))
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Cut text to at most limit weighted characters on a word boundary."""
+    if tweet_length(text) <= limit:
+        return text
+    words = text.split()
+    while words and tweet_length(' '.join(words) + ELLIPSIS) > limit:
+        words.pop()
+    return ' '.join(words) + ELLIPSIS if words else ''
+
+
+def quote_value(rank: int) -> float:
+    """Value of a quote by its rank in its file (0 = most significant)."""
+    return 1.0 / (1 + rank)
+
+
+class TweetPacker:
+    """
+    Turn ranked quotes into as few, as valuable posts as possible.
+
+    A quote becomes one tweet when it fits, with the description and
+    hashtags trimmed as needed; the quote itself is never shortened. A
+    quote too long for one tweet becomes a thread, and short quotes of the
+    same company are merged into one tweet. pack() then picks the posts
+    worth the most quote value per post until the post budget is spent.
+    """
+
+    def __init__(self, max_length: int = MAX_TWEET_LENGTH,
+                 merge: bool = True, thread: bool = True,
+                 max_thread_length: int = 4):
+        """
+        Initialize the packer.
+
+        Args:
+            max_length (int): Weighted length limit per tweet
+            merge (bool): Allow two quotes in one tweet
+            thread (bool): Allow long quotes as threads
+            max_thread_length (int): Most tweets in one thread
+        """
+        self.max_length = max_length
+        self.merge = merge
+        self.thread = thread
+        self.max_thread_length = max_thread_length
+
+    def fits(self, text: str) -> bool:
+        return tweet_length(text) <= self.max_length
+
+    @staticmethod
+    def hashtags(quote: Dict) -> List[str]:
+        """The quote's hashtags without duplicates, company tag first."""
+        tags = quote.get('hashtag', '').split()
+        if quote.get('fiscal_year') and quote.get('quarter'):
+            tags.append(f"#{quote['fiscal_year']}{quote['quarter']}")
+        return list(dict.fromkeys(tag for tag in tags if tag.startswith('#')))
+
+    def format(self, quote: Dict) -> Optional[str]:
+        """
+        Format a quote as one tweet, trimming in order: the description
+        (to a word boundary), then the description entirely, then the
+        company hashtag, then all hashtags.
+
+        Args:
+            quote (Dict): Quote as saved by the extractor
+
+        Returns:
+            Optional[str]: Tweet text, or None if the quote alone is too long
+        """
+        body = f"\"{quote['quote']}\""
+        tags = self.hashtags(quote)
+        head = f"{quote['company']} {quote['speaker']}"
+        tag_options = [tags, tags[1:], []] if len(tags) > 1 else [tags, []]
+
+        for tag_list in tag_options:
+            footer = f"\n{' '.join(tag_list)}" if tag_list else ''
+            room = self.max_length - tweet_length(
+                f"{head} on :\n{body}{footer}")
+            description = _truncate(quote.get('description', ''), room)
+            if len(description) >= min(MIN_DESCRIPTION,
+                                       len(quote.get('description', ''))):
+                text = f"{head} on {description}:\n{body}{footer}"
+                if description and self.fits(text):
+                    return text
+            text = f"{head}:\n{body}{footer}"
+            if self.fits(text):
+                return text
+        return None
+
+    def format_thread(self, quote: Dict) -> List[str]:
+        """
+        Split a long quote over a thread; the first tweet carries the
+        speaker and description, the last one the hashtags.
+
+        Args:
+            quote (Dict): Quote as saved by the extractor
+
+        Returns:
+            List[str]: Tweets in thread order
+        """
+        tags = ' '.join(self.hashtags(quote))
+        head = f"{quote['company']} {quote['speaker']} on " \
+               f"{_truncate(quote.get('description', ''), 120)}:"
+        # Leave room for the head, the tags and a " (n/m)" counter
+        reserve = len(' (10/10)')
+        pieces = []
+        current = ''
+        for sentence in SENTENCE_BREAK.split(quote['quote']):
+            limit = self.max_length - reserve - (
+                tweet_length(head) + 2 if not pieces else 0)
+            candidate = f"{current} {sentence}".strip()
+            if current and tweet_length(candidate) + 2 > limit:
+                pieces.append(current)
+                current = sentence
+            else:
+                current = candidate
+            while tweet_length(current) + 2 > limit:
+                words = current.split()
+                cut = _truncate(current, limit - 2)[:-len(ELLIPSIS)]
+                if not cut:
+                    cut = words[0]
+                pieces.append(cut)
+                current = current[len(cut):].strip()
+                limit = self.max_length - reserve
+        if current:
+            pieces.append(current)
+
+        total = len(pieces)
+        tweets = []
+        for index, piece in enumerate(pieces):
+            # Mark a piece cut mid-sentence as continuing
+            cut = index < total - 1 and not piece.endswith(('.', '!', '?'))
+            text = f"\"{piece}{ELLIPSIS if cut else ''}\""
+            if index == 0:
+                text = f"{head}\n{text}"
+            if index == total - 1 and tags:
+                with_tags = f"{text}\n{tags}"
+                text = with_tags if tweet_length(
+                    with_tags) + reserve <= self.max_length else text
+            tweets.append(f"{text} ({index + 1}/{total})" if total > 1
+                          else text)
+        return tweets
+
+    def format_merged(self, first: Dict, second: Dict) -> Optional[str]:
+        """Two quotes of the same company in one tweet, if they fit."""
+        tags = list(dict.fromkeys(self.hashtags(first) +
+                                  self.hashtags(second)))
+        for description in (True, False):
+            lines = [f"{first['company']}:"]
+            for quote in (first, second):
+                label = quote['speaker']
+                if description and quote.get('description'):
+                    label += f" on {_truncate(quote['description'], 40)}"
+                lines.append(f"{label}: \"{quote['quote']}\"")
+            for tag_list in (tags, tags[1:], []):
+                text = '\n'.join(lines + ([' '.join(tag_list)]
+                                          if tag_list else []))
+                if self.fits(text):
+                    return text
+        return None
+
+    def candidates(self, quotes: List[Dict], source_path: str = '',
+                   skip: Iterable[str] = ()) -> List[Dict]:
+        """
+        Every way of posting the quotes of one file: each quote alone (as a
+        tweet or thread), and pairs of quotes merged into one tweet.
+
+        Args:
+            quotes (List[Dict]): Quotes of one file, most significant first
+            source_path (str): File the quotes came from
+            skip (Iterable[str]): IDs (see make_post_id) of quotes already
+                queued or posted; near-duplicates flagged by quote_dedup and
+                quotes quote_verifier could not find are skipped too
+
+        Returns:
+            List[Dict]: Candidate posts with 'texts', 'quote_ids' and 'value'
+        """
+        skip = set(skip)
+        options = []
+        singles = {}
+        for rank, quote in enumerate(quotes):
+            if (quote.get('duplicate_of') or make_post_id(quote) in skip or
+                    not quote.get('verification', {}).get('verified', True)):
+                continue
+            text = self.format(quote)
+            if text is not None:
+                texts = [text]
+            elif self.thread:
+                texts = self.format_thread(quote)
+                if len(texts) > self.max_thread_length:
+                    continue
+            else:
+                continue
+            singles[rank] = texts
+            options.append(self._candidate(quotes, [rank], texts,
+                                           source_path))
+
+        if self.merge:
+            short = [rank for rank, texts in singles.items()
+                     if len(texts) == 1 and
+                     tweet_length(texts[0]) < self.max_length // 2]
+            for i, first in enumerate(short):
+                for second in short[i + 1:]:
+                    text = self.format_merged(quotes[first], quotes[second])
+                    if text is not None:
+                        options.append(self._candidate(
+                            quotes, [first, second], [text], source_path))
+        return options
+
+    @staticmethod
+    def _candidate(quotes: List[Dict], ranks: List[int], texts: List[str],
+                   source_path: str) -> Dict:
+        quote = quotes[ranks[0]]
+        quote_ids = [make_post_id(quotes[rank]) for rank in ranks]
+        # A lone quote keeps the ID it gets when queued without packing
+        post_id = quote_ids[0] if len(ranks) == 1 else hashlib.sha256(
+            '|'.join(quote_ids).encode('utf-8')).hexdigest()[:32]
+        return {
+            'post_id': post_id,
+            'source_path': source_path,
+            'company': quote.get('company'),
+            'fiscal_year': quote.get('fiscal_year'),
+            'quarter': quote.get('quarter'),
+            'quote_ids': quote_ids,
+            'texts': texts,
+            'value': sum(quote_value(r) for r in ranks)
+        }
+
+    def pack(self, files: List[Tuple[str, List[Dict]]], budget: int,
+             skip: Iterable[str] = ()) -> List[Dict]:
+        """
+        Choose posts across many files that carry the most quote value
+        within a post budget (a thread of n tweets costs n posts).
+
+        Posts are picked greedily by value per post, so a pair of minor
+        quotes merged into one tweet can beat a lone mid-ranked quote, and
+        threads are only used when they are worth their extra posts.
+
+        Args:
+            files (List[Tuple[str, List[Dict]]]): (source_path, quotes) for
+                each quotes file
+            budget (int): Posts available
+            skip (Iterable[str]): IDs of quotes already queued or posted
+
+        Returns:
+            List[Dict]: Chosen posts, most valuable first
+        """
+        skip = set(skip)
+        options = [option for source_path, quotes in files
+                   for option in self.candidates(quotes, source_path, skip)]
+        options.sort(key=lambda o: (-o['value'] / len(o['texts']),
+                                    -o['value'], o['source_path']))
+        used = set()
+        chosen = []
+        remaining = budget
+        for option in options:
+            quotes = set(option['quote_ids'])
+            if quotes & used or len(option['texts']) > remaining:
+                continue
+            chosen.append(option)
+            used |= quotes
+            remaining -= len(option['texts'])
+            if remaining == 0:
+                break
+        chosen.sort(key=lambda o: -o['value'])
+        return chosen
@@ -0,0 +1,510 @@
+import os
+import re
+import html
+import json
+import math
+import time
+import random
+import sqlite3
+import hashlib
+from typing import Callable, Dict, List, Optional, Set
+from telemetry import Telemetry
+
+TWEET_QUEUE_PATH = os.path.join('state', 'tweets.db')
+# Free-tier API limit on posts per 24 hours
+DAILY_POST_LIMIT = 17
+DAY_SECONDS = 24 * 60 * 60
+# Links come back from the timeline rewritten to t.co
+URL = re.compile(r"https?://\S+|\bwww\.\S+", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    source_path TEXT NOT NULL,
+    company TEXT,
+    fiscal_year TEXT,
+    quarter TEXT,
+    rank INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    thread TEXT,
+    quote_ids TEXT,
+    parts_posted INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    tweet_id TEXT,
+    error TEXT,
+    queued_at REAL NOT NULL,
+    posted_at REAL
+);
+CREATE INDEX IF NOT EXISTS posts_queue ON posts (status, rank, queued_at);
+CREATE INDEX IF NOT EXISTS posts_posted ON posts (posted_at);
+CREATE TABLE IF NOT EXISTS scheduler (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    level REAL NOT NULL,
+    updated REAL NOT NULL,
+    paused_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def make_post_id(quote: Dict) -> str:
+    """
+    Build a stable ID for a quote, so the same quote is queued (and posted)
+    only once however many times its file is enqueued.
+
+    Args:
+        quote (Dict): Quote as saved by the extractor
+
+    Returns:
+        str: Post ID
+    """
+    key = '|'.join(str(quote.get(field, '')) for field in
+                   ('company', 'fiscal_year', 'quarter', 'speaker', 'quote'))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def _timeline_text(text: str) -> str:
+    """
+    Tweet text in the form it is matched against the timeline in: the API
+    returns it HTML-escaped, with links rewritten to t.co and possibly
+    different whitespace.
+    """
+    text = URL.sub('<url>', html.unescape(text))
+    return ' '.join(text.split())
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed API call, if the error carries one."""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) or getattr(
+        response, 'status', None)
+
+
+def _retry_at(error: Exception) -> Optional[float]:
+    """When the API says a rate-limited call may be retried, if it says."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if 'x-rate-limit-reset' in headers:
+            return float(headers['x-rate-limit-reset'])
+        if 'retry-after' in headers:
+            return time.time() + float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _is_duplicate(error: Exception) -> bool:
+    """Whether a failed post was rejected as a duplicate of an earlier one."""
+    return _status_code(error) == 403 and 'duplicate' in str(error).lower()
+
+
+class TweetQueue:
+    """
+    Durable queue of quotes to post, drained by a token-bucket scheduler.
+
+    The bucket refills at daily_limit posts per 24 hours, so posts are
+    spread evenly over the day, and a rolling 24-hour count enforces the
+    hard cap. Queue and bucket live in SQLite, so a restarted poster picks
+    up where it stopped. Quotes are posted best first across every
+    enqueued file: the top quote of each transcript, newest first, then
+    the second quote of each, and so on.
+
+    A post may be a thread (see tweet_packer); its tweets go out back to
+    back as replies, each counting against the budget, and a thread cut
+    short by an error resumes from the first tweet not yet posted.
+    """
+
+    def __init__(self,
+                 client,
+                 path: str = TWEET_QUEUE_PATH,
+                 daily_limit: int = DAILY_POST_LIMIT,
+                 burst: float = 1,
+                 max_attempts: int = 5,
+                 backoff_seconds: float = 60,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep,
+                 telemetry: Optional[Telemetry] = None,
+                 on_posted: Optional[Callable[[List[str], Optional[str]],
+                                              None]] = None):
+        """
+        Open (and create if needed) the queue.
+
+        Args:
+            client: Twitter client with create_tweet(text=...), e.g.
+                tweepy.Client or a local stub; None when only queueing
+            path (str): SQLite database file
+            daily_limit (int): Posts allowed per 24 hours
+            burst (float): Posts that may go out back to back after a quiet
+                period
+            max_attempts (int): Attempts before a post is marked failed
+            backoff_seconds (float): First retry delay; doubles per attempt
+            clock (Callable): Returns the current time in seconds
+            sleep (Callable): Waits for the given number of seconds
+            telemetry (Telemetry): Receives the latency and outcome of each
+                tweet posted
+            on_posted (Callable): Called with the quote IDs and tweet ID of
+                each post once all of it is on the timeline, e.g.
+                QuoteStore.mark_posted
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.client = client
+        self.daily_limit = daily_limit
+        self.burst = max(1.0, burst)
+        self.rate = daily_limit / DAY_SECONDS
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.telemetry = telemetry or Telemetry()
+        self.on_posted = on_posted
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        with self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO scheduler (id, level, updated) "
+                "VALUES (1, ?, ?)", (self.burst, self.clock()))
+
+    def _migrate(self):
+        """Add the thread columns to a queue created before they existed."""
+        columns = {row[1] for row in
+                   self._db.execute("PRAGMA table_info(posts)")}
+        with self._db:
+            for column, definition in (
+                    ('thread', 'TEXT'), ('quote_ids', 'TEXT'),
+                    ('parts_posted', 'INTEGER NOT NULL DEFAULT 0')):
+                if column not in columns:
+                    self._db.execute(
+                        f"ALTER TABLE posts ADD COLUMN {column} {definition}")
+            if 'parts_posted' not in columns:
+                self._db.execute("UPDATE posts SET parts_posted = 1 "
+                                 "WHERE posted_at IS NOT NULL")
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def enqueue_posts(self, posts: List[Dict]) -> int:
+        """
+        Queue posts planned by TweetPacker.pack(), in the order given;
+        posts containing a quote that is already queued or posted are
+        skipped.
+
+        Args:
+            posts (List[Dict]): Posts with 'post_id', 'source_path',
+                'quote_ids' and 'texts' (more than one for a thread)
+
+        Returns:
+            int: Number of newly queued posts
+        """
+        known = self.known_quote_ids()
+        now = self.clock()
+        rows = []
+        for rank, post in enumerate(posts):
+            if known.intersection(post['quote_ids']):
+                continue
+            known.update(post['quote_ids'])
+            texts = post['texts']
+            rows.append((post['post_id'], post['source_path'],
+                         post.get('company'), post.get('fiscal_year'),
+                         post.get('quarter'), rank, texts[0],
+                         json.dumps(texts[1:]) if len(texts) > 1 else None,
+                         ' '.join(post['quote_ids']), now))
+        with self._db:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO posts (post_id, source_path, company, "
+                "fiscal_year, quarter, rank, text, thread, quote_ids, "
+                "queued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return self._db.total_changes - before
+
+    def known_quote_ids(self) -> Set[str]:
+        """IDs (see make_post_id) of every quote queued, posted or failed."""
+        known = set()
+        for post_id, quote_ids in self._db.execute(
+                "SELECT post_id, quote_ids FROM posts"):
+            known.update((quote_ids or post_id).split())
+        return known
+
+    def counts(self) -> Dict[str, int]:
+        """Number of posts per status."""
+        return dict(self._db.execute(
+            "SELECT status, COUNT(*) FROM posts GROUP BY status"))
+
+    def queued_tweets(self) -> int:
+        """Tweets still to be posted, counting every tweet of a thread."""
+        return sum(1 + len(json.loads(thread or '[]')) - parts_posted
+                   for thread, parts_posted in self._db.execute(
+                       "SELECT thread, parts_posted FROM posts "
+                       "WHERE status IN ('queued', 'posting')"))
+
+    def posted_last_day(self) -> int:
+        """Tweets posted in the last 24 hours."""
+        return self._db.execute(
+            "SELECT COALESCE(SUM(parts_posted), 0) FROM posts "
+            "WHERE posted_at > ?", (self.clock() - DAY_SECONDS,)).fetchone()[0]
+
+    def next_post(self) -> Optional[Dict]:
+        """The queued post that goes out next, if any."""
+        # Threads cut short are finished first, and posts waiting to be
+        # retried do not hold up the rest of the queue
+        row = self._db.execute(
+            "SELECT post_id, text, thread, parts_posted, tweet_id, attempts, "
+            "next_attempt_at, quote_ids FROM posts WHERE status = 'queued' "
+            "ORDER BY parts_posted = 0, next_attempt_at > ?, rank, "
+            "queued_at DESC, source_path, post_id LIMIT 1",
+            (self.clock(),)).fetchone()
+        if row is None:
+            return None
+        return {'post_id': row[0], 'texts': [row[1]] + json.loads(
+                    row[2] or '[]'),
+                'parts_posted': row[3], 'tweet_id': row[4],
+                'attempts': row[5], 'next_attempt_at': row[6],
+                'quote_ids': (row[7] or row[0]).split()}
+
+    def wait_time(self) -> float:
+        """Seconds until the next post may go out."""
+        post = self.next_post()
+        if post is None:
+            return 0.0
+        now = self.clock()
+        level, updated, paused_until = self._db.execute(
+            "SELECT level, updated, paused_until FROM scheduler").fetchone()
+        level = min(self.burst, level + (now - updated) * self.rate)
+        waits = [paused_until - now, post['next_attempt_at'] - now]
+        # Round up to whole seconds so float error cannot leave a wait of
+        # almost nothing that never completes
+        if level < 1:
+            waits.append(math.ceil((1 - level) / self.rate))
+        # A whole thread must fit under the 24-hour cap
+        tweets = min(self.daily_limit,
+                     len(post['texts']) - post['parts_posted'])
+        excess = self.posted_last_day() + tweets - self.daily_limit
+        if excess > 0:
+            freed = 0
+            for posted_at, parts_posted in self._db.execute(
+                    "SELECT posted_at, parts_posted FROM posts "
+                    "WHERE posted_at > ? ORDER BY posted_at",
+                    (now - DAY_SECONDS,)):
+                freed += parts_posted
+                if freed >= excess:
+                    waits.append(posted_at + DAY_SECONDS - now)
+                    break
+        return max(0.0, *waits)
+
+    def run(self, once: bool = False):
+        """
+        Post queued quotes as the budget allows until the queue is empty.
+
+        Args:
+            once (bool): Post at most one quote, without waiting
+        """
+        self._resolve_interrupted()
+        while self.next_post() is not None:
+            wait = self.wait_time()
+            if wait > 0:
+                if once:
+                    return
+                print(f"Next post in {wait / 60:.0f} min "
+                      f"({self.counts().get('queued', 0)} queued)")
+                self.sleep(wait)
+                continue
+            self.post_next()
+            if once:
+                return
+
+    def post_next(self) -> bool:
+        """
+        Post the next queued quote (or the rest of its thread) now,
+        ignoring the budget.
+
+        Returns:
+            bool: Whether it was posted
+        """
+        post = self.next_post()
+        if post is None:
+            return False
+        # Recorded before the call, so a crash mid-post is not retried blindly
+        with self._db:
+            self._db.execute(
+                "UPDATE posts SET status = 'posting', attempts = attempts + 1 "
+                "WHERE post_id = ?", (post['post_id'],))
+        reply_to = post['tweet_id']
+        for index in range(post['parts_posted'], len(post['texts'])):
+            text = post['texts'][index]
+            started = time.perf_counter()
+            try:
+                if reply_to:
+                    response = self.client.create_tweet(
+                        text=text, in_reply_to_tweet_id=reply_to)
+                else:
+                    response = self.client.create_tweet(text=text)
+                data = getattr(response, 'data', None) or {}
+                reply_to = str(data.get('id', '')) or None
+                print(f"Posted tweet: {text[:50]}...")
+                self._record(post, 'posted', started)
+            except Exception as e:
+                if not _is_duplicate(e):
+                    self._record(post, self._failed(post, e), started)
+                    return False
+                # Already on the timeline, e.g. posted before a crash; the
+                # rest of a thread has to reply to that tweet
+                reply_to = None
+                if index + 1 < len(post['texts']):
+                    reply_to = self._find_tweet(text)
+                    if reply_to is None:
+                        self._thread_broken(post, index, e)
+                        self._record(post, 'failed', started)
+                        return False
+                print(f"Already posted: {text[:50]}...")
+                self._record(post, 'duplicate', started)
+            now = self.clock()
+            with self._db:
+                self._db.execute(
+                    "UPDATE posts SET parts_posted = ?, tweet_id = ?, "
+                    "posted_at = ? WHERE post_id = ?",
+                    (index + 1, reply_to, now, post['post_id']))
+                self._take_token(now)
+
+        with self._db:
+            self._db.execute(
+                "UPDATE posts SET status = 'posted', error = NULL "
+                "WHERE post_id = ?", (post['post_id'],))
+        if self.on_posted is not None:
+            self.on_posted(post['quote_ids'], reply_to)
+        return True
+
+    def _find_tweet(self, text: str) -> Optional[str]:
+        """ID of the tweet with this text on the recent timeline, if any."""
+        try:
+            return self._recent_tweets().get(_timeline_text(text))
+        except Exception as e:
+            print(f"Warning: Could not read the timeline: {str(e)}")
+            return None
+
+    def _thread_broken(self, post: Dict, index: int, error: Exception):
+        """
+        Give up on a thread whose tweet at index was already posted but
+        cannot be found, rather than post the rest as standalone tweets.
+        """
+        message = (f"tweet {index + 1} of the thread is a duplicate of one "
+                   f"not found on the timeline ({str(error)})")
+        with self._db:
+            self._db.execute(
+                "UPDATE posts SET status = 'failed', error = ? "
+                "WHERE post_id = ?", (message, post['post_id']))
+        print(f"Error posting thread: {message}")
+
+    def _take_token(self, now: float):
+        level, updated = self._db.execute(
+            "SELECT level, updated FROM scheduler").fetchone()
+        level = min(self.burst, level + (now - updated) * self.rate) - 1
+        self._db.execute("UPDATE scheduler SET level = ?, updated = ?",
+                         (level, now))
+
+    def _record(self, post: Dict, outcome: str, started: float):
+        """Pass one tweet's outcome and latency on to telemetry."""
+        self.telemetry.count('tweets_total', outcome=outcome)
+        self.telemetry.record_stage(
+            'tweet_post', time.perf_counter() - started,
+            ok=outcome in ('posted', 'duplicate'), post_id=post['post_id'],
+            outcome=outcome)
+
+    def _failed(self, post: Dict, error: Exception) -> str:
+        """
+        Schedule a retry, or give up, after a failed post.
+
+        Returns:
+            str: 'rate_limited', 'retrying' or 'failed'
+        """
+        now = self.clock()
+        status = _status_code(error)
+        message = str(error)
+        attempts = post['attempts'] + 1
+        delay = self.backoff_seconds * 2 ** (attempts - 1)
+        delay *= random.uniform(0.8, 1.2)
+        with self._db:
+            if status == 429:
+                # The limit is per account, so every post waits
+                retry_at = _retry_at(error) or now + delay
+                self._db.execute("UPDATE scheduler SET paused_until = ?",
+                                 (retry_at,))
+                self._db.execute(
+                    "UPDATE posts SET status = 'queued', error = ? "
+                    "WHERE post_id = ?", (message, post['post_id']))
+                print(f"Rate limited; pausing posts for "
+                      f"{max(0.0, retry_at - now) / 60:.0f} min")
+                return 'rate_limited'
+            elif attempts >= self.max_attempts or (
+                    status is not None and 400 <= status < 500):
+                self._db.execute(
+                    "UPDATE posts SET status = 'failed', error = ? "
+                    "WHERE post_id = ?", (message, post['post_id']))
+                print(f"Error posting tweet: {message}")
+                return 'failed'
+            else:
+                self._db.execute(
+                    "UPDATE posts SET status = 'queued', error = ?, "
+                    "next_attempt_at = ? WHERE post_id = ?",
+                    (message, now + delay, post['post_id']))
+                print(f"Error posting tweet, retrying in {delay:.0f}s: "
+                      f"{message}")
+                return 'retrying'
+
+    def _resolve_interrupted(self):
+        """
+        Settle posts left mid-call by a crash: the tweet that was being
+        posted counts as posted if its text is on the account's recent
+        timeline, and is queued again otherwise. If the timeline cannot be
+        read they stay put, since posting twice is worse than not posting.
+        """
+        interrupted = self._db.execute(
+            "SELECT post_id, text, thread, parts_posted, quote_ids FROM posts "
+            "WHERE status = 'posting'").fetchall()
+        if not interrupted:
+            return
+        try:
+            recent = self._recent_tweets()
+        except Exception as e:
+            print(f"Warning: {len(interrupted)} posts were interrupted and "
+                  f"the timeline could not be checked ({str(e)}); leaving "
+                  f"them out of the queue")
+            return
+        now = self.clock()
+        finished = []
+        with self._db:
+            for post_id, text, thread, parts_posted, quote_ids in interrupted:
+                texts = [text] + json.loads(thread or '[]')
+                tweet_id = recent.get(_timeline_text(texts[parts_posted]))
+                if tweet_id is not None:
+                    parts_posted += 1
+                    self._db.execute(
+                        "UPDATE posts SET status = ?, parts_posted = ?, "
+                        "tweet_id = ?, posted_at = ? WHERE post_id = ?",
+                        ('posted' if parts_posted == len(texts) else 'queued',
+                         parts_posted, tweet_id, now, post_id))
+                    # The tweet went out, so it counts against the budget
+                    self._take_token(now)
+                    if parts_posted == len(texts):
+                        finished.append(((quote_ids or post_id).split(),
+                                         tweet_id))
+                else:
+                    self._db.execute(
+                        "UPDATE posts SET status = 'queued' WHERE post_id = ?",
+                        (post_id,))
+        if self.on_posted is not None:
+            for quote_ids, tweet_id in finished:
+                self.on_posted(quote_ids, tweet_id)
+
+    def _recent_tweets(self) -> Dict[str, str]:
+        """
+        ID of each of the account's most recent tweets, keyed on its text
+        as normalized for matching (see _timeline_text).
+        """
+        me = self.client.get_me()
+        response = self.client.get_users_tweets(me.data.id, max_results=100)
+        return {_timeline_text(tweet.text): str(tweet.id)
+                for tweet in (response.data or [])}
@@ -1,16 +1,24 @@
-
-import json
-import time
 import os
-import tweepy
+import sys
+import json
 import argparse
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+from tweet_queue import TweetQueue, DAILY_POST_LIMIT
+from quote_store import QuoteStore, open_store
+from tweet_packer import TweetPacker
+from telemetry import Telemetry
+
+if TYPE_CHECKING:
+    import tweepy
 
 # Configure callback URL
 CALLBACK_URL = f"https://{os.getenv('REPL_SLUG')}.{os.getenv('REPL_OWNER')}.repl.co/oauth2callback"
 
-def setup_twitter_client() -> tweepy.Client:
+def setup_twitter_client() -> 'tweepy.Client':
     """Setup Twitter API client using Bearer token"""
+    # Imported here so queueing and dry runs start without loading tweepy
+    import tweepy
+
     # Get credentials
     consumer_key = os.getenv('TWITTER_CONSUMER_KEY')
     consumer_secret = os.getenv('TWITTER_CONSUMER_SECRET')
@@ -35,32 +43,81 @@ def setup_twitter_client() -> tweepy.Client:
     return client
 
 def format_tweet(quote: Dict) -> str:
-    """Format quote as tweet"""
+    """Format quote as tweet, trimmed to the length limit where possible"""
+    text = TweetPacker().format(quote)
+    if text is not None:
+        return text
     fy_q_hashtag = f"#{quote['fiscal_year']}{quote['quarter']}" if 'fiscal_year' in quote and 'quarter' in quote else ""
     return f"{quote['company']} {quote['speaker']} on {quote['description']}:\n\"{quote['quote']}\"\n{quote['hashtag']} {fy_q_hashtag}"
 
-def post_quotes(json_path: str):
-    """Post quotes to Twitter"""
-    if not os.path.exists(json_path):
-        raise FileNotFoundError(f"JSON file not found: {json_path}")
-        
-    client = setup_twitter_client()
-    
-    # Read quotes from JSON file
-    with open(json_path, 'r') as f:
-        quotes = json.load(f)
-    
-    for quote in quotes:
-        try:
-            tweet = format_tweet(quote)
-            client.create_tweet(text=tweet)
-            print(f"Posted tweet: {tweet[:50]}...")
-            time.sleep(5)  # Wait 2 minutes between tweets
-        except Exception as e:
-            print(f"Error posting tweet: {str(e)}")
+def post_quotes(json_paths: List[str], daily_limit: int = DAILY_POST_LIMIT,
+                enqueue_only: bool = False, once: bool = False,
+                days: int = 1, packer: Optional[TweetPacker] = None,
+                dry_run: bool = False, telemetry: Optional[Telemetry] = None,
+                store: Optional[QuoteStore] = None,
+                quarter: Optional[Tuple[str, str]] = None):
+    """
+    Queue quotes from JSON files or the quote store and post them within
+    the daily budget.
+
+    The quotes of all files are packed together (see TweetPacker): the
+    most valuable posts that fit in `days` worth of posts, less what is
+    already queued, are queued. Posts are stored in a durable queue first,
+    so an interrupted run resumes without posting anything twice.
+
+    Args:
+        json_paths (List[str]): Quotes files to queue
+        daily_limit (int): Posts allowed per 24 hours
+        enqueue_only (bool): Only queue the quotes, do not post
+        once (bool): Post at most one quote if the budget allows, then exit
+        days (int): Days of posting budget to fill
+        packer (TweetPacker): Packer to use, defaults to TweetPacker()
+        dry_run (bool): Only print the posts that would be queued; needs
+            no Twitter credentials
+        telemetry (Telemetry): Receives the latency and outcome of each
+            tweet
+        store (QuoteStore): Quote store to read the quarter from and to mark
+            posted quotes in
+        quarter (Tuple[str, str]): Queue every stored quote of this quarter,
+            e.g. ('FY25', 'Q2'); needs a store
+    """
+    # Queueing alone never talks to Twitter
+    posting = not (enqueue_only or dry_run)
+    client = setup_twitter_client() if posting else None
+    queue = TweetQueue(client, daily_limit=daily_limit, telemetry=telemetry,
+                       on_posted=store.mark_posted if store else None)
+    packer = packer or TweetPacker()
+    try:
+        files = []
+        if quarter and store is not None:
+            files += store.files(*quarter)
+        for json_path in json_paths:
+            with open(json_path, 'r') as f:
+                files.append((json_path, json.load(f)))
+        if files:
+            budget = max(0, daily_limit * days - queue.queued_tweets())
+            posts = packer.pack(files, budget, skip=queue.known_quote_ids())
+            if dry_run:
+                for post in posts:
+                    print('\n'.join(post['texts']))
+                    print("-" * 30)
+                print(f"Would queue {len(posts)} posts from {len(files)} "
+                      f"files within a budget of {budget}")
+                return
+            added = queue.enqueue_posts(posts)
+            quotes = sum(len(post['quote_ids']) for post in posts)
+            tweets = sum(len(post['texts']) for post in posts)
+            print(f"Queued {added} posts ({quotes} quotes, {tweets} tweets) "
+                  f"from {len(files)} files within a budget of {budget}")
+        if posting:
+            queue.run(once=once)
+        print(f"Tweet queue: {queue.counts()}")
+    finally:
+        queue.close()
 
 def setup_oauth2_client():
     """Setup OAuth2 Twitter client"""
+    import tweepy
     oauth2_handler = tweepy.OAuth2UserHandler(
         client_id=os.getenv('TWITTER_CONSUMER_KEY'),
         client_secret=os.getenv('TWITTER_CONSUMER_SECRET'),
@@ -81,9 +138,30 @@ def test_twitter_connection():
         return False
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Post quotes from JSON file to Twitter')
-    parser.add_argument('json_path', type=str, help='Path to the JSON file containing quotes')
+    parser = argparse.ArgumentParser(description='Post quotes from JSON files to Twitter')
+    parser.add_argument('json_paths', type=str, nargs='*', help='Paths to the JSON files containing quotes')
+    parser.add_argument('--quarter', type=str, nargs=2, metavar=('FISCAL_YEAR', 'QUARTER'), help='Queue every quotes file of a quarter, e.g. --quarter FY25 Q2')
+    parser.add_argument('--days', type=int, default=1, help='Days of posting budget to fill when queueing')
+    parser.add_argument('--no-merge', action='store_true', help='Never put two quotes in one tweet')
+    parser.add_argument('--no-thread', action='store_true', help='Skip quotes too long for one tweet instead of threading them')
+    parser.add_argument('--daily-limit', type=int, default=DAILY_POST_LIMIT, help='Posts allowed per 24 hours')
+    parser.add_argument('--enqueue-only', action='store_true', help='Only add the quotes to the queue')
+    parser.add_argument('--once', action='store_true', help='Post at most one queued quote if the budget allows, then exit')
+    parser.add_argument('--dry-run', action='store_true', help='Print the posts that would be queued without queueing or posting them')
+    parser.add_argument('--check-connection', action='store_true', help='Check the Twitter credentials with an API call before posting')
+    parser.add_argument('--metrics-jsonl', metavar='PATH', help='Append the latency and outcome of each tweet to this JSON Lines file')
+    parser.add_argument('--metrics-textfile', metavar='PATH', help='Keep tweet outcome totals in this Prometheus textfile collector file')
     args = parser.parse_args()
     
-    if test_twitter_connection():
-        post_quotes(args.json_path)
+    if not args.check_connection or test_twitter_connection():
+        packer = TweetPacker(merge=not args.no_merge, thread=not args.no_thread)
+        telemetry = Telemetry(args.metrics_jsonl, args.metrics_textfile)
+        telemetry.event('run', command='twitter_poster', argv=sys.argv[1:])
+        store = open_store()
+        try:
+            post_quotes(args.json_paths, args.daily_limit, args.enqueue_only,
+                        args.once, args.days, packer, args.dry_run, telemetry,
+                        store, args.quarter)
+        finally:
+            store.close()
+            telemetry.close()
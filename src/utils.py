@@ -1,6 +1,14 @@
 import os
-from typing import List
-import PyPDF2
+import re
+import json
+import threading
+from typing import List, Optional, Tuple
+
+# Readers accept the header anywhere in the first 1024 bytes and the
+# end-of-file marker anywhere in the last 1024
+PDF_HEADER = b'%PDF-'
+PDF_EOF = b'%%EOF'
+PDF_MARKER_WINDOW = 1024
 
 def setup_directory_structure():
     """
@@ -32,7 +40,9 @@ def setup_directory_structure():
 
 def validate_pdf_file(file_path: str) -> bool:
     """
-    Validate if a file is a valid PDF.
+    Check that a file looks like a complete PDF: a %PDF- header and a
+    %%EOF marker. The file is not parsed here; text extraction parses it
+    once and fails the file if it is damaged inside.
 
     Args:
         file_path (str): Path to the PDF file
@@ -40,16 +50,15 @@ def validate_pdf_file(file_path: str) -> bool:
     Returns:
         bool: True if valid PDF, False otherwise
     """
-    if not os.path.exists(file_path):
-        return False
-
     try:
         with open(file_path, 'rb') as file:
-            # Try to create a PDF reader object
-            PyPDF2.PdfReader(file)
-        return True
-    except Exception:
+            head = file.read(PDF_MARKER_WINDOW)
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - PDF_MARKER_WINDOW))
+            tail = file.read()
+    except OSError:
         return False
+    return PDF_HEADER in head and PDF_EOF in tail
 
 def get_all_pdf_files() -> List[str]:
     """
@@ -66,6 +75,75 @@ def get_all_pdf_files() -> List[str]:
                 pdf_files.append(os.path.join(root, file))
 
     return pdf_files
+
+# Transcripts live in pdfs/<fiscal year>/<quarter>/, e.g. pdfs/FY25/Q2/
+FISCAL_YEAR_DIR = re.compile(r'^FY\d{2}$')
+QUARTER_DIR = re.compile(r'^Q[1-4]$')
+
+def transcript_period(pdf_path: str,
+                      root: str = 'pdfs') -> Optional[Tuple[str, str]]:
+    """
+    Get the fiscal year and quarter of a transcript from its location.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        root (str): Directory holding the fiscal year directories
+
+    Returns:
+        Optional[Tuple[str, str]]: (fiscal_year, quarter), or None if the
+            file is not a PDF in a fiscal year/quarter directory
+    """
+    parts = os.path.relpath(pdf_path, root).split(os.sep)
+    if (len(parts) == 3 and FISCAL_YEAR_DIR.match(parts[0])
+            and QUARTER_DIR.match(parts[1]) and parts[2].endswith('.pdf')):
+        return parts[0], parts[1]
+    return None
+
+def find_transcript_pdfs(root: str = 'pdfs') -> List[Tuple[str, str, str]]:
+    """
+    List every transcript PDF, discovering fiscal year and quarter
+    directories instead of assuming a fixed set.
+
+    Args:
+        root (str): Directory holding the fiscal year directories
+
+    Returns:
+        List[Tuple[str, str, str]]: (pdf_path, fiscal_year, quarter)
+    """
+    pdfs = []
+    if not os.path.isdir(root):
+        return pdfs
+    for fiscal_year in sorted(os.listdir(root)):
+        fy_path = os.path.join(root, fiscal_year)
+        if not FISCAL_YEAR_DIR.match(fiscal_year) or not os.path.isdir(fy_path):
+            continue
+        for quarter in sorted(os.listdir(fy_path)):
+            q_path = os.path.join(fy_path, quarter)
+            if not QUARTER_DIR.match(quarter) or not os.path.isdir(q_path):
+                continue
+            for filename in sorted(os.listdir(q_path)):
+                if filename.endswith('.pdf'):
+                    pdfs.append((os.path.join(q_path, filename),
+                                 fiscal_year, quarter))
+    return pdfs
+
+def write_json_atomic(data, path: str, indent: Optional[int] = 2):
+    """
+    Write JSON to a temporary file next to path and move it into place,
+    so a crash leaves either the old file or the new one, never half of
+    one.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def get_processed_files() -> set:
     """Get set of already processed PDF files."""
     processed = set()
@@ -0,0 +1,209 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from utils import FISCAL_YEAR_DIR, QUARTER_DIR, transcript_period
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # e.g. installed without dependencies; poll instead
+    FileSystemEventHandler = object
+    Observer = None
+
+# A PDF is complete once its trailer is written; files still missing it
+# after this many seconds of no changes are handed over anyway
+EOF_MARKER = b'%%EOF'
+MAX_SETTLE_SECONDS = 60.0
+
+
+def _looks_complete(path: str) -> bool:
+    """Whether the end of a file contains the PDF end-of-file marker."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        return EOF_MARKER in f.read()
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forward filesystem events under the watched root to the watcher."""
+
+    def __init__(self, watcher: 'TranscriptWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def _changed(self, path: str, is_directory: bool):
+        if is_directory:
+            # Files moved in together with a directory get no events of
+            # their own
+            self.watcher.notice_directory(path)
+        else:
+            self.watcher.notice(path)
+
+    def on_created(self, event):
+        self._changed(event.src_path, event.is_directory)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.src_path)
+
+    def on_moved(self, event):
+        self._changed(event.dest_path, event.is_directory)
+
+
+class TranscriptWatcher:
+    """
+    Watch the transcript directory and report each new or replaced PDF once
+    it has finished being written.
+
+    Uses filesystem events (inotify and friends, through the optional
+    watchdog package) when available and otherwise polls the fiscal year
+    and quarter directories. A file is reported once its size and mtime
+    have not changed for settle_seconds and it ends with a PDF trailer.
+    """
+
+    def __init__(self,
+                 on_ready: Callable[[str, str, str], None],
+                 root: str = 'pdfs',
+                 settle_seconds: float = 2.0,
+                 poll_interval: float = 5.0,
+                 use_events: bool = True):
+        """
+        Initialize the watcher.
+
+        Args:
+            on_ready (Callable): Called with (pdf_path, fiscal_year,
+                quarter) for each complete PDF
+            root (str): Directory holding the fiscal year directories
+            settle_seconds (float): How long a file must stay unchanged
+            poll_interval (float): Seconds between directory scans when
+                filesystem events are not available
+            use_events (bool): Use filesystem events if watchdog is installed
+        """
+        self.on_ready = on_ready
+        self.root = root
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_events = use_events and Observer is not None
+        # path -> ((size, mtime), time that signature was first seen)
+        self._candidates: Dict[str, Tuple[Optional[tuple], float]] = {}
+        # path -> (size, mtime) when last reported or scanned
+        self._known: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def notice(self, path: str):
+        """
+        Consider a file that was created or changed; it is reported once it
+        has settled. Safe to call from any thread.
+
+        Args:
+            path (str): Path to the file
+        """
+        path = os.path.normpath(path)
+        if transcript_period(path, self.root) is None:
+            return
+        with self._lock:
+            if path not in self._candidates:
+                self._candidates[path] = (None, time.monotonic())
+
+    def notice_directory(self, directory: str):
+        """Consider every PDF below a new fiscal year or quarter directory."""
+        for root, _, files in os.walk(directory):
+            for file in files:
+                self.notice(os.path.join(root, file))
+
+    def mark_known(self, path: str):
+        """Record a file's current state so polling does not report it."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._known[os.path.normpath(path)] = (stat.st_size,
+                                                   stat.st_mtime)
+
+    def run(self):
+        """Watch until stop() is called or the process is interrupted."""
+        observer = None
+        if self.use_events:
+            observer = Observer()
+            observer.schedule(_EventHandler(self), self.root, recursive=True)
+            observer.start()
+            print(f"Watching {self.root} for new transcripts")
+        else:
+            print(f"Polling {self.root} for new transcripts every "
+                  f"{self.poll_interval:g}s" +
+                  (" (install watchdog for filesystem events)"
+                   if Observer is None else ""))
+
+        next_poll = time.monotonic()
+        try:
+            while not self._stop.wait(0.5):
+                if observer is None and time.monotonic() >= next_poll:
+                    self._poll()
+                    next_poll = time.monotonic() + self.poll_interval
+                self._check_candidates()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        """Stop run()."""
+        self._stop.set()
+
+    def _poll(self):
+        """Notice PDFs whose size or mtime differ from the last scan."""
+        if not os.path.isdir(self.root):
+            return
+        for fiscal_year in os.scandir(self.root):
+            if not (fiscal_year.is_dir() and
+                    FISCAL_YEAR_DIR.match(fiscal_year.name)):
+                continue
+            for quarter in os.scandir(fiscal_year.path):
+                if not (quarter.is_dir() and QUARTER_DIR.match(quarter.name)):
+                    continue
+                for entry in os.scandir(quarter.path):
+                    if not entry.name.endswith('.pdf'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    path = os.path.normpath(entry.path)
+                    if self._known.get(path) != (stat.st_size, stat.st_mtime):
+                        self.notice(path)
+
+    def _check_candidates(self):
+        """Report candidates that have stopped changing."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (signature, since) in list(self._candidates.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self._candidates[path]  # deleted or moved away
+                    continue
+                current = (stat.st_size, stat.st_mtime)
+                if current != signature:
+                    self._candidates[path] = (current, now)
+                elif (stat.st_size and now - since >= self.settle_seconds):
+                    ready.append((path, current, now - since))
+
+        for path, signature, settled in ready:
+            try:
+                complete = _looks_complete(path)
+            except OSError:
+                complete = False
+            if not complete and settled < MAX_SETTLE_SECONDS:
+                continue
+            with self._lock:
+                self._candidates.pop(path, None)
+                self._known[path] = signature
+            fiscal_year, quarter = transcript_period(path, self.root)
+            try:
+                self.on_ready(path, fiscal_year, quarter)
+            except Exception as e:
+                print(f"Error queueing {path}: {str(e)}")
@@ -0,0 +1,313 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import platform
+import resource
+import contextlib
+import subprocess
+from types import SimpleNamespace
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from pdf_processor import PDFProcessor
+from quote_extractor import QuoteExtractor
+from claude_quote_extractor import (ClaudeQuoteExtractor, QUOTE_COUNT,
+                                    QUOTE_TOOL, estimate_tokens)
+from twitter_poster import format_tweet
+from synthetic_transcripts import company_name
+
+STAGES = ('pdf', 'prefilter', 'llm', 'parse', 'format')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'benchmark_baseline.json')
+CORPUS_DIR = os.path.join(ROOT, '.cache', 'benchmark_corpus')
+# Latencies this close to the baseline are noise, however large the ratio
+SLACK_MS = 0.5
+
+TURN = re.compile(r"^([A-Z][\w.]*(?: [A-Z][\w.]*){0,3}): ", re.MULTILINE)
+ROSTER = re.compile(r"^\d+\. (.+?) – (.+?),", re.MULTILINE)
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+DESCRIPTIONS = ['Growth outlook', 'Margin guidance', 'Capital allocation',
+                'Demand trends', 'Balance sheet priorities']
+
+
+class FakeClaude:
+    """
+    In-process stand-in for the Anthropic client. Replies are a pure
+    function of the prompt: quantitative sentences spoken by executives,
+    recorded through the record_quotes tool, with a share of them missing
+    their description so the repair path runs too.
+    """
+
+    def __init__(self, latency: float = 0.0, malformed_rate: float = 0.1):
+        self.latency = latency
+        self.malformed_rate = malformed_rate
+        self.messages = self
+
+    def create(self, **params):
+        prompt = params['messages'][0]['content']
+        rng = random.Random(hashlib.sha256(prompt.encode()).hexdigest())
+        if 'were recorded with missing' in prompt:
+            items = self._repair(prompt)
+        else:
+            items = self._select(prompt, rng)
+        time.sleep(self.latency)
+        system = ''.join(block['text'] for block in params.get('system', []))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                     input={'quotes': items})],
+            usage=SimpleNamespace(
+                input_tokens=estimate_tokens(prompt),
+                cache_read_input_tokens=estimate_tokens(system),
+                cache_creation_input_tokens=0,
+                output_tokens=estimate_tokens(json.dumps(items))))
+
+    def _select(self, prompt, rng):
+        hashtag = re.search(r"Company hashtag: (\S+)", prompt).group(1)
+        roles = {name: ''.join(word[0] for word in title.split()
+                               if word[0].isupper()) if 'Chief' in title
+                 else title
+                 for name, title in ROSTER.findall(prompt)}
+        turns = list(TURN.finditer(prompt))
+        candidates = []
+        for match, following in zip(turns, turns[1:] + [None]):
+            speaker = match.group(1)
+            if speaker not in roles:
+                continue
+            end = following.start() if following else len(prompt)
+            for sentence in SENTENCE_END.split(
+                    ' '.join(prompt[match.end():end].split())):
+                if any(char.isdigit() for char in sentence):
+                    candidates.append((speaker, sentence))
+        items = []
+        for speaker, sentence in rng.sample(
+                candidates, min(QUOTE_COUNT, len(candidates))):
+            item = {'speaker': roles[speaker][-3:], 'speaker_name': speaker,
+                    'description': rng.choice(DESCRIPTIONS),
+                    'quote': sentence, 'hashtag': hashtag}
+            if rng.random() < self.malformed_rate:
+                del item['description']
+            items.append(item)
+        return items
+
+    @staticmethod
+    def _repair(prompt):
+        start = prompt.index('[')
+        end = prompt.rindex(']') + 1
+        return [dict(entry['item'], description=DESCRIPTIONS[0])
+                for entry in json.loads(prompt[start:end])]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def corpus(files, min_pages, max_pages, seed):
+    """
+    Synthetic transcripts for these settings, generated once in a child
+    process (so reportlab stays out of the measured memory) and reused.
+    """
+    root = os.path.join(CORPUS_DIR,
+                        f"seed{seed}-{files}x{min_pages}-{max_pages}")
+    marker = os.path.join(root, 'corpus.json')
+    if not os.path.exists(marker):
+        print(f"Generating {files} transcripts in {root}...")
+        result = subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'test',
+                                          'synthetic_transcripts.py'),
+             '--files', str(files), '--min-pages', str(min_pages),
+             '--max-pages', str(max_pages), '--seed', str(seed),
+             '--out', root], capture_output=True, text=True, check=True)
+        paths = result.stdout.split()
+        with open(marker, 'w') as f:
+            json.dump([[path, company_name(index)]
+                       for index, path in enumerate(paths)], f)
+    with open(marker, 'r') as f:
+        return json.load(f)
+
+
+def process(pdf_path, company, processor, prefilter, extractor, timings):
+    """Run one transcript through every stage, timing each."""
+    times = [time.perf_counter()]
+    document = processor.extract_document(pdf_path)
+    times.append(time.perf_counter())
+    prefilter.select_passages(document['text'])
+    times.append(time.perf_counter())
+    params = extractor.build_request(document['text'], company)
+    response_text = extractor._complete(params, company, pdf_path)
+    times.append(time.perf_counter())
+    quotes = extractor.finish_quotes(response_text, company, pdf_path)
+    times.append(time.perf_counter())
+    for quote in quotes:
+        format_tweet(quote)
+    times.append(time.perf_counter())
+    if timings is not None:
+        for stage, start, stop in zip(STAGES, times, times[1:]):
+            timings[stage].append((stop - start) * 1000)
+    return document['page_count'], len(quotes)
+
+
+def benchmark_e2e(files=24, min_pages=10, max_pages=150, seed=0,
+                  llm_latency=0.0, repeat=3):
+    """
+    Run the synthetic corpus through PDF parsing, the relevance
+    pre-filter, extraction against FakeClaude, reply parsing and tweet
+    formatting, one transcript at a time.
+
+    The corpus is run `repeat` times and each metric keeps its best run,
+    like timeit: noise only ever makes a run slower.
+
+    Returns:
+        dict: 'config' and 'metrics' (throughput, per-stage p50/p99 in
+            milliseconds and peak RSS)
+    """
+    jobs = corpus(files, min_pages, max_pages, seed)
+    processor = PDFProcessor()
+    prefilter = QuoteExtractor()
+    extractor = ClaudeQuoteExtractor(requests_per_minute=None)
+    extractor._client = FakeClaude(llm_latency)
+    runs = []
+
+    # Hide the per-request usage and repair lines
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        # Warm up lazy imports and regex caches outside the measurement
+        process(*jobs[0], processor, prefilter, extractor, None)
+        for _ in range(repeat):
+            timings = {stage: [] for stage in STAGES}
+            start = time.perf_counter()
+            pages = quotes = 0
+            for pdf_path, company in jobs:
+                page_count, quote_count = process(
+                    pdf_path, company, processor, prefilter, extractor,
+                    timings)
+                pages += page_count
+                quotes += quote_count
+            runs.append((time.perf_counter() - start, timings))
+
+    elapsed = min(seconds for seconds, _ in runs)
+    return {
+        'config': {'files': files, 'min_pages': min_pages,
+                   'max_pages': max_pages, 'seed': seed,
+                   'llm_latency': llm_latency, 'repeat': repeat},
+        'environment': {'python': platform.python_version(),
+                        'machine': platform.machine(),
+                        'cpus': os.cpu_count()},
+        'metrics': {
+            'files_per_sec': round(len(jobs) / elapsed, 3),
+            'pages_per_sec': round(pages / elapsed, 1),
+            'pages': pages,
+            'quotes': quotes,
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'stages': {stage: {
+                key: round(min(percentile(timings[stage], p)
+                               for _, timings in runs), 3)
+                for key, p in (('p50_ms', 50), ('p99_ms', 99))}
+                for stage in STAGES}
+        }
+    }
+
+
+def compare(result, baseline, tolerance):
+    """
+    Print each metric next to the baseline and return the names of those
+    that regressed by more than `tolerance` (a fraction).
+    """
+    regressions = []
+
+    def check(name, current, previous, higher_is_better, slack=0.0):
+        if higher_is_better:
+            regressed = current < previous * (1 - tolerance)
+        else:
+            regressed = current > previous * (1 + tolerance) + slack
+        change = 100.0 * (current - previous) / previous if previous else 0.0
+        status = 'REGRESSION' if regressed else 'ok'
+        print(f"{name:<22} {current:10.2f} {previous:10.2f} {change:+7.1f}%  "
+              f"{status}")
+        if regressed:
+            regressions.append(name)
+
+    current, previous = result['metrics'], baseline['metrics']
+    print(f"{'metric':<22} {'current':>10} {'baseline':>10} {'change':>8}")
+    check('files/sec', current['files_per_sec'], previous['files_per_sec'],
+          True)
+    check('pages/sec', current['pages_per_sec'], previous['pages_per_sec'],
+          True)
+    for stage in STAGES:
+        for key in ('p50_ms', 'p99_ms'):
+            check(f"{stage} {key}", current['stages'][stage][key],
+                  previous['stages'][stage][key], False, SLACK_MS)
+    check('peak RSS MB', current['peak_rss_mb'], previous['peak_rss_mb'],
+          False)
+    return regressions
+
+
+def report(result):
+    metrics = result['metrics']
+    config = result['config']
+    print(f"{config['files']} transcripts, {metrics['pages']} pages, "
+          f"{metrics['quotes']} quotes: {metrics['files_per_sec']} files/sec, "
+          f"{metrics['pages_per_sec']} pages/sec, peak RSS "
+          f"{metrics['peak_rss_mb']} MB")
+    for stage, latency in metrics['stages'].items():
+        print(f"  {stage:<10} p50 {latency['p50_ms']:9.2f} ms   "
+              f"p99 {latency['p99_ms']:9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='End-to-end benchmark on synthetic transcripts')
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--min-pages', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, default=150)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--llm-latency', type=float, default=0.0,
+                        help='Seconds FakeClaude waits before each reply')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs over the corpus; each metric keeps its '
+                        'best')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Record this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Allowed slowdown before a metric fails, as a '
+                        'fraction of the baseline')
+    args = parser.parse_args()
+
+    result = benchmark_e2e(args.files, args.min_pages, args.max_pages,
+                           args.seed, args.llm_latency, args.repeat)
+    report(result)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with "
+              f"--save-baseline")
+        sys.exit(0)
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline['config'] != result['config']:
+        print(f"Warning: baseline was recorded with {baseline['config']}; "
+              f"not comparing")
+        sys.exit(0)
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION in {', '.join(regressions)} (more than "
+              f"{args.tolerance:.0%} worse than {args.baseline})")
+        sys.exit(1)
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from keyword_matcher import KeywordMatcher
+from lexicon import FINANCIAL_LEXICON
+
+
+def naive_scan(sentences, keywords):
+    """The old per-sentence, per-keyword substring loop."""
+    return sum(1 for sentence in sentences
+               if any(keyword in sentence.lower() for keyword in keywords))
+
+
+def make_lexicon(size):
+    """Take real lexicon terms first, then pad with random pseudo-words."""
+    rng = random.Random(size)
+    terms = list(FINANCIAL_LEXICON)[:size]
+    while len(terms) < size:
+        terms.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz')
+                             for _ in range(rng.randint(5, 10))))
+    return terms
+
+
+def best_rate(func, megabytes, runs=3):
+    """Best throughput in MB/s over a few runs."""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return megabytes / best
+
+
+def benchmark_keyword_matcher(repeat=20):
+    # Read sample text, repeated so timings are stable
+    with open('test/sample_earnings.txt', 'r') as f:
+        text = f.read() * repeat
+    sentences = [s for s in text.split('\n') if s.strip()]
+    megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+
+    print(f"{'terms':>6} {'matcher MB/s':>13} {'naive MB/s':>11}")
+    for size in (12, 50, 100, 250, 500, 1000):
+        terms = make_lexicon(size)
+        matcher = KeywordMatcher({term: 1.0 for term in terms})
+
+        matcher_rate = best_rate(lambda: matcher.find(text), megabytes)
+
+        plain = [term.rstrip('*') for term in terms]
+        naive_rate = best_rate(lambda: naive_scan(sentences, plain),
+                               megabytes)
+
+        print(f"{size:>6} {matcher_rate:>13.1f} {naive_rate:>11.1f}")
+
+
+if __name__ == "__main__":
+    benchmark_keyword_matcher()
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_dedup import QuoteDedupIndex
+
+
+def make_quotes(count, seed=0):
+    """Random sentences from the sample transcript's vocabulary."""
+    rng = random.Random(seed)
+    with open('test/sample_earnings.txt', 'r') as f:
+        words = f.read().split()
+    return [{'company': f"Company {i % 500}", 'speaker': 'CEO',
+             'quote': ' '.join(rng.choice(words)
+                               for _ in range(rng.randint(20, 45)))}
+            for i in range(count)]
+
+
+def benchmark_quote_dedup(sizes=(1000, 5000, 10000, 20000), probes=200):
+    quotes = make_quotes(max(sizes))
+    new = make_quotes(probes, seed=1)
+    print(f"{'quotes':>7} {'add/s':>8} {'check ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        index = QuoteDedupIndex(os.path.join(directory, 'dedup.db'))
+        added = 0
+        for size in sizes:
+            start = time.perf_counter()
+            before = added
+            # 15 quotes per file, like one transcript's output
+            while added < size:
+                index.add_file(f"file{added}", quotes[added:added + 15])
+                added += 15
+            add_rate = (added - before) / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for quote in new:
+                index.check([dict(quote)], 'new')
+            check_ms = (time.perf_counter() - start) / probes * 1000
+            print(f"{index.count():>7} {add_rate:>8.0f} {check_ms:>9.2f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    benchmark_quote_dedup()
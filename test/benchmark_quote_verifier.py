@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import random
+import difflib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_verifier import TranscriptIndex
+
+
+def naive_best_match(text, quote):
+    """Slide a quote-sized window over the whole transcript with difflib."""
+    words = text.split()
+    target = quote.split()
+    best = 0.0
+    for start in range(0, len(words) - len(target) + 1):
+        window = words[start:start + len(target)]
+        best = max(best, difflib.SequenceMatcher(None, target,
+                                                 window).ratio())
+    return best
+
+
+def make_quotes(text, count, rng):
+    """Verbatim spans, lightly edited spans and made-up sentences."""
+    words = text.split()
+    quotes = []
+    for i in range(count):
+        start = rng.randrange(len(words) - 40)
+        span = words[start:start + rng.randint(20, 40)]
+        if i % 3 == 1:
+            span[rng.randrange(len(span))] = 'substantially'
+        elif i % 3 == 2:
+            rng.shuffle(span)
+        quotes.append(' '.join(span))
+    return quotes
+
+
+def benchmark_quote_verifier(pages=80, quotes_per_call=15):
+    rng = random.Random(0)
+    with open('test/sample_earnings.txt', 'r') as f:
+        sample = f.read()
+    # Roughly 80 pages of transcript
+    words = sample.split()
+    text = '\n'.join(' '.join(rng.choice(words) for _ in range(450))
+                     for _ in range(pages))
+    quotes = make_quotes(text, quotes_per_call, rng)
+
+    start = time.perf_counter()
+    index = TranscriptIndex(text)
+    results = [index.verify(quote) for quote in quotes]
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for quote in quotes[:3]:
+        naive_best_match(text, quote)
+    naive = (time.perf_counter() - start) / 3 * quotes_per_call
+
+    print(f"{pages} pages, {quotes_per_call} quotes")
+    print(f"  index + verify: {indexed * 1000:.1f} ms")
+    print(f"  naive scan:     {naive * 1000:.1f} ms (extrapolated)")
+    print(f"  scores: {[result['score'] for result in results]}")
+
+
+if __name__ == "__main__":
+    benchmark_quote_verifier()
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# The stub accepts any key
+os.environ.setdefault('ANTHROPIC_API_KEY', 'stub')
+
+from claude_quote_extractor import ClaudeQuoteExtractor
+from resilience import RequestGuard
+
+QUOTES = [{'speaker': 'CEO', 'speaker_name': 'Jane Doe',
+           'description': 'Growth outlook',
+           'quote': 'We expect revenue to grow 20% next year.',
+           'hashtag': '#Acme'}]
+
+
+class FaultInjectingStub(BaseHTTPRequestHandler):
+    """
+    Messages API stand-in that overloads like the real one: requests above
+    its capacity get a 429 with retry-after, and the rest fail at random
+    with 529, 500 or a dropped connection. During an outage window every
+    request gets a 529.
+    """
+    capacity = 4
+    latency = 0.2
+    overloaded_rate = 0.05
+    error_rate = 0.03
+    drop_rate = 0.02
+    outage = (0.0, 0.0)
+    started = time.monotonic()
+    in_flight = 0
+    lock = threading.Lock()
+    served = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, outcome):
+        with self.lock:
+            self.served[outcome] = self.served.get(outcome, 0) + 1
+
+    def _error(self, status, error_type, headers=()):
+        body = json.dumps({'type': 'error', 'error': {
+            'type': error_type, 'message': 'injected fault'}}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self._count(status)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = FaultInjectingStub
+        elapsed = time.monotonic() - cls.started
+        with cls.lock:
+            cls.in_flight += 1
+            over_capacity = cls.in_flight > cls.capacity
+        try:
+            roll = random.random()
+            if cls.outage[0] <= elapsed < cls.outage[1]:
+                return self._error(529, 'overloaded_error')
+            if over_capacity:
+                return self._error(429, 'rate_limit_error',
+                                   [('retry-after', '1')])
+            if roll < cls.overloaded_rate:
+                return self._error(529, 'overloaded_error')
+            roll -= cls.overloaded_rate
+            if roll < cls.error_rate:
+                return self._error(500, 'api_error')
+            roll -= cls.error_rate
+            if roll < cls.drop_rate:
+                self.close_connection = True
+                self._count('dropped')
+                return
+            time.sleep(cls.latency)
+            body = json.dumps({
+                'id': 'msg_stub', 'type': 'message', 'role': 'assistant',
+                'model': request.get('model'),
+                'content': [{'type': 'tool_use', 'id': 'toolu_stub',
+                             'name': 'record_quotes',
+                             'input': {'quotes': QUOTES}}],
+                'stop_reason': 'tool_use', 'stop_sequence': None,
+                'usage': {'input_tokens': 1000, 'output_tokens': 100}
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self._count(200)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+def run(transcripts, workers, max_retries, outage):
+    FaultInjectingStub.started = time.monotonic()
+    FaultInjectingStub.outage = outage
+    FaultInjectingStub.served = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FaultInjectingStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    extractor = ClaudeQuoteExtractor(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        max_concurrency=workers, requests_per_minute=None)
+    # Shorter pauses than production so the run takes seconds
+    extractor.guard = RequestGuard(workers, max_retries, base_delay=0.2,
+                                   max_delay=5.0, reset_timeout=2.0)
+
+    def extract(index):
+        try:
+            extractor.extract_quotes(f"Transcript {index}. Revenue grew.",
+                                     f"Company {index}")
+            return True
+        except Exception:
+            return False
+
+    start = time.monotonic()
+    # Hide the per-request usage lines
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull), \
+            ThreadPoolExecutor(workers) as pool:
+        succeeded = sum(pool.map(extract, range(transcripts)))
+    elapsed = time.monotonic() - start
+    server.shutdown()
+    print(f"max_retries={max_retries}: {succeeded}/{transcripts} transcripts "
+          f"in {elapsed:.1f}s; stub answered {FaultInjectingStub.served}")
+    print(f"  {extractor.guard.summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Extract from a fault-injecting Messages API stub')
+    parser.add_argument('--transcripts', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--outage', type=float, nargs=2, default=(3.0, 6.0),
+                        metavar=('START', 'END'),
+                        help='Seconds into the run when every request fails')
+    args = parser.parse_args()
+    # Without retries, like the SDK with retries disabled
+    run(args.transcripts, args.workers, 0, tuple(args.outage))
+    run(args.transcripts, args.workers, 6, tuple(args.outage))
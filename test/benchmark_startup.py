@@ -0,0 +1,84 @@
+import os
+import re
+import sys
+import shutil
+import tempfile
+import time
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+
+# Cold-start budget of each entry point in milliseconds, measured from
+# process start to exit; none of these needs credentials or the network
+BUDGETS = [
+    ('main.py --help', ['main.py', '--help'], 250),
+    ('main.py --reparse-cached', ['main.py', '--reparse-cached', '--dedup',
+                                  'off'], 350),
+    ('twitter_poster.py --help', ['twitter_poster.py', '--help'], 200),
+    ('twitter_poster.py --dry-run', ['twitter_poster.py', '--dry-run',
+                                     '--quarter', 'FY25', 'Q2'], 250),
+]
+RUNS = 5
+
+
+def run(args, cwd, env, importtime=False):
+    """Run an entry point once; return its wall time and stderr."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += [os.path.join(SRC, args[0])] + args[1:]
+    start = _now()
+    result = subprocess.run(command, cwd=cwd, env=env, capture_output=True,
+                            text=True)
+    elapsed = _now() - start
+    if result.returncode != 0:
+        raise Exception(f"{' '.join(args)} failed: {result.stdout}"
+                        f"{result.stderr}")
+    return elapsed, result.stderr
+
+
+def _now():
+    return time.perf_counter() * 1000
+
+
+def slowest_imports(stderr, count=5):
+    """Top-level imports that took longest, from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and len(match.group(2)) <= 2:
+            rows.append((int(match.group(1)) / 1000, match.group(3)))
+    return sorted(rows, reverse=True)[:count]
+
+
+def benchmark_startup():
+    """
+    Time every entry point in a scratch directory without API keys, and
+    exit non-zero if any is over budget.
+    """
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(('ANTHROPIC_', 'TWITTER_'))}
+    over = []
+    with tempfile.TemporaryDirectory() as directory:
+        # Quotes to dry-run without touching the real output/
+        quotes = os.path.join(ROOT, 'output', 'FY25', 'Q2')
+        if os.path.isdir(quotes):
+            shutil.copytree(quotes, os.path.join(directory, 'output', 'FY25',
+                                                 'Q2'))
+        for name, args, budget in BUDGETS:
+            run(args, directory, env)  # warm the OS file cache
+            times = [run(args, directory, env)[0] for _ in range(RUNS)]
+            median = statistics.median(times)
+            status = 'ok' if median <= budget else 'OVER BUDGET'
+            print(f"{name:<32} {median:7.0f} ms  (budget {budget} ms) "
+                  f"{status}")
+            if median > budget:
+                over.append(name)
+                _, stderr = run(args, directory, env, importtime=True)
+                for seconds, module in slowest_imports(stderr):
+                    print(f"    {module:<28} {seconds:7.1f} ms")
+    return over
+
+
+if __name__ == "__main__":
+    sys.exit(1 if benchmark_startup() else 0)
@@ -0,0 +1,240 @@
+import os
+import random
+import argparse
+import textwrap
+from typing import Dict, List, Tuple
+
+# Letter page, 12 pt leading between y=750 and the footer
+LINES_PER_PAGE = 55
+LINE_WIDTH = 95
+
+PREFIXES = ['Aurora', 'Bharat', 'Crescent', 'Deccan', 'Everest', 'Ganga',
+            'Horizon', 'Indus', 'Jade', 'Konkan', 'Lotus', 'Malabar',
+            'Narmada', 'Orion', 'Pinnacle', 'Quartz', 'Sahyadri', 'Tapi',
+            'Vindhya', 'Zenith']
+INDUSTRIES = ['Foods', 'Bank', 'Motors', 'Pharma', 'Cements', 'Power',
+              'Logistics', 'Retail', 'Fintech', 'Textiles']
+FIRST_NAMES = ['Aditi', 'Rahul', 'Kavita', 'Sanjay', 'Meera', 'Vikram',
+               'Ananya', 'Rohit', 'Priya', 'Arjun', 'Neha', 'Karthik',
+               'Sunita', 'Deepak', 'Ishaan', 'Pooja']
+LAST_NAMES = ['Sharma', 'Iyer', 'Mehta', 'Reddy', 'Banerjee', 'Kulkarni',
+              'Nair', 'Chopra', 'Menon', 'Agarwal', 'Rao', 'Desai',
+              'Kapoor', 'Pillai', 'Joshi', 'Bhat']
+EXECUTIVES = [('Managing Director and Chief Executive Officer', 1),
+              ('Chief Financial Officer', 1),
+              ('Chief Operating Officer', 0.6),
+              ('Head of Investor Relations', 0.5)]
+FIRMS = ['Kotak Institutional Equities', 'Jefferies', 'Motilal Oswal',
+         'ICICI Securities', 'Nomura', 'CLSA', 'Morgan Stanley',
+         'Ambit Capital', 'HSBC Securities', 'Axis Capital']
+
+SEGMENTS = ['domestic', 'international', 'enterprise', 'consumer',
+            'digital', 'rural', 'premium', 'B2B']
+METRICS = ['revenue', 'EBITDA', 'gross margin', 'volume', 'order book',
+           'loan book', 'deposit base', 'free cash flow']
+GUIDANCE = [
+    "We expect {metric} in the {segment} business to grow {low} to {high}% "
+    "in {fy}, and we remain confident of sustaining this trajectory.",
+    "Our {metric} grew {pct}% year-on-year to Rs. {amount} crore this "
+    "quarter, driven largely by the {segment} segment.",
+    "Looking ahead, we are guiding for margin expansion of {bps} basis "
+    "points over the next {years} years as operating leverage plays out.",
+    "We have earmarked capex of Rs. {amount} crore for {fy}, most of it "
+    "towards capacity in the {segment} segment.",
+    "{metric} in {quarter} came in at Rs. {amount} crore, up {pct}% "
+    "sequentially, which is ahead of our own internal plan.",
+    "Demand in the {segment} market softened in the last few weeks, and we "
+    "now see {metric} growth closer to {low}% for the full year.",
+    "We intend to reduce net debt by Rs. {amount} crore by the end of {fy} "
+    "while continuing to invest in the {segment} franchise.",
+]
+FILLER = [
+    "I think it is important to put this in the context of the broader "
+    "industry.",
+    "As we have said on earlier calls, execution remains our top priority.",
+    "The team has done a tremendous job across all our business units.",
+    "Let me take a moment to walk you through the key drivers.",
+    "We continue to monitor the competitive environment very closely.",
+    "Customer feedback on the new offerings has been encouraging so far.",
+    "We will share more details at the investor day later this year.",
+    "There were a few one-off items this quarter that I will call out.",
+    "Overall, we are comfortable with where the business stands today.",
+    "I would not read too much into the quarterly movement here.",
+]
+QUESTIONS = [
+    "Could you help us understand the outlook for {metric} in the "
+    "{segment} business over the next few quarters?",
+    "What is driving the change in {metric} this quarter, and how "
+    "sustainable is it?",
+    "How should we think about capital allocation between the {segment} "
+    "segment and the rest of the portfolio?",
+    "Can you quantify the impact of pricing on {metric} in {quarter}?",
+    "Is there any change to the {fy} guidance given the trends in the "
+    "{segment} market?",
+]
+
+
+def _sentence(rng: random.Random, templates: List[str], period: Dict) -> str:
+    low = rng.randint(5, 20)
+    return rng.choice(templates).format(
+        metric=rng.choice(METRICS), segment=rng.choice(SEGMENTS),
+        low=low, high=low + rng.randint(2, 8), pct=rng.randint(3, 45),
+        amount=f"{rng.randint(50, 9000):,}", bps=rng.choice([50, 75, 100,
+                                                             150, 200]),
+        years=rng.randint(2, 5), **period)
+
+
+def _paragraph(rng: random.Random, period: Dict, quantitative: float) -> str:
+    return ' '.join(
+        _sentence(rng, GUIDANCE, period) if rng.random() < quantitative
+        else rng.choice(FILLER) for _ in range(rng.randint(3, 7)))
+
+
+def _person(rng: random.Random, used: set) -> str:
+    while True:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def company_name(index: int) -> str:
+    """Distinct company name for the index-th transcript."""
+    name = (f"{PREFIXES[index % len(PREFIXES)]} "
+            f"{INDUSTRIES[index // len(PREFIXES) % len(INDUSTRIES)]}")
+    cycle = index // (len(PREFIXES) * len(INDUSTRIES))
+    return f"{name} {cycle + 1}" if cycle else name
+
+
+def generate_transcript(rng: random.Random, company: str, pages: int,
+                        fiscal_year: str = 'FY25',
+                        quarter: str = 'Q2') -> List[str]:
+    """
+    Write the lines of an earnings call transcript about `pages` long:
+    a participant roster, the moderator's opening, prepared remarks by
+    each executive and a Q&A session with sell-side analysts.
+
+    Args:
+        rng (random.Random): Source of every choice, for reproducible text
+        company (str): Company name
+        pages (int): Target length in PDF pages
+        fiscal_year (str): Fiscal year, e.g. 'FY25'
+        quarter (str): Quarter, e.g. 'Q2'
+
+    Returns:
+        List[str]: Wrapped lines, LINES_PER_PAGE to a page
+    """
+    period = {'fy': fiscal_year, 'quarter': f"{quarter} {fiscal_year}"}
+    used = set()
+    executives = [(_person(rng, used), title) for title, chance in EXECUTIVES
+                  if rng.random() < chance]
+    analysts = [(_person(rng, used), rng.choice(FIRMS))
+                for _ in range(rng.randint(4, 10))]
+
+    lines = [f"{company} Limited",
+             f"{quarter} {fiscal_year} Earnings Conference Call", '',
+             'Management:']
+    lines += [f"{i}. {name} – {title}, {company} Limited"
+              for i, (name, title) in enumerate(executives, 1)]
+    lines.append('')
+
+    def turn(speaker, text):
+        lines.extend(textwrap.wrap(f"{speaker}: {text}", LINE_WIDTH))
+        lines.append('')
+
+    turn('Moderator', f"Ladies and gentlemen, good day and welcome to the "
+         f"{company} {quarter} {fiscal_year} earnings conference call. All "
+         f"participant lines will be in the listen-only mode. I now hand the "
+         f"conference over to {executives[0][0]}. Thank you and over to "
+         f"you.")
+    for name, _ in executives:
+        for _ in range(rng.randint(2, 5)):
+            turn(name, _paragraph(rng, period, 0.5))
+    turn('Moderator', 'Thank you. We will now begin the question-and-answer '
+         'session.')
+
+    target = pages * LINES_PER_PAGE
+    while len(lines) < target - 2 * LINES_PER_PAGE // 3:
+        analyst, firm = rng.choice(analysts)
+        turn('Moderator', f"The next question is from the line of {analyst} "
+             f"from {firm}. Please go ahead.")
+        for _ in range(rng.randint(1, 3)):
+            turn(analyst, _sentence(rng, QUESTIONS, period))
+            turn(rng.choice(executives)[0], _paragraph(rng, period, 0.35))
+    turn('Moderator', f"Thank you. On behalf of {company} Limited, that "
+         f"concludes this conference. You may now disconnect your lines.")
+    return lines
+
+
+def write_pdf(lines: List[str], pdf_path: str):
+    """Lay out transcript lines on letter pages with a page footer."""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    page_count = max(1, -(-len(lines) // LINES_PER_PAGE))
+    c = canvas.Canvas(pdf_path, pagesize=letter)
+    c.setFont('Helvetica', 9)
+    for page in range(page_count):
+        y = 750
+        for line in lines[page * LINES_PER_PAGE:(page + 1) * LINES_PER_PAGE]:
+            if line:
+                c.drawString(50, y, line)
+            y -= 12
+        c.drawString(270, 30, f"Page {page + 1} of {page_count}")
+        c.showPage()
+        c.setFont('Helvetica', 9)
+    c.save()
+
+
+def generate_corpus(root: str, files: int, min_pages: int = 10,
+                    max_pages: int = 150, seed: int = 0,
+                    fiscal_year: str = 'FY25',
+                    quarter: str = 'Q2') -> List[Tuple[str, str]]:
+    """
+    Write synthetic transcript PDFs under root/<fiscal_year>/<quarter>/,
+    named like real ones ("Company_Name_Q2FY25.pdf"). The same arguments
+    always give the same files.
+
+    Args:
+        root (str): Directory laid out like pdfs/
+        files (int): Number of transcripts
+        min_pages (int): Shortest transcript in pages
+        max_pages (int): Longest transcript in pages
+        seed (int): Random seed
+
+    Returns:
+        List[Tuple[str, str]]: (pdf_path, company_name) of each transcript
+    """
+    directory = os.path.join(root, fiscal_year, quarter)
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for index in range(files):
+        # One generator per file, so a file does not depend on the count
+        rng = random.Random(f"{seed}-{index}")
+        company = company_name(index)
+        pdf_path = os.path.join(
+            directory, f"{company.replace(' ', '_')}_{quarter}{fiscal_year}.pdf")
+        lines = generate_transcript(rng, company,
+                                    rng.randint(min_pages, max_pages),
+                                    fiscal_year, quarter)
+        write_pdf(lines, pdf_path)
+        corpus.append((pdf_path, company))
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Write synthetic earnings call transcript PDFs')
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--min-pages', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, default=150)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='pdfs',
+                        help='Root directory, laid out like pdfs/')
+    parser.add_argument('--quarter', nargs=2, default=('FY25', 'Q2'),
+                        metavar=('FISCAL_YEAR', 'QUARTER'))
+    args = parser.parse_args()
+    for pdf_path, _ in generate_corpus(args.out, args.files, args.min_pages,
+                                       args.max_pages, args.seed,
+                                       *args.quarter):
+        print(pdf_path)
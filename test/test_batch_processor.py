@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import claude_quote_extractor
+from cache import DiskCache
+from batch_processor import BatchBackfill, make_custom_id
+from claude_quote_extractor import (ClaudeQuoteExtractor, PROMPT_VERSION,
+                                    QUOTE_TOOL)
+
+QUOTES = [{'speaker': 'CEO', 'speaker_name': 'Jane Doe',
+           'description': 'Growth outlook',
+           'quote': 'We expect revenue to grow 20% next year.',
+           'hashtag': '#Acme'}]
+LONG_TRANSCRIPT = '\n\n'.join(
+    f"Speaker {i}: " + 'Revenue grew 10% this year and margins held. ' * 8
+    for i in range(12))
+
+
+def pdf(name):
+    return os.path.join('pdfs', 'FY25', 'Q2', f"{name}_Q2FY25.pdf")
+
+
+def message():
+    return SimpleNamespace(
+        model='claude-test',
+        content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                 input={'quotes': QUOTES})],
+        usage=SimpleNamespace(input_tokens=1000, output_tokens=100,
+                              cache_read_input_tokens=0,
+                              cache_creation_input_tokens=0))
+
+
+class FakeBatches:
+    """Message Batches endpoint that ends each batch after a few polls."""
+
+    def __init__(self, polls=2):
+        self.polls = polls
+        self.batches = {}
+        self.remaining = {}
+        self.retrieved = 0
+        self.crash = False
+        # Requests whose custom_id contains this fail
+        self.errored = 'Broken'
+
+    def create(self, requests):
+        batch_id = f"msgbatch_{len(self.batches)}"
+        self.batches[batch_id] = requests
+        self.remaining[batch_id] = self.polls
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve(self, batch_id):
+        if self.crash:
+            raise RuntimeError('process killed while polling')
+        self.retrieved += 1
+        self.remaining[batch_id] -= 1
+        ended = self.remaining[batch_id] < 0
+        return SimpleNamespace(
+            processing_status='ended' if ended else 'in_progress',
+            request_counts=SimpleNamespace(
+                processing=0 if ended else len(self.batches[batch_id]),
+                succeeded=0, errored=0))
+
+    def results(self, batch_id):
+        assert self.remaining[batch_id] < 0, 'results before the batch ended'
+        for request in self.batches[batch_id]:
+            if self.errored in request['custom_id']:
+                result = SimpleNamespace(type='errored')
+            else:
+                result = SimpleNamespace(type='succeeded', message=message())
+            yield SimpleNamespace(custom_id=request['custom_id'],
+                                  result=result)
+
+
+class FakeAsyncClient:
+    """Answers the map requests of long transcripts."""
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.messages = self
+
+    async def create(self, **params):
+        self.calls.append(params)
+        return message()
+
+    async def close(self):
+        pass
+
+
+class FakePDFProcessor:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def extract_texts(self, pdf_paths):
+        return {path: self.texts[path] for path in pdf_paths
+                if path in self.texts}
+
+    def extract_text(self, pdf_path):
+        return self.texts[pdf_path]
+
+
+@pytest.fixture
+def batches():
+    return FakeBatches()
+
+
+@pytest.fixture
+def async_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(claude_quote_extractor, 'make_client',
+                        lambda *args, **kwargs: FakeAsyncClient(calls))
+    # Long enough for LONG_TRANSCRIPT only
+    monkeypatch.setattr(claude_quote_extractor, 'MAX_TRANSCRIPT_TOKENS', 500)
+    return calls
+
+
+def backfill(batches, tmp_path, texts, cache=True):
+    extractor = ClaudeQuoteExtractor(
+        requests_per_minute=None, chunk_tokens=100,
+        response_cache=DiskCache('responses', root=str(tmp_path / 'cache'))
+        if cache else None)
+    extractor._client = SimpleNamespace(messages=SimpleNamespace(
+        batches=batches))
+    return BatchBackfill(extractor, FakePDFProcessor(texts), poll_interval=0,
+                         state_dir=str(tmp_path / 'batches'))
+
+
+def texts_of(*names):
+    return {pdf(name): f"CEO: {name} revenue grew 20% this year."
+            for name in names}
+
+
+def test_submit_poll_collect(batches, tmp_path):
+    texts = texts_of('Acme', 'Globex', 'Broken')
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts) + [pdf('Missing')]))
+
+    assert len(batches.batches) == 1
+    submitted = batches.batches['msgbatch_0']
+    assert [r['custom_id'] for r in submitted] == [
+        make_custom_id(path) for path in texts]
+    # Polled until the batch ended
+    assert batches.retrieved == 3
+    assert [q['quote'] for q in results[pdf('Acme')]] == [QUOTES[0]['quote']]
+    assert results[pdf('Globex')][0]['company'] == 'Globex'
+    assert 'errored' in str(results[pdf('Broken')])
+    assert 'text extraction failed' in str(results[pdf('Missing')])
+    # The finished batch leaves no state behind
+    assert os.listdir(tmp_path / 'batches') == []
+
+
+def test_resume_after_crash(batches, tmp_path):
+    texts = texts_of('Acme', 'Globex')
+    batches.crash = True
+    with pytest.raises(RuntimeError):
+        backfill(batches, tmp_path, texts).run('FY25', 'Q2', list(texts))
+    state_path = tmp_path / 'batches' / 'FY25_Q2.json'
+    state = json.loads(state_path.read_text())
+    assert state['batch_id'] == 'msgbatch_0'
+    assert state['prompt_version'] == PROMPT_VERSION
+
+    # A new process picks the batch up instead of submitting another
+    batches.crash = False
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts)))
+    assert list(batches.batches) == ['msgbatch_0']
+    assert sorted(results) == sorted(texts)
+    assert not state_path.exists()
+
+
+def test_stale_prompt_version_is_resubmitted(batches, tmp_path):
+    texts = texts_of('Acme')
+    os.makedirs(tmp_path / 'batches')
+    (tmp_path / 'batches' / 'FY25_Q2.json').write_text(json.dumps({
+        'batch_id': 'msgbatch_old', 'prompt_version': PROMPT_VERSION - 1,
+        'requests': {}}))
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts)))
+    assert list(batches.batches) == ['msgbatch_0']
+    assert len(results[pdf('Acme')]) == 1
+
+
+def test_cached_transcripts_skip_the_batch(batches, tmp_path):
+    texts = texts_of('Acme', 'Globex')
+    backfill(batches, tmp_path, texts).run('FY25', 'Q2', list(texts))
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts)))
+    assert len(batches.batches) == 1
+    assert sorted(results) == sorted(texts)
+
+
+def test_long_transcripts_use_map_reduce(batches, tmp_path, async_calls):
+    texts = texts_of('Acme')
+    texts[pdf('Initech')] = LONG_TRANSCRIPT
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts)))
+
+    # Only the short transcript is batched, whole
+    submitted = batches.batches['msgbatch_0']
+    assert [r['custom_id'] for r in submitted] == [make_custom_id(pdf('Acme'))]
+    # The long one went chunk by chunk through the regular API
+    assert len(async_calls) == 12
+    assert all(len(call['messages'][0]['content']) < 1000
+               for call in async_calls)
+    assert len(results[pdf('Initech')]) == 12
+    assert len(results[pdf('Acme')]) == 1
+
+
+def test_only_long_transcripts_submit_no_batch(batches, tmp_path,
+                                               async_calls):
+    texts = {pdf('Initech'): LONG_TRANSCRIPT}
+    results = dict(backfill(batches, tmp_path, texts, cache=False).run(
+        'FY25', 'Q2', list(texts)))
+    assert batches.batches == {}
+    assert len(results[pdf('Initech')]) == 12
+
+
+def test_requests_use_the_request_text(batches, tmp_path):
+    texts = texts_of('Acme')
+    runner = backfill(batches, tmp_path, texts)
+    runner.request_text = lambda text, company_name, pdf_path: text.upper()
+    runner.run('FY25', 'Q2', list(texts))
+    submitted = batches.batches['msgbatch_0'][0]['params']
+    assert texts[pdf('Acme')].upper() in submitted['messages'][0]['content']
+    # The result is cached under the same request a synchronous run sends
+    assert runner.quote_extractor.reparse_cached(
+        texts[pdf('Acme')].upper(), 'Acme', pdf('Acme')) is not None
+    assert runner.quote_extractor.reparse_cached(
+        texts[pdf('Acme')], 'Acme', pdf('Acme')) is None
+
+
+def test_long_transcripts_survive_a_resume(batches, tmp_path, async_calls):
+    texts = texts_of('Acme')
+    texts[pdf('Initech')] = LONG_TRANSCRIPT
+    batches.crash = True
+    with pytest.raises(RuntimeError):
+        backfill(batches, tmp_path, texts).run('FY25', 'Q2', list(texts))
+    state = json.loads((tmp_path / 'batches' / 'FY25_Q2.json').read_text())
+    assert state['chunked'] == {pdf('Initech'): 'Initech'}
+
+    batches.crash = False
+    async_calls.clear()
+    results = dict(backfill(batches, tmp_path, texts).run(
+        'FY25', 'Q2', list(texts)))
+    assert len(results[pdf('Initech')]) == 12
+    assert len(results[pdf('Acme')]) == 1
+    # The map replies of the first run came from the response cache
+    assert async_calls == []
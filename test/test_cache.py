@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import DiskCache
+
+
+def entry(size):
+    return {'text': 'x' * size}
+
+
+def disk_bytes(cache):
+    return sum(size for _, size, _ in cache._entries())
+
+
+def test_total_matches_disk_after_puts_and_overwrites(tmp_path):
+    cache = DiskCache('text', root=str(tmp_path))
+    cache.put('aa01', entry(100))
+    cache.put('bb02', entry(200))
+    assert cache.total_bytes() == disk_bytes(cache)
+
+    # A fresh process sizes the cache from disk on its first put
+    cache = DiskCache('text', root=str(tmp_path))
+    cache.put('cc03', entry(300))
+    assert cache.total_bytes() == disk_bytes(cache)
+    cache.put('aa01', entry(50))
+    assert cache.total_bytes() == disk_bytes(cache)
+
+    cache.invalidate()
+    cache.put('dd04', entry(10))
+    assert cache.total_bytes() == disk_bytes(cache)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    size = len('{"text": ""}') + 1000
+    cache = DiskCache('text', max_bytes=3 * size, root=str(tmp_path))
+    for index, key in enumerate(['aa01', 'bb02', 'cc03']):
+        cache.put(key, entry(1000))
+        past = time.time() - 100 + index
+        os.utime(cache._path(key), (past, past))
+    # Reading an entry makes it the most recently used
+    assert cache.get('aa01') == entry(1000)
+
+    cache.put('dd04', entry(1000))
+    assert cache.get('bb02') is None
+    assert cache.get('aa01') is not None
+    assert cache.get('cc03') is not None
+    assert cache.total_bytes() == disk_bytes(cache) == 3 * size
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chunking import split_segments, split_transcript
+
+TRANSCRIPT = '\n'.join([
+    'Acme Limited Q2 FY25 Earnings Call',
+    'Moderator: Welcome to the call.',
+    'Jane Doe: Revenue grew 20% this year.',
+    'Margins expanded by 150 basis points.',
+    'Question-and-Answer Session',
+    'Ravi Kumar: What is the outlook?',
+    'Jane Doe: We expect growth to continue.',
+])
+
+
+def test_segments_follow_speaker_turns_and_sections():
+    segments = split_segments(TRANSCRIPT)
+    assert [segment.split('\n')[0].split(':')[0] for segment in segments] == [
+        'Acme Limited Q2 FY25 Earnings Call', 'Moderator', 'Jane Doe',
+        'Question-and-Answer Session', 'Ravi Kumar', 'Jane Doe']
+    assert '\n'.join(segments) == TRANSCRIPT
+
+
+def test_chunks_cut_between_speaker_turns():
+    chunks = split_transcript(TRANSCRIPT, 100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert '\n'.join(chunks) == TRANSCRIPT
+    # Jane Doe's two-line turn is not split across chunks
+    assert any('Jane Doe: Revenue grew 20% this year.\nMargins expanded'
+               in chunk for chunk in chunks)
+    assert split_transcript(TRANSCRIPT, 1000) == [TRANSCRIPT]
+
+
+def test_long_lines_are_cut_on_sentence_ends():
+    line = 'Jane Doe: ' + ' '.join(f"Sentence number {i} ends here."
+                                   for i in range(20))
+    chunks = split_transcript(line, 80)
+    assert all(len(chunk) <= 80 for chunk in chunks)
+    assert all(chunk.endswith('here.') for chunk in chunks)
+    assert ' '.join(chunks) == line
+
+    # A sentence longer than a chunk is hard-cut as a last resort
+    chunks = split_transcript('x' * 250, 100)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# The stub accepts any key
+os.environ.setdefault('ANTHROPIC_API_KEY', 'stub')
+
+import rate_limiter
+import claude_quote_extractor
+from cache import DiskCache
+from claude_quote_extractor import (ClaudeQuoteExtractor, QUOTE_COUNT,
+                                    QUOTE_TOOL, REDUCE_MODEL,
+                                    estimate_tokens)
+
+QUOTES = [{'speaker': 'CEO', 'speaker_name': 'Jane Doe',
+           'description': 'Growth outlook',
+           'quote': 'We expect revenue to grow 20% next year.',
+           'hashtag': '#Acme'}]
+# Twelve speaker turns, one map request each at chunk_tokens=100
+TRANSCRIPT = '\n\n'.join(
+    f"Speaker {i}: " + 'Revenue grew 10% this year and margins held. ' * 8
+    for i in range(12))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Messages API stand-in that records how many requests overlap."""
+    latency = 0.05
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    served = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = StubHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(cls.latency)
+            body = json.dumps({
+                'id': 'msg_stub', 'type': 'message', 'role': 'assistant',
+                'model': request.get('model'),
+                'content': [{'type': 'tool_use', 'id': 'toolu_stub',
+                             'name': QUOTE_TOOL['name'],
+                             'input': {'quotes': QUOTES}}],
+                'stop_reason': 'tool_use', 'stop_sequence': None,
+                'usage': {'input_tokens': 1000, 'output_tokens': 100}
+            }).encode()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+                cls.served += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.in_flight = StubHandler.peak = StubHandler.served = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_max_concurrency_caps_requests_across_threads(stub_url):
+    extractor = ClaudeQuoteExtractor(base_url=stub_url, max_concurrency=3,
+                                     requests_per_minute=None,
+                                     always_chunk=True, chunk_tokens=100)
+
+    def extract(index):
+        quotes = extractor.extract_quotes(TRANSCRIPT, f"Company {index}")
+        # The async client made for this thread's event loop is closed
+        assert getattr(extractor._loop_state, 'client', None) is None
+        return quotes
+
+    # Four pipeline workers, each mapping twelve chunks concurrently
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(extract, range(4)))
+    assert [len(quotes) for quotes in results] == [12] * 4
+    assert StubHandler.served == 48
+    assert StubHandler.peak == 3
+
+
+def test_max_concurrency_caps_sync_requests(stub_url):
+    extractor = ClaudeQuoteExtractor(base_url=stub_url, max_concurrency=2,
+                                     requests_per_minute=None)
+    with ThreadPoolExecutor(6) as pool:
+        list(pool.map(lambda i: extractor.extract_quotes(
+            'CEO: Revenue grew 10% this year.', f"Company {i}"), range(12)))
+    assert StubHandler.served == 12
+    assert StubHandler.peak == 2
+
+
+class FakeClock:
+    """Stands in for the time module inside rate_limiter."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeClient:
+    """Answers instantly, recording when each request was sent."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+        self.messages = self
+
+    def create(self, **params):
+        prompt = ''.join(block['text'] for block in params['system'])
+        prompt += params['messages'][0]['content']
+        tokens = estimate_tokens(prompt)
+        self.sent.append((self.clock.now, tokens + 100))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                     input={'quotes': QUOTES})],
+            usage=SimpleNamespace(input_tokens=tokens, output_tokens=100,
+                                  cache_read_input_tokens=0,
+                                  cache_creation_input_tokens=0))
+
+
+def run_with_fake_clock(monkeypatch, requests, **limits):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    extractor = ClaudeQuoteExtractor(**limits)
+    extractor._client = FakeClient(clock)
+    start = clock.now
+    for i in range(requests):
+        extractor.extract_quotes(f"CEO: Revenue grew {i}% this year.",
+                                 'Acme')
+    return [(sent - start, tokens) for sent, tokens in extractor._client.sent]
+
+
+def test_requests_per_minute_limit_holds(monkeypatch):
+    sent = run_with_fake_clock(monkeypatch, 80, requests_per_minute=30)
+    # A full bucket of 30, then one request every two seconds
+    for count, (elapsed, _) in enumerate(sent, 1):
+        assert count <= 30 + elapsed * 30 / 60 + 1e-6
+    assert sent[29][0] == 0
+    assert sent[-1][0] == pytest.approx(100, abs=0.01)
+
+
+def test_tokens_per_minute_limit_holds(monkeypatch):
+    sent = run_with_fake_clock(monkeypatch, 60, requests_per_minute=None,
+                               tokens_per_minute=20000)
+    used = 0
+    for elapsed, tokens in sent:
+        used += tokens
+        assert used <= 20000 + elapsed * 20000 / 60 + 1e-6
+    # The budget, not the request count, spread the requests out
+    assert sent[-1][0] > 30
+
+
+class FakeStream:
+    """Replays a tool reply as input_json_delta events."""
+
+    def __init__(self, tool_input):
+        self.tool_input = tool_input
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        partial = json.dumps(self.tool_input)
+        for start in range(0, len(partial), 7):
+            yield SimpleNamespace(
+                type='content_block_delta',
+                delta=SimpleNamespace(type='input_json_delta',
+                                      partial_json=partial[start:start + 7]))
+
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                     input=self.tool_input)],
+            stop_reason='tool_use',
+            usage=SimpleNamespace(input_tokens=1000, output_tokens=100,
+                                  cache_read_input_tokens=0,
+                                  cache_creation_input_tokens=0))
+
+
+def test_stream_quotes_parses_string_encoded_quotes():
+    extractor = ClaudeQuoteExtractor(requests_per_minute=None)
+    extractor._client = SimpleNamespace(messages=SimpleNamespace(
+        stream=lambda **params: FakeStream({'quotes': json.dumps(QUOTES)})))
+    quotes = list(extractor.stream_quotes('CEO: Revenue grew 10% this year.',
+                                          'Acme'))
+    assert [quote['quote'] for quote in quotes] == [QUOTES[0]['quote']]
+
+
+class MapReduceClient:
+    """Async client giving each excerpt two candidates; the reduce call
+    picks every third candidate, last first."""
+
+    def __init__(self):
+        self.calls = []
+        self.messages = self
+
+    async def create(self, **params):
+        self.calls.append(params)
+        prompt = params['messages'][0]['content']
+        if params['model'] == REDUCE_MODEL:
+            candidates = json.loads(
+                prompt.split('transcript:\n\n', 1)[1].split('\n\nSelect')[0])
+            quotes = candidates[::3][::-1]
+        else:
+            excerpt = prompt.split('Transcript excerpt ')[1].split(' of')[0]
+            quotes = [dict(QUOTES[0], quote=f"Excerpt {excerpt} point {n} "
+                           f"matters.") for n in range(2)]
+        return SimpleNamespace(
+            model=params['model'],
+            content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                     input={'quotes': quotes})],
+            usage=SimpleNamespace(input_tokens=1000, output_tokens=100,
+                                  cache_read_input_tokens=0,
+                                  cache_creation_input_tokens=0))
+
+    async def close(self):
+        pass
+
+
+def test_map_reduce_merges_candidates_from_every_chunk(monkeypatch):
+    client = MapReduceClient()
+    monkeypatch.setattr(claude_quote_extractor, 'make_client',
+                        lambda *args, **kwargs: client)
+    extractor = ClaudeQuoteExtractor(requests_per_minute=None,
+                                     chunk_tokens=100, always_chunk=True)
+    quotes = extractor.extract_quotes(TRANSCRIPT, 'Acme')
+
+    maps = [call for call in client.calls if call['model'] != REDUCE_MODEL]
+    reduces = [call for call in client.calls if call['model'] == REDUCE_MODEL]
+    assert len(maps) == 12 and len(reduces) == 1
+    # Every chunk's candidates reach the reduce call, in transcript order
+    candidates = [f"Excerpt {i} point {n} matters." for i in range(1, 13)
+                  for n in range(2)]
+    assert len(candidates) > QUOTE_COUNT
+    reduce_prompt = reduces[0]['messages'][0]['content']
+    assert [reduce_prompt.index(c) for c in candidates] == sorted(
+        reduce_prompt.index(c) for c in candidates)
+    # The result is the reduce reply, in its order
+    assert [q['quote'] for q in quotes] == candidates[::3][::-1]
+    assert all(q['company'] == 'Acme' for q in quotes)
+
+
+def test_map_reduce_skips_the_reduce_call_for_few_candidates(monkeypatch):
+    client = MapReduceClient()
+    monkeypatch.setattr(claude_quote_extractor, 'make_client',
+                        lambda *args, **kwargs: client)
+    extractor = ClaudeQuoteExtractor(requests_per_minute=None,
+                                     chunk_tokens=400, always_chunk=True)
+    quotes = extractor.extract_quotes(TRANSCRIPT, 'Acme')
+    assert all(call['model'] != REDUCE_MODEL for call in client.calls)
+    assert len(quotes) == 2 * len(client.calls) <= QUOTE_COUNT
+
+
+class RepairClient:
+    """Answers repair calls with a fixed reply, recording each request."""
+
+    def __init__(self, repaired):
+        self.repaired = repaired
+        self.calls = []
+        self.messages = self
+
+    def create(self, **params):
+        self.calls.append(params)
+        return SimpleNamespace(
+            model=params['model'],
+            content=[SimpleNamespace(type='tool_use', name=QUOTE_TOOL['name'],
+                                     input={'quotes': self.repaired})],
+            usage=SimpleNamespace(input_tokens=200, output_tokens=100,
+                                  cache_read_input_tokens=0,
+                                  cache_creation_input_tokens=0))
+
+
+def test_only_malformed_quotes_are_repaired_in_place(tmp_path):
+    first = dict(QUOTES[0], quote='Revenue will grow 20% next year.')
+    no_description = dict(QUOTES[0], description='',
+                          quote='Margins will expand 150 basis points.')
+    third = dict(QUOTES[0], quote='We will open 200 new stores.')
+    no_speaker = dict(QUOTES[0], speaker=None,
+                      quote='Debt will be fully repaid by FY27.')
+    reply = json.dumps({'quotes': [first, no_description, third, no_speaker,
+                                   'not a quote']})
+    # Repairs come back out of order and one item cannot be fixed
+    client = RepairClient([dict(no_speaker, speaker='CFO'),
+                           dict(no_description, description='Margins')])
+    extractor = ClaudeQuoteExtractor(
+        requests_per_minute=None,
+        response_cache=DiskCache('responses', root=str(tmp_path)))
+    extractor._client = client
+
+    quotes = extractor.finish_quotes(reply, 'Acme', 'pdfs/FY25/Q2/Acme.pdf')
+    assert [(q['speaker'], q['description'], q['quote']) for q in quotes] == [
+        ('CEO', 'Growth outlook', first['quote']),
+        ('CEO', 'Margins', no_description['quote']),
+        ('CEO', 'Growth outlook', third['quote']),
+        ('CFO', 'Growth outlook', no_speaker['quote'])]
+    # One small call carrying only the malformed items
+    assert len(client.calls) == 1
+    prompt = client.calls[0]['messages'][0]['content']
+    assert no_description['quote'] in prompt and 'not a quote' in prompt
+    assert first['quote'] not in prompt and third['quote'] not in prompt
+    assert extractor.parse_stats['repaired'] == 2
+    assert extractor.parse_stats['dropped'] == 1
+
+    # Re-parsing uses the cached repair instead of calling again
+    assert extractor.parse_response(reply, 'Acme',
+                                    'pdfs/FY25/Q2/Acme.pdf') == quotes
+    assert len(client.calls) == 1
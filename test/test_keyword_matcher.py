@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from keyword_matcher import KeywordMatcher
+from quote_extractor import QuoteExtractor
+
+
+def test_offsets_are_utf8_bytes():
+    matcher = KeywordMatcher({'revenue': 1.0, 'gross margin': 2.0,
+                              'guid*': 0.5})
+    text = 'Revenue of ₹500 crore — gross\nmargins held, guidance raised'
+    data = text.encode('utf-8')
+    matches = matcher.find(text)
+    assert [m.term for m in matches] == ['revenue', 'gross margin', 'guid*']
+    assert [data[m.start:m.end].decode('utf-8') for m in matches] == [
+        'Revenue', 'gross\nmargins', 'guidance']
+
+
+def test_ascii_offsets_match_characters():
+    matcher = KeywordMatcher({'margin': 1.0})
+    (match,) = matcher.find('Operating margins expanded')
+    assert (match.start, match.end) == (10, 17)
+
+
+def test_quotes_map_to_sentences_after_multibyte_text():
+    extractor = QuoteExtractor(keywords={'guidance': 1.0})
+    text = ('Sales reached ₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹₹ crore in the quarter.\n'
+            'We raised our guidance for the full year today.\n'
+            'The board met on Tuesday to discuss the results.')
+    assert extractor.extract_quotes(text) == [
+        'We raised our guidance for the full year today.']
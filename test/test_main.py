@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import DiskCache
+from claude_quote_extractor import ClaudeQuoteExtractor
+from main import reparse_cached, request_text
+from quote_extractor import QuoteExtractor
+from transcript_index import index_transcript
+
+QUOTES = [{'speaker': 'CEO', 'speaker_name': 'Jane Doe',
+           'description': 'Growth outlook',
+           'quote': 'We expect revenue to grow 20% next year.',
+           'hashtag': '#Acme'}]
+TRANSCRIPT = """Acme Limited Q2 FY25 Earnings Conference Call
+
+Management:
+1. Jane Doe - Chief Executive Officer, Acme Limited
+2. John Roe - Chief Financial Officer, Acme Limited
+
+Moderator: Good morning and welcome to the call. Over to Jane Doe.
+Jane Doe: We expect revenue to grow 20% next year. The weather was
+pleasant. Thanks for joining.
+John Roe: Margins expanded 150 basis points in Q2 FY25. Costs were flat.
+Moderator: The first question is from the line of Ravi Kumar from Alpha
+Capital. Please go ahead.
+Ravi Kumar: What is the margin outlook for FY26?
+John Roe: We expect margins to hold at 18% in FY26.
+Ravi Kumar: Thank you, that is all.
+Jane Doe: Thank you all for joining us today.
+"""
+
+
+class FakePDFProcessor:
+    def extract_document(self, pdf_path):
+        return {'text': TRANSCRIPT, 'page_offsets': [0],
+                'transcript_index': index_transcript(TRANSCRIPT, [0])}
+
+
+def make_args(**overrides):
+    args = dict(focus='all', speaker=[], compare_prefilter=False,
+                prefilter_context=1, prefilter_ratio=0.2, verify='off')
+    args.update(overrides)
+    return SimpleNamespace(**args)
+
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pdf_dir = tmp_path / 'pdfs' / 'FY25' / 'Q2'
+    pdf_dir.mkdir(parents=True)
+    (pdf_dir / 'Acme_Q2FY25.pdf').write_bytes(b'%PDF-1.4\n%%EOF\n')
+    return ClaudeQuoteExtractor(
+        requests_per_minute=None,
+        response_cache=DiskCache('responses', root=str(tmp_path / 'cache')))
+
+
+def run(extractor, prefilter, args):
+    written = []
+    reparse_cached(extractor, FakePDFProcessor(), prefilter, args,
+                   lambda quotes, filename, *_: written.append(
+                       (filename, quotes)))
+    return written
+
+
+def cache_reply(extractor, text):
+    extractor.cache_response(extractor.build_request(text, 'Acme'),
+                             json.dumps({'quotes': QUOTES}), 'Acme',
+                             'Acme_Q2FY25.pdf')
+
+
+def test_reparse_rebuilds_the_prefiltered_request(extractor):
+    prefilter = QuoteExtractor()
+    args = make_args()
+    filtered = request_text(prefilter, args, TRANSCRIPT, None, 'Acme')
+    assert filtered != TRANSCRIPT
+    cache_reply(extractor, filtered)
+
+    written = run(extractor, prefilter, args)
+    assert [(f, [q['quote'] for q in quotes]) for f, quotes in written] == [
+        ('Acme_Q2FY25.pdf', [QUOTES[0]['quote']])]
+    # Without the pre-filter a normal run sends the whole transcript, whose
+    # reply is not cached
+    assert run(extractor, None, args) == []
+    # Nor is the one for other pre-filter options
+    assert run(extractor, prefilter, make_args(prefilter_context=0)) == []
+
+
+def test_reparse_rebuilds_the_focused_request(extractor):
+    args = make_args(speaker=['Jane Doe'])
+    focused = request_text(None, args, TRANSCRIPT,
+                           index_transcript(TRANSCRIPT, [0]), 'Acme')
+    assert 'Jane Doe (Chief Executive Officer' in focused
+    assert 'John Roe' not in focused
+    cache_reply(extractor, focused)
+
+    assert len(run(extractor, None, args)) == 1
+    assert run(extractor, None, make_args()) == []
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from manifest import Manifest
+
+PDFS = [(os.path.join('pdfs', 'FY25', 'Q2', f"{name}_Q2_FY25.pdf"), 'FY25',
+         'Q2') for name in ('Acme', 'Globex')]
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for pdf_path, _, _ in PDFS:
+        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4 ' + pdf_path.encode())
+    manifest = Manifest(str(tmp_path / 'manifest.db'))
+    manifest.sync(PDFS)
+    yield manifest
+    manifest.close()
+
+
+def test_model_or_prompt_change_requeues_done_pdfs(manifest):
+    assert manifest.pending('model-a', 1) == PDFS
+    for pdf_path, _, _ in PDFS:
+        manifest.mark_done(pdf_path, 'model-a', 1)
+    assert manifest.pending('model-a', 1) == []
+    assert not manifest.needs_processing(PDFS[0][0], 'model-a', 1)
+
+    assert manifest.needs_processing(PDFS[0][0], 'model-a', 2)
+    assert manifest.pending('model-a', 2) == PDFS
+    manifest.mark_done(PDFS[0][0], 'model-a', 2)
+    assert manifest.needs_processing(PDFS[0][0], 'model-b', 2)
+    assert manifest.pending('model-b', 2) == PDFS
+
+
+def test_imported_outputs_are_requeued_for_the_current_prompt(manifest):
+    output = os.path.join('output', 'FY25', 'Q2', 'Acme_Q2_FY25_quotes.json')
+    os.makedirs(os.path.dirname(output))
+    with open(output, 'w') as f:
+        f.write('[]')
+    assert manifest.import_outputs() == 1
+    # Recorded before the manifest, with no model or prompt version
+    assert manifest.needs_processing(PDFS[0][0], 'model-a', 1)
+    assert manifest.pending('model-a', 1) == PDFS
+
+
+def test_changed_content_requeues_a_done_pdf(manifest):
+    manifest.mark_done(PDFS[0][0], 'model-a', 1)
+    manifest.mark_done(PDFS[1][0], 'model-a', 1)
+    with open(PDFS[1][0], 'ab') as f:
+        f.write(b' revised')
+    manifest.sync(PDFS)
+    assert manifest.pending('model-a', 1) == PDFS[1:]
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pdf_processor
+from cache import DiskCache
+from pdf_processor import PDFProcessor
+
+canvas = pytest.importorskip('reportlab.pdfgen.canvas')
+
+
+def make_pdf(path, pages):
+    c = canvas.Canvas(str(path))
+    for page in range(pages):
+        c.drawString(50, 750, f"Page {page} of {path.stem}")
+        c.showPage()
+    c.save()
+    return str(path)
+
+
+def page_numbers(text):
+    return [int(line.split()[1]) for line in text.splitlines()
+            if line.startswith('Page ')]
+
+
+def test_shards_are_put_back_in_page_order(tmp_path):
+    paths = [make_pdf(tmp_path / 'long.pdf', 11),
+             make_pdf(tmp_path / 'short.pdf', 2)]
+    processor = PDFProcessor(max_workers=3, min_pages_per_shard=1)
+    # Several page ranges per file, so the pool has to reassemble them
+    shards = processor._plan_shards({paths[0]: 11, paths[1]: 2})
+    assert len([s for s in shards if s[0] == paths[0]]) > 1
+
+    texts = processor.extract_texts(paths + [str(tmp_path / 'missing.pdf')])
+    assert sorted(texts) == sorted(paths)
+    assert page_numbers(texts[paths[0]]) == list(range(11))
+    assert page_numbers(texts[paths[1]]) == [0, 1]
+    assert texts[paths[0]] == PDFProcessor().extract_text(paths[0])
+
+
+def test_cached_documents_are_not_parsed_again(tmp_path, monkeypatch):
+    path = make_pdf(tmp_path / 'acme.pdf', 3)
+    cache = DiskCache('pdf_text', root=str(tmp_path / 'cache'))
+    text = PDFProcessor(max_workers=1, cache=cache).extract_texts([path])[path]
+
+    def fail(*args):
+        raise AssertionError('parsed a cached PDF')
+
+    monkeypatch.setattr(pdf_processor, '_inspect', fail)
+    processor = PDFProcessor(max_workers=1, cache=cache)
+    assert processor.extract_texts([path]) == {path: text}
+    document = processor.extract_document(path)
+    assert document['page_count'] == 3
+    assert len(document['page_offsets']) == 3
@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline import Stage
+
+
+def test_failing_error_callback_keeps_the_worker_alive():
+    def handler(job):
+        raise ValueError('bad transcript')
+
+    def on_error(job, error):
+        raise RuntimeError('manifest is locked')
+
+    stage = Stage('parse', handler, workers=1, queue_size=1,
+                  on_error=on_error)
+    stage.start()
+    # More jobs than the queue holds: a dead worker would block submit
+    for index in range(5):
+        stage.queue.put({'filename': f"{index}.pdf",
+                         'pdf_path': f"{index}.pdf"}, timeout=5)
+    stage.close()
+    assert stage.failed == 5
+    assert stage.done == 5
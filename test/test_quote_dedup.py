@@ -0,0 +1,84 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_dedup import QuoteDedupIndex, shingles
+from quote_store import QuoteStore
+
+
+def quote(company, text):
+    return {'company': company, 'speaker': 'CFO', 'fiscal_year': 'FY25',
+            'quarter': 'Q2', 'quote': text}
+
+
+GUIDANCE = 'We now expect EBITDA margins to expand by 150 basis points in FY26.'
+
+
+def source(company):
+    return os.path.join('output', 'FY25', 'Q2', f"{company}_quotes.json")
+
+
+def test_index_follows_the_quote_store(tmp_path):
+    store = QuoteStore(str(tmp_path / 'quotes.db'))
+    store.save(source('Acme'), [quote('Acme', GUIDANCE)], saved_at=100.0)
+    index = QuoteDedupIndex(str(tmp_path / 'dedup.db'))
+    assert index.sync_store(store) == 1
+    assert index.sync_store(store) == 0
+    assert index.count() == 1
+
+    # Re-saved and removed transcripts are picked up
+    store.save(source('Acme'), [quote('Acme', GUIDANCE),
+                                quote('Acme', 'Revenue grew 20% this year.')],
+               saved_at=200.0)
+    store.save(source('Globex'), [quote('Globex', 'Churn fell to 2%.')],
+               saved_at=200.0)
+    assert index.sync_store(store) == 2
+    assert index.count() == 3
+    store.remove(source('Globex'))
+    assert index.sync_store(store) == 0
+    assert index.count() == 2
+
+    index.close()
+    store.close()
+
+
+def test_near_duplicates_are_flagged(tmp_path):
+    index = QuoteDedupIndex(str(tmp_path / 'dedup.db'))
+    index.add_file(source('Acme'), [quote('Acme', GUIDANCE)])
+
+    reworded = quote('Globex', 'We now expect EBITDA margins to expand by '
+                               '150 basis points in FY26, as guided.')
+    unrelated = quote('Globex', 'Our new plant in Pune will start '
+                                'production in the third quarter.')
+    repeat = quote('Globex', unrelated['quote'].upper())
+    kept = index.check([reworded, unrelated, repeat], source('Globex'))
+    assert kept == [reworded, unrelated, repeat]
+    # Against the archive
+    assert reworded['duplicate_of'] == {
+        'source_path': source('Acme'), 'speaker': 'CFO', 'quote': GUIDANCE}
+    assert 'duplicate_of' not in unrelated
+    # Within the call, pointing at the higher-ranked quote
+    assert repeat['duplicate_of']['quote'] == unrelated['quote']
+    assert repeat['duplicate_of']['source_path'] == source('Globex')
+
+    assert index.check([reworded, unrelated, repeat], source('Globex'),
+                       drop=True) == [unrelated]
+    # A transcript being reprocessed does not match its own earlier output
+    assert index.check([quote('Acme', GUIDANCE)], source('Acme'),
+                       drop=True) != []
+    index.close()
+
+
+def test_lookup_finds_only_similar_quotes(tmp_path):
+    index = QuoteDedupIndex(str(tmp_path / 'dedup.db'), threshold=0.5)
+    for i in range(50):
+        index.add_file(source(f"Company{i}"), [quote(
+            f"Company{i}", f"Company {i} plans to open {i * 7} stores in "
+                           f"region {i} while cutting costs by {i}%.")])
+    found = index.matches(index.hasher.signature(shingles(
+        'Company 7 plans to open 49 stores in region 7 while cutting costs '
+        'by 7% this year.')))
+    assert [match['company'] for match in found] == ['Company7']
+    assert found[0]['similarity'] >= 0.5
+    index.close()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_extractor import QuoteExtractor
+
+
+def transcript(turns=10, sentences=10):
+    # Every third sentence carries numbers worth picking
+    return '\n\n'.join(
+        f"Speaker {t}: " + ' '.join(
+            f"Revenue grew {t * sentences + i}% this year." if i % 3 == 0
+            else f"We thank item {chr(97 + t)}{chr(97 + i)} here."
+            for i in range(sentences))
+        for t in range(turns))
+
+
+def kept_sentences(selected):
+    return selected.count('Revenue grew') + selected.count('We thank')
+
+
+def test_keep_ratio_bounds_sentences_including_context():
+    extractor = QuoteExtractor()
+    for ratio in (0.2, 0.4):
+        selected = extractor.select_passages(transcript(), keep_ratio=ratio,
+                                             context=1, header_chars=0)
+        assert kept_sentences(selected) == round(100 * ratio)
+
+
+def test_short_transcripts_are_cut_too():
+    extractor = QuoteExtractor()
+    selected = extractor.select_passages(transcript(turns=2), keep_ratio=0.3,
+                                         header_chars=0)
+    # No floor keeps the whole of a short call
+    assert kept_sentences(selected) == 6
+
+
+def test_best_sentences_are_kept_in_transcript_order():
+    extractor = QuoteExtractor()
+    text = ('Operator: Welcome to the call. Please hold.\n\n'
+            'CFO: The weather was fine. We guide FY26 revenue growth of 25% '
+            'and EBITDA margin of 18%. Thank you.')
+    selected = extractor.select_passages(text, top_k=1, context=0,
+                                         header_chars=0)
+    assert selected.strip() == (
+        'CFO: We guide FY26 revenue growth of 25% and EBITDA margin of 18%.')
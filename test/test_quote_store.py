@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from main import save_results
+from claude_quote_extractor import ClaudeQuoteExtractor
+from quote_store import QuoteStore
+
+
+def quotes(company):
+    return [{'company': company, 'speaker': 'CFO', 'speaker_name': 'Jane Doe',
+             'description': 'Guidance', 'hashtag': f"#{company}",
+             'quote': 'We now expect margins to expand 150 basis points.'}]
+
+
+def test_saved_results_are_not_imported_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = QuoteStore()
+    extractor = ClaudeQuoteExtractor(requests_per_minute=None)
+    for company in ('Acme', 'Globex'):
+        save_results(extractor, quotes(company), f"{company}_Q2FY25.pdf",
+                     'FY25', 'Q2', store=store)
+    assert store.import_outputs() == 0
+
+    # A file changed outside the pipeline is picked up
+    path = os.path.join('output', 'FY25', 'Q2', 'Acme_Q2FY25_quotes.json')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert store.import_outputs() == 1
+    assert [q['company'] for q in store.query(fiscal_year='FY25',
+                                              speaker='cfo')] == [
+        'Acme', 'Globex']
+    store.close()
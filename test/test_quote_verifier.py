@@ -0,0 +1,90 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from quote_verifier import (REJECT_SCORE, VERIFIED_SCORE, TranscriptIndex,
+                            verify_quotes)
+from transcript_index import index_transcript
+
+PAGES = [
+    """Acme Limited Q2 FY25 Earnings Conference Call
+
+Management:
+1. Jane Doe - Chief Executive Officer, Acme Limited
+2. John Roe - Chief Financial Officer, Acme Limited
+
+Moderator: Good morning and welcome to the call. Over to Jane Doe.
+Jane Doe: Thank you. This quarter our revenue grew 20% to INR 1,250
+crore, and we opened 45 new stores across the country.
+""",
+    """John Roe: Our EBITDA margin expanded by 150 basis points to 18.5%,
+driven by operating ef\ufb01ciencies and better manage-
+ment of costs. We expect margins to remain stable through FY26.
+Jane Doe: We are confident about the long-term growth of the business.
+John Roe: Thank you all for joining.
+""",
+]
+TEXT = '\n'.join(PAGES)
+PAGE_OFFSETS = [0, len(PAGES[0]) + 1]
+
+
+def quote(text, speaker='CEO', speaker_name='Jane Doe'):
+    return {'company': 'Acme', 'speaker': speaker,
+            'speaker_name': speaker_name, 'quote': text}
+
+
+def test_verbatim_quotes_are_verified_despite_pdf_noise():
+    index = TranscriptIndex(TEXT, PAGE_OFFSETS)
+    # Quote marks, case, the "fi" ligature and a hyphenated line break
+    result = index.verify('"Our EBITDA Margin expanded by 150 basis points '
+                          'to 18.5%, driven by operating efficiencies and '
+                          'better management of costs."')
+    assert result['score'] == 1.0 and result['verified']
+    assert result['page'] == 2
+    assert TEXT[result['offset']:].startswith('Our EBITDA')
+
+    # Parts left out with an ellipsis are located separately
+    result = index.verify('This quarter our revenue grew 20% to INR 1,250 '
+                          'crore ... we expect margins to remain stable '
+                          'through FY26.')
+    assert result['verified'] and result['page'] == 1
+
+
+def test_changed_figures_and_invented_quotes_are_caught():
+    index = TranscriptIndex(TEXT, PAGE_OFFSETS)
+    # One wrong figure costs more than one wrong word
+    figure = index.verify('Our EBITDA margin expanded by 250 basis points to '
+                          '18.5%, driven by operating efficiencies.')
+    word = index.verify('Our EBITDA margin increased by 150 basis points to '
+                        '18.5%, driven by operating efficiencies.')
+    assert figure['score'] < word['score'] < 1.0
+    assert not figure['verified']
+    assert REJECT_SCORE <= figure['score'] < VERIFIED_SCORE
+
+    invented = index.verify('We plan to enter three international markets '
+                            'next year through acquisitions.')
+    assert invented['score'] < REJECT_SCORE and not invented['verified']
+
+
+def test_verify_quotes_rejects_and_attributes():
+    index = index_transcript(TEXT, PAGE_OFFSETS)
+    good = quote('Our EBITDA margin expanded by 150 basis points to 18.5%')
+    invented = quote('We plan to enter three international markets next '
+                     'year through acquisitions.')
+
+    kept = verify_quotes([good, invented], TEXT, PAGE_OFFSETS,
+                         transcript_index=index)
+    assert kept == [good, invented]
+    assert good['verification']['verified']
+    assert not invented['verification']['verified']
+    # Claude named the wrong speaker; the transcript's turn wins
+    assert good['speaker_name'] == 'John Roe'
+    assert good['speaker'] == 'CFO'
+    assert good['speaker_role'] == 'executive'
+    assert good['section'] == 'prepared_remarks'
+
+    assert verify_quotes([good, invented], TEXT, PAGE_OFFSETS,
+                         reject=True) == [good]
+    assert verify_quotes([invented], TEXT, PAGE_OFFSETS, reject=True,
+                         reject_score=0.0) == [invented]
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from resilience import AdaptiveLimit, RequestGuard
+
+
+class FakeStream:
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_holds_its_slot_until_closed():
+    guard = RequestGuard(max_concurrency=2)
+    with guard.open_stream(lambda: FakeStream([1, 2, 3])) as stream:
+        assert guard.limit.in_flight == 1
+        assert list(stream) == [1, 2, 3]
+        assert guard.limit.in_flight == 1
+    assert stream.closed
+    assert guard.limit.in_flight == 0
+
+
+def test_abandoned_stream_frees_its_slot():
+    guard = RequestGuard(max_concurrency=1)
+    stream = guard.open_stream(lambda: FakeStream([1]))
+    assert guard.limit.in_flight == 1
+    stream.close()
+    stream.close()
+    assert guard.limit.in_flight == 0
+
+
+def test_async_waiter_wakes_when_another_thread_releases():
+    limit = AdaptiveLimit(1)
+    limit.acquire()
+    acquired = []
+
+    async def wait():
+        await limit.acquire_async()
+        acquired.append(time.monotonic())
+
+    thread = threading.Thread(target=asyncio.run, args=(wait(),))
+    thread.start()
+    time.sleep(0.2)
+    assert not acquired
+    released = time.monotonic()
+    limit.release(False)
+    thread.join(1)
+    assert acquired and acquired[0] - released < 0.05
+    assert limit.in_flight == 1
+
+
+def test_async_waiters_share_the_limit_across_event_loops():
+    limit = AdaptiveLimit(2)
+    lock = threading.Lock()
+    state = {'in_flight': 0, 'peak': 0}
+
+    async def request():
+        await limit.acquire_async()
+        with lock:
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+        await asyncio.sleep(0.01)
+        with lock:
+            state['in_flight'] -= 1
+        limit.release(None)
+
+    async def many():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(many(),))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert state['peak'] == 2
+    assert limit.in_flight == 0
@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from telemetry import Telemetry, cost_usd
+
+
+def metrics(text):
+    """Sample lines of a textfile as {'name{labels}': value}."""
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if not line.startswith('#')}
+
+
+def test_textfile_has_counters_and_histograms(tmp_path):
+    path = tmp_path / 'metrics' / 'earnings_bot.prom'
+    telemetry = Telemetry(textfile_path=str(path), textfile_interval=3600)
+    telemetry.record_stage('parse', 0.3)
+    telemetry.record_stage('parse', 4.0, ok=False)
+    telemetry.record_llm_call('claude-3-5-sonnet-20241022', 'extract',
+                              input_tokens=10000, output_tokens=1000,
+                              cache_read_tokens=2000, seconds=1.5)
+    telemetry.count('tweets_total', outcome='posted')
+    telemetry.count('files_total', company='Acme "Corp"\\', outcome='ok')
+    telemetry.close()
+
+    text = path.read_text()
+    assert '# TYPE earnings_bot_stage_seconds histogram' in text
+    assert '# TYPE earnings_bot_tokens_total counter' in text
+    assert text.count('# TYPE earnings_bot_stage_seconds ') == 1
+    samples = metrics(text)
+    stage = 'earnings_bot_stage_seconds'
+    # Buckets are cumulative
+    assert samples[f'{stage}_bucket{{stage="parse",le="0.25"}}'] == 0
+    assert samples[f'{stage}_bucket{{stage="parse",le="0.5"}}'] == 1
+    assert samples[f'{stage}_bucket{{stage="parse",le="5"}}'] == 2
+    assert samples[f'{stage}_bucket{{stage="parse",le="+Inf"}}'] == 2
+    assert samples[f'{stage}_sum{{stage="parse"}}'] == pytest.approx(4.3)
+    assert samples[f'{stage}_count{{stage="claude_call"}}'] == 1
+    assert samples['earnings_bot_stage_failures_total{stage="parse"}'] == 1
+    assert samples['earnings_bot_tokens_total{model="claude-3-5-sonnet-'
+                   '20241022",kind="cache_read"}'] == 2000
+    assert samples['earnings_bot_cost_usd_total{model="claude-3-5-sonnet-'
+                   '20241022"}'] == pytest.approx(cost_usd(
+                       'claude-3-5-sonnet', 10000, 1000, 0, 2000))
+    assert samples['earnings_bot_tweets_total{outcome="posted"}'] == 1
+    # Label values are escaped
+    assert samples['earnings_bot_files_total{company="Acme \\"Corp\\"\\\\",'
+                   'outcome="ok"}'] == 1
+    assert os.listdir(path.parent) == ['earnings_bot.prom']
+
+
+def test_textfile_is_rewritten_at_most_every_interval(tmp_path):
+    path = tmp_path / 'earnings_bot.prom'
+    jsonl = tmp_path / 'events.jsonl'
+    telemetry = Telemetry(str(jsonl), str(path), textfile_interval=3600)
+    telemetry.record_stage('parse', 0.1)
+    assert 'stage="parse"' in path.read_text()
+    telemetry.record_stage('pdf_extract', 0.1)
+    assert 'pdf_extract' not in path.read_text()
+    telemetry.close()
+    assert 'pdf_extract' in path.read_text()
+    events = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert [event['stage'] for event in events] == ['parse', 'pdf_extract']
+
+
+def test_disabled_telemetry_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    telemetry = Telemetry()
+    with telemetry.stage('parse') as timer:
+        timer.note(quotes=3)
+    telemetry.record_llm_call('claude-3-5-haiku', 'map', 100, 10)
+    telemetry.close()
+    assert telemetry.totals() == {}
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,104 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from transcript_index import Transcript, index_transcript, short_title
+
+PAGES = [
+    """Acme Limited
+Q2 FY25 Earnings Conference Call
+Page 1 of 2
+
+MANAGEMENT: 1. MS. JANE DOE - CHIEF EXECUTIVE OFFICER, ACME LIMITED
+2. MR. JOHN ROE - CHIEF FINANCIAL OFFICER, ACME LIMITED
+
+Moderator: Good morning and welcome to the Acme earnings call. I now hand
+over to Ms. Jane Doe.
+Jane Doe: Thank you. Revenue grew 20% this quarter.
+John Roe: Margins expanded by 150 basis points.
+Moderator: We will now begin the question-and-answer session. The first
+question is from the line of Ravi Kumar from Alpha Capital. Please go ahead.
+""",
+    """Acme Limited
+Q2 FY25 Earnings Conference Call
+Page 2 of 2
+Ravi Kumar: What is the margin outlook for FY26?
+John Roe: We expect margins to remain stable.
+Moderator: The next question is from Priya Shah of Beta Securities.
+Priya Shah: How many stores will you open?
+Jane Doe: About 200 stores next year.
+Ravi Kumar: Thank you.
+Priya Shah: Thanks.
+""",
+]
+TEXT = '\n'.join(PAGES)
+PAGE_OFFSETS = [0, len(PAGES[0]) + 1]
+
+
+def test_speakers_get_roles_from_the_roster_and_the_moderator():
+    index = index_transcript(TEXT, PAGE_OFFSETS)
+    assert index['speakers'] == {
+        'Moderator': {'role': 'moderator', 'title': None,
+                      'organization': None},
+        'Jane Doe': {'role': 'executive', 'title': 'Chief Executive Officer',
+                     'organization': 'ACME LIMITED'},
+        'John Roe': {'role': 'executive', 'title': 'Chief Financial Officer',
+                     'organization': 'ACME LIMITED'},
+        'Ravi Kumar': {'role': 'analyst', 'title': None,
+                       'organization': 'Alpha Capital'},
+        'Priya Shah': {'role': 'analyst', 'title': None,
+                       'organization': 'Beta Securities'}}
+    assert short_title(index['speakers']['John Roe']) == 'CFO'
+    assert short_title(index['speakers']['Priya Shah']) == 'Analyst'
+
+
+def test_turns_are_split_into_sections():
+    index = index_transcript(TEXT, PAGE_OFFSETS)
+    assert [section['name'] for section in index['sections']] == [
+        'preamble', 'prepared_remarks', 'qa']
+    turns = [(turn['speaker'], turn['section'], turn['page'])
+             for turn in index['turns']]
+    assert turns == [
+        ('Moderator', 'prepared_remarks', 1),
+        ('Jane Doe', 'prepared_remarks', 1),
+        ('John Roe', 'prepared_remarks', 1),
+        # The moderator opening the Q&A starts it
+        ('Moderator', 'qa', 1),
+        ('Ravi Kumar', 'qa', 2),
+        ('John Roe', 'qa', 2),
+        ('Moderator', 'qa', 2),
+        ('Priya Shah', 'qa', 2),
+        ('Jane Doe', 'qa', 2),
+        ('Ravi Kumar', 'qa', 2),
+        ('Priya Shah', 'qa', 2)]
+    first = index['turns'][1]
+    assert TEXT[first['start']:first['end']] == (
+        'Thank you. Revenue grew 20% this quarter.')
+
+
+def test_transcript_renders_selected_turns():
+    transcript = Transcript(TEXT, index_transcript(TEXT, PAGE_OFFSETS))
+    assert [turn['speaker'] for turn in transcript.turns(
+        sections=['qa'], roles=['executive'])] == ['John Roe', 'Jane Doe']
+    assert [turn['speaker'] for turn in transcript.turns(
+        speakers=['cfo'])] == ['John Roe', 'John Roe']
+
+    rendered = transcript.render(roles=['executive'])
+    assert rendered.split('\n\n')[0] == '[Prepared remarks]'
+    assert '[Q&A]' in rendered
+    assert 'Jane Doe (Chief Executive Officer, ACME LIMITED):\n' in rendered
+    assert 'Ravi Kumar' not in rendered
+    # Page numbers are left out of the turn text
+    moderator = transcript.turns(sections=['qa'], roles=['moderator'])[0]
+    assert transcript.turn_text(moderator).startswith(
+        'We will now begin the question-and-answer session. The first '
+        'question')
+    assert 'Page' not in transcript.turn_text(moderator)
+
+    quote = {'speaker': 'CEO', 'speaker_name': 'Jane Doe'}
+    offset = TEXT.index('We expect margins')
+    assert transcript.attribute(quote, offset)
+    assert quote == {'speaker': 'CFO', 'speaker_name': 'John Roe',
+                     'speaker_role': 'executive', 'section': 'qa'}
+    assert not transcript.attribute({}, TEXT.index('Earnings Conference'))
@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tweet_packer import (ELLIPSIS, MAX_TWEET_LENGTH, TCO_URL_LENGTH,
+                          TweetPacker, tweet_length)
+
+
+def quote(text, description='Growth outlook', **fields):
+    return dict({'company': 'Acme', 'speaker': 'CEO',
+                 'description': description, 'quote': text,
+                 'hashtag': '#Acme', 'fiscal_year': 'FY25',
+                 'quarter': 'Q2'}, **fields)
+
+
+def sentences(count):
+    return ' '.join(f"In segment {i} we expect revenue to grow steadily "
+                    f"over the coming years." for i in range(count))
+
+
+def test_tweet_length_weighs_like_twitter():
+    assert tweet_length('Revenue grew 20%') == 16
+    # CJK and emoji count double, typographic quotes and dashes once
+    assert tweet_length('売上') == 4
+    assert tweet_length('📈') == 2
+    assert tweet_length('“growth” — 20%') == 14
+    # Combining marks are normalized first
+    assert tweet_length('cafe\u0301') == 4
+    assert tweet_length('See https://example.com/a/very/long/path/to/a/'
+                        'report.pdf now') == 8 + TCO_URL_LENGTH
+
+
+def test_format_trims_the_description_then_the_hashtags():
+    packer = TweetPacker()
+    short = packer.format(quote('We expect revenue to grow 20% next year.'))
+    assert short == ('Acme CEO on Growth outlook:\n'
+                     '"We expect revenue to grow 20% next year."\n'
+                     '#Acme #FY25Q2')
+
+    # A long description is cut on a word boundary to make room
+    long_quote = quote(sentences(3), description=' '.join(
+        ['Detailed commentary on the outlook'] * 10))
+    text = packer.format(long_quote)
+    assert tweet_length(text) <= MAX_TWEET_LENGTH
+    assert f"{ELLIPSIS}:\n\"{sentences(3)}\"" in text
+    assert text.endswith('#Acme #FY25Q2')
+
+    # Then the description and the hashtags go; the quote is never cut
+    text = TweetPacker(max_length=tweet_length(
+        f"Acme CEO:\n\"{sentences(3)}\"")).format(long_quote)
+    assert text == f"Acme CEO:\n\"{sentences(3)}\""
+    assert packer.format(quote(sentences(6))) is None
+
+
+def test_long_quotes_become_threads():
+    packer = TweetPacker()
+    text = sentences(8)
+    tweets = packer.format_thread(quote(text))
+    assert len(tweets) > 1
+    assert all(tweet_length(tweet) <= MAX_TWEET_LENGTH for tweet in tweets)
+    assert tweets[0].startswith('Acme CEO on Growth outlook:\n')
+    assert tweets[-1].endswith(f"#Acme #FY25Q2 ({len(tweets)}/{len(tweets)})")
+    assert [tweet.rsplit(' (', 1)[1] for tweet in tweets] == [
+        f"{i}/{len(tweets)})" for i in range(1, len(tweets) + 1)]
+    # Every word of the quote is posted, in order
+    posted = ' '.join(tweet.split('"')[1].rstrip(ELLIPSIS)
+                      for tweet in tweets)
+    assert posted.split() == text.split()
+
+
+def test_pack_spends_the_budget_on_the_most_value():
+    packer = TweetPacker()
+    quotes = [quote(sentences(8), description='Long-term plan'),
+              quote('Margins will expand 150 basis points.',
+                    description='Margins'),
+              quote('We will open 200 new stores.', description='Stores')]
+    threads = packer.candidates(quotes)
+    assert [len(c['texts']) for c in threads if len(c['quote_ids']) == 1][
+        0] > 1
+
+    chosen = packer.pack([('acme.json', quotes)], budget=1)
+    # Two short quotes in one tweet beat the top-ranked thread
+    assert len(chosen) == 1 and len(chosen[0]['quote_ids']) == 2
+    assert chosen[0]['value'] == 1 / 2 + 1 / 3
+
+    chosen = packer.pack([('acme.json', quotes)], budget=10)
+    assert sorted(len(c['quote_ids']) for c in chosen) == [1, 2]
+    # Quotes already posted are skipped
+    skip = chosen[0]['quote_ids'] + chosen[1]['quote_ids']
+    assert packer.pack([('acme.json', quotes)], budget=10, skip=skip) == []
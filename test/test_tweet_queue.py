@@ -0,0 +1,305 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tweet_queue import TweetQueue, DAY_SECONDS, make_post_id
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class HTTPError(Exception):
+    """Error shaped like tweepy's, with the response it failed on."""
+
+    def __init__(self, status, message='', headers=None):
+        super().__init__(f"{status} {message}")
+        self.response = SimpleNamespace(status_code=status,
+                                        headers=headers or {})
+
+
+class FakeTwitter:
+    """
+    Twitter client stand-in: records each tweet with the fake time it was
+    posted and raises the queued errors first.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.posted = []
+        self.errors = []
+        self.timeline = {}
+        self.timeline_error = None
+
+    def create_tweet(self, text, in_reply_to_tweet_id=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        tweet_id = str(1000 + len(self.posted))
+        self.posted.append({'time': self.clock(), 'text': text, 'id': tweet_id,
+                            'reply_to': in_reply_to_tweet_id})
+        self.timeline[text] = tweet_id
+        return SimpleNamespace(data={'id': tweet_id, 'text': text})
+
+    def get_me(self):
+        return SimpleNamespace(data=SimpleNamespace(id=1))
+
+    def get_users_tweets(self, user_id, max_results=100):
+        if self.timeline_error:
+            raise self.timeline_error
+        return SimpleNamespace(data=[
+            SimpleNamespace(text=text, id=tweet_id)
+            for text, tweet_id in self.timeline.items()])
+
+
+def quote(index, company='Acme'):
+    return {'company': company, 'fiscal_year': 'FY25', 'quarter': 'Q2',
+            'speaker': 'CEO', 'quote': f"Revenue grew {index}% this year."}
+
+
+def post(index, parts=1, company='Acme'):
+    post_id = make_post_id(quote(index, company))
+    return {'post_id': post_id, 'source_path': f"{company}_quotes.json",
+            'company': company, 'fiscal_year': 'FY25', 'quarter': 'Q2',
+            'quote_ids': [post_id],
+            'texts': [f"{company} {index} part {part + 1}"
+                      for part in range(parts)]}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def client(clock):
+    return FakeTwitter(clock)
+
+
+@pytest.fixture
+def make_queue(tmp_path, clock, client):
+    def make(**kwargs):
+        kwargs.setdefault('client', client)
+        return TweetQueue(kwargs.pop('client'),
+                          path=str(tmp_path / 'tweets.db'), clock=clock,
+                          sleep=clock.sleep, **kwargs)
+    return make
+
+
+def assert_under_daily_cap(times, daily_limit):
+    for i, start in enumerate(times):
+        in_window = [t for t in times[i:] if t < start + DAY_SECONDS]
+        assert len(in_window) <= daily_limit
+
+
+def test_posts_are_spread_by_the_rate_budget(make_queue, client):
+    queue = make_queue(daily_limit=4)
+    queue.enqueue_posts([post(i) for i in range(8)])
+    queue.run()
+    times = [tweet['time'] for tweet in client.posted]
+    assert len(times) == 8
+    assert times[0] == START
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= DAY_SECONDS / 4
+    assert_under_daily_cap(times, 4)
+
+
+def test_rolling_daily_cap_holds_for_bursts_and_threads(make_queue, client):
+    queue = make_queue(daily_limit=5, burst=5)
+    queue.enqueue_posts([post(0), post(1, parts=3), post(2), post(3, parts=2),
+                         post(4)])
+    queue.run()
+    times = [tweet['time'] for tweet in client.posted]
+    assert len(times) == 8
+    assert_under_daily_cap(times, 5)
+    # The burst goes out at once; the rest waits for the window to roll
+    assert times[:4] == [START] * 4
+    assert times[5] >= START + DAY_SECONDS
+
+
+def test_thread_parts_reply_to_each_other(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0, parts=3)])
+    queue.run()
+    first, second, third = client.posted
+    assert first['reply_to'] is None
+    assert second['reply_to'] == first['id']
+    assert third['reply_to'] == second['id']
+
+
+def test_rate_limited_post_pauses_the_queue(make_queue, client, clock):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0), post(1)])
+    reset = START + 900
+    client.errors.append(HTTPError(
+        429, 'Too Many Requests', {'x-rate-limit-reset': str(reset)}))
+    queue.run()
+    assert [tweet['time'] for tweet in client.posted] == [reset, reset]
+    assert queue.counts() == {'posted': 2}
+
+
+def test_server_errors_back_off_then_client_errors_fail(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17, backoff_seconds=60)
+    queue.enqueue_posts([post(0), post(1)])
+    client.errors += [HTTPError(503, 'Service Unavailable'),
+                      HTTPError(400, 'Bad Request')]
+    queue.run()
+    # post(0) waits out its backoff while post(1) is tried and rejected
+    assert queue.counts() == {'posted': 1, 'failed': 1}
+    assert client.posted[0]['time'] >= START + 60 * 0.8
+
+
+def test_post_ids_make_enqueueing_idempotent(make_queue, client):
+    assert make_post_id(quote(1)) == make_post_id(dict(quote(1)))
+    assert make_post_id(quote(1)) != make_post_id(quote(2))
+    queue = make_queue()
+    assert queue.enqueue_posts([post(0), post(1)]) == 2
+    assert queue.enqueue_posts([post(0), post(1), post(2)]) == 1
+    queue.run(once=True)
+    # Posted quotes are not queued again either
+    assert queue.enqueue_posts([post(0)]) == 0
+    assert len(client.posted) == 1
+
+
+def test_queue_survives_a_restart(make_queue, client):
+    queue = make_queue(daily_limit=2)
+    queue.enqueue_posts([post(i) for i in range(3)])
+    queue.run(once=True)
+    queue.close()
+
+    queue = make_queue(daily_limit=2)
+    # The budget spent before the restart still counts
+    assert queue.wait_time() > 0
+    queue.run()
+    assert [tweet['text'] for tweet in client.posted] == [
+        post(i)['texts'][0] for i in range(3)]
+
+
+class Crash(BaseException):
+    """Kills the poster mid-call, as a power cut would."""
+
+
+def test_crash_mid_post_is_resolved_from_the_timeline(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0)])
+    client.errors.append(Crash())
+    with pytest.raises(Crash):
+        queue.run()
+    queue.close()
+    # The tweet went out before the crash
+    client.timeline[post(0)['texts'][0]] = '999'
+
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.run()
+    assert client.posted == []
+    assert queue.counts() == {'posted': 1}
+
+
+def test_crash_mid_post_matches_the_timeline_as_twitter_returns_it(
+        make_queue, client):
+    posted = []
+
+    def on_posted(quote_ids, tweet_id):
+        posted.append((quote_ids, tweet_id))
+
+    texts = ['Acme M&A outlook:  <20% growth https://example.com/q2']
+    queue = make_queue(daily_limit=17, burst=2, on_posted=on_posted)
+    queue.enqueue_posts([dict(post(0), texts=texts)])
+    client.errors.append(Crash())
+    with pytest.raises(Crash):
+        queue.run()
+    queue.close()
+    # Escaped, with the link rewritten to t.co
+    client.timeline['Acme M&amp;A outlook: &lt;20% growth '
+                    'https://t.co/AbCdEf1234'] = '999'
+
+    queue = make_queue(daily_limit=17, burst=2, on_posted=on_posted)
+    queue.run()
+    assert client.posted == []
+    assert queue.counts() == {'posted': 1}
+    assert posted == [(post(0)['quote_ids'], '999')]
+    # The tweet that went out took a token, so only one more fits the burst
+    queue.enqueue_posts([post(1), post(2)])
+    queue.run(once=True)
+    assert queue.wait_time() > 0
+
+
+def test_crash_before_the_tweet_went_out_posts_it_again(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0, parts=2)])
+    client.errors.append(Crash())
+    with pytest.raises(Crash):
+        queue.run()
+    queue.close()
+
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.run()
+    assert [tweet['text'] for tweet in client.posted] == post(0, parts=2)[
+        'texts']
+    assert queue.counts() == {'posted': 1}
+
+
+def test_crash_is_left_alone_when_the_timeline_is_unreadable(make_queue,
+                                                             client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0), post(1)])
+    client.errors.append(Crash())
+    with pytest.raises(Crash):
+        queue.run()
+    queue.close()
+
+    client.timeline_error = HTTPError(503, 'Service Unavailable')
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.run()
+    # Only the post that was not in flight goes out
+    assert [tweet['text'] for tweet in client.posted] == post(1)['texts']
+    assert queue.counts() == {'posting': 1, 'posted': 1}
+
+
+def duplicate():
+    return HTTPError(403, 'You are not allowed to create a Tweet with '
+                     'duplicate content.')
+
+
+def test_duplicate_thread_part_keeps_the_thread_chained(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0, parts=3)])
+    # The first tweet went out in an earlier run
+    client.timeline[post(0, parts=3)['texts'][0]] = '777'
+    client.errors.append(duplicate())
+    queue.run()
+    second, third = client.posted
+    assert second['reply_to'] == '777'
+    assert third['reply_to'] == second['id']
+    assert queue.counts() == {'posted': 1}
+
+
+def test_duplicate_thread_part_not_found_fails_the_post(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0, parts=3), post(1)])
+    client.errors.append(duplicate())
+    queue.run()
+    # No orphaned replies; the other post still goes out
+    assert [tweet['text'] for tweet in client.posted] == post(1)['texts']
+    assert queue.counts() == {'failed': 1, 'posted': 1}
+
+
+def test_duplicate_single_tweet_counts_as_posted(make_queue, client):
+    queue = make_queue(daily_limit=17, burst=17)
+    queue.enqueue_posts([post(0)])
+    client.errors.append(duplicate())
+    queue.run()
+    assert client.posted == []
+    assert queue.counts() == {'posted': 1}
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import watcher
+from watcher import MAX_SETTLE_SECONDS, TranscriptWatcher
+
+PDF = b'%PDF-1.4\n' + b'0' * 100
+
+
+class FakeClock:
+    """Stands in for the time module inside watcher."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(watcher, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def quarter(tmp_path):
+    path = tmp_path / 'pdfs' / 'FY25' / 'Q2'
+    path.mkdir(parents=True)
+    return path
+
+
+def make_watcher(tmp_path, **kwargs):
+    ready = []
+    kwargs.setdefault('settle_seconds', 2.0)
+    return TranscriptWatcher(lambda *args: ready.append(args),
+                             root=str(tmp_path / 'pdfs'), **kwargs), ready
+
+
+def test_files_are_reported_once_they_settle(tmp_path, quarter, clock):
+    watch, ready = make_watcher(tmp_path, use_events=False)
+    path = quarter / 'Acme_Q2FY25.pdf'
+    path.write_bytes(PDF)
+    watch.notice(str(path))
+    watch._check_candidates()
+
+    # Unchanged for long enough, but the trailer is still missing
+    clock.now += 3
+    watch._check_candidates()
+    assert ready == []
+
+    # More bytes restart the wait
+    with open(path, 'ab') as f:
+        f.write(b'%%EOF\n')
+    watch._check_candidates()
+    clock.now += 1
+    watch._check_candidates()
+    assert ready == []
+    clock.now += 1
+    watch._check_candidates()
+    assert ready == [(os.path.normpath(str(path)), 'FY25', 'Q2')]
+
+    # Reported once, and a scan does not pick it up again
+    clock.now += 10
+    watch._poll()
+    watch._check_candidates()
+    clock.now += 10
+    watch._check_candidates()
+    assert len(ready) == 1
+
+
+def test_files_without_a_trailer_are_reported_eventually(tmp_path, quarter,
+                                                         clock):
+    watch, ready = make_watcher(tmp_path, use_events=False)
+    path = quarter / 'Acme_Q2FY25.pdf'
+    path.write_bytes(PDF)
+    watch.notice(str(path))
+    watch._check_candidates()
+    clock.now += MAX_SETTLE_SECONDS - 1
+    watch._check_candidates()
+    assert ready == []
+    clock.now += 1
+    watch._check_candidates()
+    assert len(ready) == 1
+
+
+def test_polling_finds_new_and_changed_pdfs(tmp_path, quarter, clock):
+    watch, ready = make_watcher(tmp_path, use_events=False, settle_seconds=0)
+    (quarter / 'Acme_Q2FY25.pdf').write_bytes(PDF + b'%%EOF')
+    (quarter / 'notes.txt').write_bytes(b'not a transcript')
+    (tmp_path / 'pdfs' / 'drafts').mkdir()
+    (tmp_path / 'pdfs' / 'drafts' / 'Draft.pdf').write_bytes(PDF + b'%%EOF')
+    known = quarter / 'Globex_Q2FY25.pdf'
+    known.write_bytes(PDF + b'%%EOF')
+    watch.mark_known(str(known))
+
+    def poll():
+        watch._poll()
+        watch._check_candidates()
+        clock.now += 1
+        watch._check_candidates()
+        return [os.path.basename(path) for path, _, _ in ready]
+
+    assert poll() == ['Acme_Q2FY25.pdf']
+    assert poll() == ['Acme_Q2FY25.pdf']
+    # Replacing a known file reports it again
+    known.write_bytes(PDF + b'1%%EOF')
+    assert poll() == ['Acme_Q2FY25.pdf', 'Globex_Q2FY25.pdf']
+
+
+def test_events_report_new_pdfs(tmp_path, quarter):
+    if watcher.Observer is None:
+        pytest.skip('watchdog is not installed')
+    watch, ready = make_watcher(tmp_path, settle_seconds=0)
+    assert watch.use_events
+    thread = threading.Thread(target=watch.run, daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.5)
+        (quarter / 'Acme_Q2FY25.pdf').write_bytes(PDF + b'%%EOF')
+        deadline = time.monotonic() + 10
+        while not ready and time.monotonic() < deadline:
+            time.sleep(0.1)
+    finally:
+        watch.stop()
+        thread.join()
+    assert [os.path.basename(path) for path, _, _ in ready] == [
+        'Acme_Q2FY25.pdf']